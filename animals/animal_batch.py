@@ -0,0 +1,262 @@
+"""
+animals.animal_batch
+Columnar container for large sets of animals without one object per row
+"""
+
+import math
+from array import array
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+from animals.dog import Dog
+from animals.monkey import Monkey
+from animals.rescue_animal import RescueAnimal
+
+ANIMAL_CLASSES = {"Dog": Dog, "Monkey": Monkey}
+
+# Dictionary-encoded text columns, in to_dict order
+STRING_FIELDS: Tuple[str, ...] = (
+    "name", "animal_type", "breed", "species", "gender", "acquisition_date",
+    "acquisition_country", "training_status", "in_service_country",
+)
+
+_NO_AGE = -1
+_NO_WEIGHT = math.nan
+
+
+class _StringColumn:
+    """
+    Stores each distinct string once and a 32-bit code per row. Code 0 means the
+    field was missing, so Dog rows cost nothing in the species column.
+    """
+
+    def __init__(self) -> None:
+        self.values: List[Optional[str]] = [None]
+        self.index: Dict[str, int] = {}
+        self.codes = array("I")
+
+    def append(self, value: Optional[str]) -> None:
+        self.codes.append(self.code(value, add=True))
+
+    def code(self, value: Optional[str], add: bool = False) -> int:
+        if value is None:
+            return 0
+        code = self.index.get(value)
+        if code is None:
+            if not add:
+                return -1
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __getitem__(self, row: int) -> Optional[str]:
+        return self.values[self.codes[row]]
+
+
+class AnimalBatch:
+    """
+    Holds many animals as parallel arrays: dictionary-encoded strings, ``array``
+    columns for age and weight and a bitmap for ``reserved``. Rows are
+    materialized as dicts (or Dog/Monkey instances) only when asked for.
+    """
+
+    def __init__(self, rows: Iterable[Union[RescueAnimal, Mapping[str, Any]]] = ()) -> None:
+        self._strings = {field: _StringColumn() for field in STRING_FIELDS}
+        self._ages = array("q")
+        self._weights = array("d")
+        self._reserved = bytearray()
+        self._ids: List[Any] = []
+        self._size = 0
+        self.extend(rows)
+
+    @classmethod
+    def from_documents(cls, docs: Iterable[Mapping[str, Any]]) -> "AnimalBatch":
+        """
+        Builds a batch from MongoDB documents, e.g. ``db.iter_animals(...)``,
+        keeping each ``_id`` so rows can be mapped back to the collection.
+        """
+        return cls(docs)
+
+    @classmethod
+    def from_buffers(cls, size: int, values: Mapping[str, List[Optional[str]]],
+                     buffers: Mapping[str, Any], ids: Sequence[Any]) -> "AnimalBatch":
+        """
+        Wraps columns in the layout of ``to_buffers()`` (e.g. memoryviews of a
+        memory-mapped file) without copying them. Reading, ``filter()`` and
+        ``take()`` work as usual and return ordinary batches; ``append()`` does not.
+        """
+        batch = cls()
+        for field, column in batch._strings.items():
+            column.values = list(values[field])
+            column.index = {value: code for code, value in enumerate(column.values) if value is not None}
+            column.codes = buffers[field]
+        batch._ages, batch._weights = buffers["age"], buffers["weight"]
+        batch._reserved = buffers["reserved"]
+        batch._ids = ids
+        batch._size = size
+        return batch
+
+    def to_buffers(self) -> Tuple[Dict[str, List[Optional[str]]], Dict[str, Any]]:
+        """
+        The raw columns, for writing the batch out: each text field's distinct
+        values in code order (code 0 is ``None``), and one buffer per column.
+        ``_id`` is not included; see ``column("_id")``.
+        """
+        values = {field: column.values for field, column in self._strings.items()}
+        buffers: Dict[str, Any] = {field: column.codes for field, column in self._strings.items()}
+        buffers.update(age=self._ages, weight=self._weights, reserved=self._reserved)
+        return values, buffers
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, row: Union[RescueAnimal, Mapping[str, Any]]) -> None:
+        data = row.to_dict() if isinstance(row, RescueAnimal) else row
+        for field, column in self._strings.items():
+            column.append(data.get(field))
+        # Coerced like RescueAnimal.from_dict, so a stored 3.0 (or "3") still fits
+        # the integer column; values that cannot convert raise TypeError/ValueError
+        age = data.get("age")
+        self._ages.append(_NO_AGE if age is None else int(age))
+        weight = data.get("weight")
+        self._weights.append(_NO_WEIGHT if weight is None else float(weight))
+        if not self._size % 8:
+            self._reserved.append(0)
+        if data.get("reserved"):
+            self._reserved[self._size >> 3] |= 1 << (self._size & 7)
+        self._ids.append(data.get("_id"))
+        self._size += 1
+
+    def extend(self, rows: Iterable[Union[RescueAnimal, Mapping[str, Any]]]) -> None:
+        for row in rows:
+            self.append(row)
+
+    def _row(self, row: int) -> int:
+        if row < 0:
+            row += self._size
+        if not 0 <= row < self._size:
+            raise IndexError("AnimalBatch index out of range")
+        return row
+
+    def reserved(self, row: int) -> bool:
+        row = self._row(row)
+        return bool(self._reserved[row >> 3] & (1 << (row & 7)))
+
+    def to_dict(self, row: int) -> Dict[str, Any]:
+        """
+        Same shape as RescueAnimal.to_dict() (plus ``_id`` when the row came from
+        the database); fields the source row did not have are left out.
+        """
+        row = self._row(row)
+        data: Dict[str, Any] = {}
+        if self._ids[row] is not None:
+            data["_id"] = self._ids[row]
+        for field, column in self._strings.items():
+            value = column[row]
+            if value is not None:
+                data[field] = value
+        if self._ages[row] != _NO_AGE:
+            data["age"] = self._ages[row]
+        if not math.isnan(self._weights[row]):
+            data["weight"] = self._weights[row]
+        data["reserved"] = bool(self._reserved[row >> 3] & (1 << (row & 7)))
+        return data
+
+    def __getitem__(self, row: int) -> Dict[str, Any]:
+        return self.to_dict(row)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for row in range(self._size):
+            yield self.to_dict(row)
+
+    def to_animal(self, row: int) -> RescueAnimal:
+        data = self.to_dict(row)
+        return ANIMAL_CLASSES[data["animal_type"]].from_dict(data)
+
+    def to_animals(self) -> List[RescueAnimal]:
+        """
+        Materializes every row through from_records, one call per animal type.
+        """
+        by_type: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+        for row, data in enumerate(self):
+            by_type.setdefault(data["animal_type"], []).append((row, data))
+        placed: List[Tuple[int, RescueAnimal]] = []
+        for animal_type, items in by_type.items():
+            animals, errors = ANIMAL_CLASSES[animal_type].from_records(data for _, data in items)
+            if errors:
+                row, message = errors[0]
+                raise ValueError(f"row {items[row][0]}: {message}")
+            placed.extend(zip((row for row, _ in items), animals))
+        return [animal for _, animal in sorted(placed, key=lambda pair: pair[0])]
+
+    def column(self, field: str) -> List[Any]:
+        if field in self._strings:
+            column = self._strings[field]
+            return [column.values[code] for code in column.codes]
+        if field == "age":
+            return [None if age == _NO_AGE else age for age in self._ages]
+        if field == "weight":
+            return [None if math.isnan(weight) else weight for weight in self._weights]
+        if field == "reserved":
+            return [self.reserved(row) for row in range(self._size)]
+        if field == "_id":
+            return list(self._ids)
+        raise KeyError(field)
+
+    def filter(self, predicate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+               **equals: Any) -> "AnimalBatch":
+        """
+        Returns a new batch with the matching rows. Keyword filters compare whole
+        field values (``animal_type="Dog"``, ``reserved=False``) on the encoded
+        columns without materializing rows; a list, tuple or set matches any of
+        its values. ``predicate`` sees each row as a dict.
+        """
+        rows = range(self._size)
+        for field, value in equals.items():
+            rows = self._matching(rows, field, value)
+        if predicate is not None:
+            rows = [row for row in rows if predicate(self.to_dict(row))]
+        return self.take(rows)
+
+    def _matching(self, rows: Iterable[int], field: str, value: Any) -> List[int]:
+        if field in self._strings:
+            column = self._strings[field]
+            codes = column.codes
+            if isinstance(value, (list, tuple, set, frozenset)):
+                wanted = {column.code(item) for item in value}
+                return [row for row in rows if codes[row] in wanted]
+            code = column.code(value)
+            return [row for row in rows if codes[row] == code]
+        if field == "reserved":
+            return [row for row in rows if self.reserved(row) == bool(value)]
+        return [row for row in rows if self.to_dict(row).get(field) == value]
+
+    def take(self, rows: Iterable[int]) -> "AnimalBatch":
+        # Copies codes rather than strings, so the new batch shares no state but
+        # never re-hashes text; one gather per column keeps the loops tight
+        # pylint: disable=protected-access
+        rows = list(rows)
+        batch = type(self)()
+        for field, source in self._strings.items():
+            target = batch._strings[field]
+            target.values = list(source.values)
+            target.index = dict(source.index)
+            codes = source.codes
+            target.codes = array("I", [codes[row] for row in rows])
+        ages, weights, flags = self._ages, self._weights, self._reserved
+        batch._ages = array("q", [ages[row] for row in rows])
+        batch._weights = array("d", [weights[row] for row in rows])
+        bits = [flags[row >> 3] >> (row & 7) & 1 for row in rows]
+        batch._reserved = bytearray(sum(bit << shift for shift, bit in enumerate(bits[i:i + 8]))
+                                    for i in range(0, len(bits), 8))
+        batch._ids = [self._ids[row] for row in rows]
+        batch._size = len(rows)
+        return batch
+
+    def nbytes(self) -> int:
+        """
+        Approximate size of the column buffers (codes and numeric arrays, not
+        the distinct strings they point to).
+        """
+        codes = sum(column.codes.itemsize * len(column.codes) for column in self._strings.values())
+        return (codes + self._ages.itemsize * len(self._ages)
+                + self._weights.itemsize * len(self._weights) + len(self._reserved))
@@ -3,10 +3,13 @@ animals.dog
 Holds the Dog subclass information
 """
 
-from animals.rescue_animal import RescueAnimal
+from animals.rescue_animal import RescueAnimal, _title_case
 
 class Dog(RescueAnimal):
     animal_type = "Dog"
+    _extra_field = "breed"
+
+    __slots__ = ("breed",)
 
     def __init__(self, *, name: str, breed: str, gender: str, age: int, weight: float,
                  acquisition_country: str, training_status: str, reserved: bool, in_service_country: str):
@@ -20,7 +23,7 @@ class Dog(RescueAnimal):
             reserved=reserved,
             in_service_country=in_service_country
         )
-        self.breed = breed.strip().title()
+        self.breed = _title_case(breed)
 
     def to_dict(self):
         data = super().to_dict()
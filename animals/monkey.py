@@ -3,10 +3,13 @@ animals.monkey
 Holds the Monkey subclass information
 """
 
-from animals.rescue_animal import RescueAnimal
+from animals.rescue_animal import RescueAnimal, _title_case
 
 class Monkey(RescueAnimal):
     animal_type = "Monkey"
+    _extra_field = "species"
+
+    __slots__ = ("species",)
 
     def __init__(self, *, name: str, species: str, gender: str, age: int, weight: float,
                  acquisition_country: str, training_status: str, reserved: bool, in_service_country: str):
@@ -20,7 +23,7 @@ class Monkey(RescueAnimal):
             reserved=reserved,
             in_service_country=in_service_country
         )
-        self.species = species.strip().title()
+        self.species = _title_case(species)
 
     def to_dict(self):
         data = super().to_dict()
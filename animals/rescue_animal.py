@@ -1,8 +1,26 @@
 from datetime import date
-from typing import Any, Dict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
 import math
 
+
+@lru_cache(maxsize=4096)
+def _title_case(value: str) -> str:
+    # Countries, breeds, genders and training statuses repeat heavily across records
+    return value.strip().title()
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+RowErrors = List[Tuple[int, str]]
+
+
 class RescueAnimal:
+    # Subclass-specific constructor argument (e.g. "breed"), stored title-cased
+    _extra_field: Optional[str] = None
+
     __slots__ = (
         "_name", "_gender", "_age", "_weight", "_acquisition_date",
         "_acquisition_country", "_training_status", "_reserved", "_in_service_country"
@@ -25,7 +43,7 @@ class RescueAnimal:
     def _validate_str(value: str, field: str) -> str:
         if not isinstance(value, str) or not value.strip():
             raise ValueError(f"{field} must be a non-empty string")
-        return value.strip().title()
+        return _title_case(value)
 
     @staticmethod
     def _validate_int(value: int, field: str) -> int:
@@ -37,12 +55,18 @@ class RescueAnimal:
     def _validate_float(value: float, field: str) -> float:
         try:
             val = float(value)
-        except (TypeError, ValueError):
-            raise ValueError(f"{field} must be a valid float")
+        except (TypeError, ValueError) as exc:
+            raise ValueError(f"{field} must be a valid float") from exc
         if val <= 0 or math.isnan(val) or math.isinf(val):
             raise ValueError(f"{field} must be a positive number")
         return val
 
+    @staticmethod
+    def _validate_bool(value: bool, field: str) -> bool:
+        if not isinstance(value, bool):
+            raise ValueError(f"{field} must be a boolean")
+        return value
+
     @property
     def name(self) -> str:
         return self._name
@@ -101,9 +125,7 @@ class RescueAnimal:
 
     @reserved.setter
     def reserved(self, value: bool) -> None:
-        if not isinstance(value, bool):
-            raise ValueError("reserved must be a boolean")
-        self._reserved = value
+        self._reserved = self._validate_bool(value, "reserved")
 
     @property
     def in_service_country(self) -> str:
@@ -127,9 +149,14 @@ class RescueAnimal:
             "animal_type": getattr(self.__class__, "animal_type", None),
         }
 
+    @classmethod
+    def _extra_fields(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {cls._extra_field: data[cls._extra_field]} if cls._extra_field else {}
+
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "RescueAnimal":
         obj = cls(
+            **cls._extra_fields(data),
             name=data["name"],
             gender=data["gender"],
             age=int(data["age"]),
@@ -139,8 +166,152 @@ class RescueAnimal:
             reserved=bool(data["reserved"]),
             in_service_country=data["in_service_country"],
         )
-        obj._acquisition_date = data.get("acquisition_date", date.today().isoformat())
+        obj._acquisition_date = (data["acquisition_date"] if "acquisition_date" in data
+                                 else date.today().isoformat())
         return obj
 
+    # ----- batch API -----
+
+    # Constructor order, so a row's first reported error matches the scalar path
+    _FIELD_KINDS: Tuple[Tuple[str, str], ...] = (
+        ("name", "str"), ("gender", "str"), ("age", "int"), ("weight", "float"),
+        ("acquisition_country", "str"), ("training_status", "str"), ("reserved", "bool"),
+        ("in_service_country", "str"),
+    )
+
+    # Conversions from_dict applies before construction, in argument order
+    _FROM_DICT_COERCIONS: Dict[str, Callable[[Any], Any]] = {"age": int, "weight": float, "reserved": bool}
+
+    @classmethod
+    def _batch_fields(cls) -> Tuple[str, ...]:
+        fields = tuple(field for field, _ in cls._FIELD_KINDS)
+        return ((cls._extra_field,) if cls._extra_field else ()) + fields
+
+    # Type checks that let already-valid values skip the scalar validator
+    _FAST_PATHS: Dict[str, Callable[[Any], bool]] = {
+        "int": lambda v: type(v) is int and v >= 0,  # pylint: disable=unidiomatic-typecheck
+        "float": lambda v: type(v) is float and 0 < v < math.inf,  # pylint: disable=unidiomatic-typecheck
+        "bool": lambda v: type(v) is bool,  # pylint: disable=unidiomatic-typecheck
+    }
+
+    @classmethod
+    def _validate_column(cls, field: str, kind: str, column: List[Any], errors: Dict[int, str]) -> None:
+        # Anything not on a fast path goes through the scalar validator, so edge
+        # cases and error messages stay identical to the property setters.
+        validate = {"str": cls._validate_str, "int": cls._validate_int,
+                    "float": cls._validate_float, "bool": cls._validate_bool}[kind]
+        if kind == "str":
+            titled: Dict[Any, str] = {}
+            for i, value in enumerate(column):
+                cached = titled.get(value) if type(value) is str else None  # pylint: disable=unidiomatic-typecheck
+                if cached is not None:
+                    column[i] = cached
+                elif i not in errors:
+                    try:
+                        column[i] = titled[value] = validate(value, field)
+                    except ValueError as exc:
+                        errors[i] = str(exc)
+            return
+
+        fast = cls._FAST_PATHS[kind]
+        for i, value in enumerate(column):
+            if not fast(value) and i not in errors:
+                try:
+                    column[i] = validate(value, field)
+                except ValueError as exc:
+                    errors[i] = str(exc)
+
+    @classmethod
+    def _validate_columns(cls, rows: List[Mapping[str, Any]],
+                          coerce: bool) -> Tuple[Dict[str, List[Any]], Dict[int, str]]:
+        missing = object()
+        columns = {field: [row.get(field, missing) for row in rows] for field in cls._batch_fields()}
+        errors: Dict[int, str] = {}
+
+        if coerce:
+            for field in cls._batch_fields():
+                convert = cls._FROM_DICT_COERCIONS.get(field)
+                column = columns[field]
+                for i, value in enumerate(column):
+                    if value is missing:
+                        errors.setdefault(i, f"missing field {field}")
+                    elif convert is not None and type(value) is not convert and i not in errors:  # pylint: disable=unidiomatic-typecheck
+                        try:
+                            column[i] = convert(value)
+                        except (TypeError, ValueError) as exc:
+                            errors[i] = str(exc)
+        else:
+            for field in cls._batch_fields():
+                for i, value in enumerate(columns[field]):
+                    if value is missing and i not in errors:
+                        errors[i] = f"missing field {field}"
+
+        for field, kind in cls._FIELD_KINDS:
+            cls._validate_column(field, kind, columns[field], errors)
+
+        if cls._extra_field:
+            column = columns[cls._extra_field]
+            titled: Dict[str, str] = {}
+            for i, value in enumerate(column):
+                if i in errors:
+                    continue
+                try:
+                    column[i] = titled[value] if value in titled else _title_case(value)
+                except (AttributeError, TypeError) as exc:
+                    errors[i] = f"{cls._extra_field}: {exc}"
+                    continue
+                titled[value] = column[i]
+        return columns, errors
+
+    @classmethod
+    def validate_many(cls, records: Iterable[Mapping[str, Any]], *,
+                      coerce: bool = False) -> Tuple[List[Optional[Dict[str, Any]]], RowErrors]:
+        """
+        Validates many records column by column with the same rules as the
+        property setters. Returns normalized field dicts aligned with the input
+        (``None`` where the row failed) and (row index, message) errors.
+        With ``coerce=True`` the from_dict conversions (int/float/bool) run first.
+        """
+        rows = list(records)
+        columns, errors = cls._validate_columns(rows, coerce)
+        fields = cls._batch_fields()
+        values: List[Optional[Dict[str, Any]]] = [
+            None if i in errors else {field: columns[field][i] for field in fields}
+            for i in range(len(rows))
+        ]
+        return values, sorted(errors.items())
+
+    @classmethod
+    def from_records(cls, records: Iterable[Mapping[str, Any]]) -> Tuple[List["RescueAnimal"], RowErrors]:
+        """
+        Batch equivalent of from_dict: validates every record in one pass and
+        builds instances without going back through the property setters.
+        Returns the animals for the valid rows and (row index, message) errors.
+        """
+        rows = list(records)
+        columns, errors = cls._validate_columns(rows, coerce=True)
+        today = date.today().isoformat()
+        extra = cls._extra_field
+        extra_column = columns[extra] if extra else []
+        animals = []
+        for i, (row, name, gender, age, weight, acq_country, training, reserved, service) in enumerate(
+                zip(rows, *(columns[field] for field, _ in cls._FIELD_KINDS))):
+            if i in errors:
+                continue
+            obj = cls.__new__(cls)
+            obj._name = name
+            obj._gender = gender
+            obj._age = age
+            obj._weight = weight
+            obj._acquisition_country = acq_country
+            obj._training_status = training
+            obj._reserved = reserved
+            obj._in_service_country = service
+            obj._acquisition_date = row["acquisition_date"] if "acquisition_date" in row else today
+            if extra:
+                setattr(obj, extra, extra_column[i])
+            animals.append(obj)
+        return animals, sorted(errors.items())
+
     def __repr__(self) -> str:
         return f"<{self.__class__.__name__} name={self.name!r} age={self.age} reserved={self.reserved}>"
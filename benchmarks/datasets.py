@@ -0,0 +1,47 @@
+"""
+benchmarks.datasets
+Deterministic synthetic animal records for benchmarking
+"""
+
+import random
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator
+
+NAMES = ["Rex", "Buddy", "Max", "Luna", "Zuri", "Kiki", "Bella", "Rocky", "Coco", "Milo",
+         "Nala", "Simba", "Ollie", "Daisy", "Bruno", "Pepper"]
+BREEDS = ["Labrador", "German Shepherd", "Beagle", "Border Collie", "Belgian Malinois",
+          "Golden Retriever", "Bloodhound", "Doberman"]
+SPECIES = ["Capuchin", "Guenon", "Macaque", "Marmoset", "Squirrel Monkey", "Tamarin"]
+COUNTRIES = ["USA", "Canada", "Brazil", "Peru", "Mexico", "Germany", "Kenya", "India",
+             "Australia", "Japan"]
+TRAINING = ["Not Trained", "In Training", "Fully Trained"]
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+
+def generate_animals(count: int, seed: int = 499, monkey_ratio: float = 0.3) -> Iterator[Dict[str, Any]]:
+    """
+    Yields ``count`` valid Dog/Monkey documents (as produced by ``to_dict``).
+    The same seed always produces the same sequence.
+    """
+    rng = random.Random(seed)
+    start = date(2020, 1, 1)
+    for i in range(count):
+        is_monkey = rng.random() < monkey_ratio
+        record = {
+            "name": f"{rng.choice(NAMES)} {i}",
+            "animal_type": "Monkey" if is_monkey else "Dog",
+            "gender": rng.choice(["Male", "Female"]),
+            "age": rng.randint(0, 15),
+            "weight": round(rng.uniform(0.5, 12.0) if is_monkey else rng.uniform(5.0, 45.0), 1),
+            "acquisition_date": (start + timedelta(days=rng.randint(0, 1800))).isoformat(),
+            "acquisition_country": rng.choice(COUNTRIES),
+            "training_status": rng.choice(TRAINING),
+            "reserved": rng.random() < 0.2,
+            "in_service_country": rng.choice(COUNTRIES),
+        }
+        if is_monkey:
+            record["species"] = rng.choice(SPECIES)
+        else:
+            record["breed"] = rng.choice(BREEDS)
+        yield record
@@ -0,0 +1,268 @@
+"""
+benchmarks.load_test
+Drives the HTTP service with many concurrent keep-alive clients and reports
+requests per second and latency percentiles
+
+Usage:
+    python -m benchmarks.load_test --clients 32 --duration 10
+    python -m benchmarks.load_test --url http://127.0.0.1:8080 --username admin --password ...
+    python -m benchmarks.load_test --no-cache --no-etag --write-ratio 0.1 --json load.json
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from unittest import mock
+from urllib.parse import urlsplit
+
+from benchmarks.datasets import generate_animals
+
+# Read mix, cycled per client: the GUI's views, a second page, counts and stats
+READ_PATHS = (
+    "/animals?view=all&limit=100",
+    "/animals?view=dogs&limit=100",
+    "/animals?view=monkeys&limit=100",
+    "/animals?view=available&limit=100",
+    "/animals?view=all&limit=100&sort=name",
+    "/counts",
+    "/stats",
+)
+
+LOAD_USER = ("loadtest", "loadtest-password")
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(ordered))) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+class _Client:
+    """
+    One keep-alive connection that remembers ETags and sends If-None-Match.
+    """
+
+    def __init__(self, host: str, port: int, token: str, conditional: bool) -> None:
+        self._host, self._port = host, port
+        self._conn = http.client.HTTPConnection(host, port, timeout=30)
+        self._headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+        self._conditional = conditional
+        self._etags: Dict[str, str] = {}
+
+    def request(self, method: str, path: str, payload: Any = None) -> int:
+        headers = dict(self._headers)
+        if method == "GET" and self._conditional and path in self._etags:
+            headers["If-None-Match"] = self._etags[path]
+        body = json.dumps(payload).encode() if payload is not None else None
+        try:
+            self._conn.request(method, path, body=body, headers=headers)
+            response = self._conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            # Reconnect once; a dropped keep-alive connection is not a server error
+            self._conn.close()
+            self._conn = http.client.HTTPConnection(self._host, self._port, timeout=30)
+            self._conn.request(method, path, body=body, headers=headers)
+            response = self._conn.getresponse()
+            response.read()
+        if response.getheader("ETag"):
+            self._etags[path] = response.getheader("ETag")
+        return response.status
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def login(url: str, username: str, password: str) -> str:
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    try:
+        conn.request("POST", "/login", body=json.dumps({"username": username, "password": password}),
+                     headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        body = json.loads(response.read() or b"{}")
+    finally:
+        conn.close()
+    if response.status != 200:
+        raise RuntimeError(f"login failed ({response.status}): {body.get('error')}")
+    return body["token"]
+
+
+def animal_ids(url: str, token: str, limit: int = 1000) -> List[str]:
+    # Targets for the write share of the mix when testing a running service
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    try:
+        conn.request("GET", f"/animals?limit={limit}", headers={"Authorization": f"Bearer {token}"})
+        body = json.loads(conn.getresponse().read() or b"{}")
+    finally:
+        conn.close()
+    return [animal["_id"] for animal in body.get("animals", [])]
+
+
+def run_load(url: str, token: str, *, clients: int = 16, duration: Optional[float] = 10.0,
+             requests: Optional[int] = None, write_ratio: float = 0.0, conditional: bool = True,
+             write_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Runs ``clients`` threads, each with its own connection, until ``duration``
+    seconds pass or ``requests`` requests in total have been sent. Each client
+    cycles through READ_PATHS; with ``write_ratio`` > 0 that share of requests
+    instead toggles the reserved flag of a few of ``write_ids``, which also
+    invalidates the service's cache. Returns throughput, latency percentiles
+    (seconds) and response counts per status.
+    """
+    parts = urlsplit(url)
+    deadline = time.perf_counter() + duration if duration else None
+    budget = itertools.count() if requests else None
+    lock = threading.Lock()
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    failures: List[str] = []
+    write_every = round(1 / write_ratio) if write_ratio > 0 and write_ids else 0
+
+    def worker(index: int) -> None:
+        client = _Client(parts.hostname, parts.port or 80, token, conditional)
+        local_latencies, local_statuses = [], Counter()
+        paths = itertools.cycle(READ_PATHS[index % len(READ_PATHS):] + READ_PATHS[:index % len(READ_PATHS)])
+        try:
+            for sent in itertools.count(1):
+                if budget is not None and next(budget) >= requests:
+                    break
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+                start = time.perf_counter()
+                if write_every and sent % write_every == 0:
+                    ids = [write_ids[(index + sent + k) % len(write_ids)] for k in range(5)]
+                    status = client.request("POST", "/animals/reserve",
+                                            {"ids": ids, "reserved": bool(sent // write_every % 2)})
+                else:
+                    status = client.request("GET", next(paths))
+                local_latencies.append(time.perf_counter() - start)
+                local_statuses[status] += 1
+        except Exception as exc:  # pylint: disable=broad-except
+            with lock:
+                failures.append(f"client {index}: {exc}")
+        finally:
+            client.close()
+            with lock:
+                latencies.extend(local_latencies)
+                statuses.update(local_statuses)
+
+    elapsed = _run_clients(worker, clients)
+    return _summarize(clients, elapsed, latencies, statuses, failures)
+
+
+def _run_clients(worker: Callable[[int], None], clients: int) -> float:
+    # Starts every client before joining any; returns the wall time
+    threads = [threading.Thread(target=worker, args=(i,), name=f"load-{i}") for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def _summarize(clients: int, elapsed: float, latencies: List[float], statuses: Counter,
+               failures: List[str]) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    return {
+        "clients": clients,
+        "requests": len(ordered),
+        "seconds": elapsed,
+        "requests_per_sec": len(ordered) / elapsed if elapsed else 0.0,
+        "p50": _percentile(ordered, 50),
+        "p90": _percentile(ordered, 90),
+        "p99": _percentile(ordered, 99),
+        "max": ordered[-1] if ordered else 0.0,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "errors": sum(count for status, count in statuses.items() if status >= 400) + len(failures),
+        "failures": failures,
+    }
+
+
+def start_local_service(size: int, cache: bool = True) -> Tuple[Any, str, List[str]]:
+    """
+    An in-process service over mongomock seeded with ``size`` generated
+    animals, plus a load-test user. Returns (server, url, animal ids). The
+    clients share the interpreter with it, so use ``--url`` against a
+    separately started service for absolute numbers.
+    """
+    # pylint: disable=import-outside-toplevel
+    import mongomock
+    from data import database_manager
+    from data.database_manager import AnimalDatabase
+    from data.query_cache import QueryCache
+    from data.service import AnimalService, make_server
+
+    options: Dict[str, Any] = {"database": "load_test", "bcrypt_rounds": 4}
+    if not cache:
+        options["cache"] = QueryCache(maxsize=0)
+    with mock.patch.object(database_manager, "MongoClient", mongomock.MongoClient):
+        db = AnimalDatabase(**options)
+    db.insert_animals(list(generate_animals(size)))
+    db.create_user(*LOAD_USER, role="user", first_login=False)
+    server = make_server(AnimalService(db), port=0)
+    threading.Thread(target=server.serve_forever, name="service-http", daemon=True).start()
+    ids = [str(doc["_id"]) for doc in db.collection.find({}, {"_id": 1}).limit(1000)]
+    return server, f"http://127.0.0.1:{server.server_port}", ids
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    return (f"{result['requests']} requests from {result['clients']} clients in {result['seconds']:.2f}s: "
+            f"{result['requests_per_sec']:,.0f} req/s, p50 {result['p50'] * 1000:.1f} ms, "
+            f"p90 {result['p90'] * 1000:.1f} ms, p99 {result['p99'] * 1000:.1f} ms, "
+            f"max {result['max'] * 1000:.1f} ms; statuses {result['statuses']}, errors {result['errors']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the animal HTTP service")
+    parser.add_argument("--url", default=None, help="running service; default starts one over mongomock")
+    parser.add_argument("--username", default=os.getenv("LOAD_TEST_USER", "admin"))
+    parser.add_argument("--password", default=os.getenv("LOAD_TEST_PASSWORD"))
+    parser.add_argument("--size", type=int, default=10_000, help="animals in the local service")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--requests", type=int, default=None, help="stop after this many instead")
+    parser.add_argument("--write-ratio", type=float, default=0.0)
+    parser.add_argument("--no-etag", action="store_true", help="never send If-None-Match")
+    parser.add_argument("--no-cache", action="store_true", help="local service without its query cache")
+    parser.add_argument("--json", default=None, help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    server, ids = None, []
+    if args.url:
+        url, token = args.url, login(args.url, args.username, args.password or "")
+        if args.write_ratio:
+            ids = animal_ids(url, token)
+    else:
+        server, url, ids = start_local_service(args.size, cache=not args.no_cache)
+        token = login(url, *LOAD_USER)
+
+    results = []
+    try:
+        for clients in args.clients:
+            result = run_load(url, token, clients=clients, duration=None if args.requests else args.duration,
+                              requests=args.requests, write_ratio=args.write_ratio,
+                              conditional=not args.no_etag, write_ids=ids)
+            results.append(result)
+            print(format_result(result))
+    finally:
+        if server is not None:
+            server.shutdown()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,461 @@
+"""
+benchmarks.run
+Benchmarks the domain model, the data layer, the table render, bcrypt auth and
+start-up imports, and stores the results as JSON so runs from different commits
+can be compared
+
+Usage:
+    python -m benchmarks.run --sizes 1000 10000
+    python -m benchmarks.run --backend mongod --mongo-uri mongodb://localhost:27017
+    python -m benchmarks.run --compare benchmarks/results/<baseline>.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from unittest import mock
+from typing import Any, Callable, Dict, List, Optional
+
+from animals.animal_batch import AnimalBatch
+from animals.dog import Dog
+from animals.monkey import Monkey
+from benchmarks.datasets import generate_animals
+from data import database_manager
+from data.async_database import AsyncAnimalDatabase, ThreadedAsyncClient
+from data.database_manager import APP_QUERIES, DISPLAY_PROJECTION, AnimalDatabase
+from data.query_cache import QueryCache
+from data.search_index import SearchIndex
+from data.user_provisioning import provision_users
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+CLASSES = {"Dog": Dog, "Monkey": Monkey}
+
+Case = Callable[["Context"], int]
+
+
+class SkipCase(Exception):
+    pass
+
+
+CASES: Dict[str, Case] = {}
+
+
+def case(name: str):
+    def register(fn: Case) -> Case:
+        CASES[name] = fn
+        return fn
+    return register
+
+
+class Context:
+    """
+    State shared by the cases for one dataset size. The database is created
+    lazily so model-only runs never touch MongoDB.
+    """
+
+    def __init__(self, size: int, backend: str, mongo_uri: Optional[str], row_limit: int) -> None:
+        self.size = size
+        self.backend = backend
+        self.mongo_uri = mongo_uri
+        self.row_limit = row_limit
+        self.records = list(generate_animals(size))
+        self.kwargs = [_constructor_kwargs(r) for r in self.records]
+        self.animals: List[Any] = []
+        self._db: Optional[AnimalDatabase] = None
+
+    @property
+    def db(self) -> AnimalDatabase:
+        if self._db is None:
+            options = {"mongo_uri": self.mongo_uri, "database": f"bench_{self.size}",
+                       "cache": QueryCache(maxsize=0)}
+            if self.backend == "mongomock":
+                import mongomock  # pylint: disable=import-outside-toplevel
+                with mock.patch.object(database_manager, "MongoClient", mongomock.MongoClient):
+                    self._db = AnimalDatabase(**options)
+            else:
+                self._db = AnimalDatabase(**options)
+            self._db.collection.delete_many({})
+        return self._db
+
+    def async_db(self) -> AsyncAnimalDatabase:
+        """
+        A new AsyncAnimalDatabase on the same data, for use inside one
+        asyncio.run (the driver's client belongs to the loop that uses it).
+        """
+        options = {"database": f"bench_{self.size}", "cache": QueryCache(maxsize=0)}
+        if self.backend == "mongomock":
+            return AsyncAnimalDatabase(client=ThreadedAsyncClient(self.db.client), **options)
+        return AsyncAnimalDatabase(self.mongo_uri, **options)
+
+    def ids(self) -> List[Any]:
+        return [doc["_id"] for doc in self.db.collection.find({}, {"_id": 1}).limit(self.row_limit)]
+
+    def close(self) -> None:
+        if self._db is not None:
+            if self.backend != "mongomock":
+                self._db.client.drop_database(f"bench_{self.size}")
+            self._db.close()
+
+
+def _constructor_kwargs(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in record.items() if k not in {"animal_type", "acquisition_date"}}
+
+
+# ----- domain model -----
+
+@case("model.construct")
+def bench_construct(ctx: Context) -> int:
+    ctx.animals = [CLASSES[r["animal_type"]](**kw) for r, kw in zip(ctx.records, ctx.kwargs)]
+    return len(ctx.animals)
+
+
+@case("model.to_dict")
+def bench_to_dict(ctx: Context) -> int:
+    if not ctx.animals:
+        bench_construct(ctx)
+    for animal in ctx.animals:
+        animal.to_dict()
+    return len(ctx.animals)
+
+
+@case("model.from_dict")
+def bench_from_dict(ctx: Context) -> int:
+    for record in ctx.records:
+        CLASSES[record["animal_type"]].from_dict(record)
+    return len(ctx.records)
+
+
+@case("model.from_records")
+def bench_from_records(ctx: Context) -> int:
+    count = 0
+    for animal_type, cls in CLASSES.items():
+        animals, _ = cls.from_records(r for r in ctx.records if r["animal_type"] == animal_type)
+        count += len(animals)
+    return count
+
+
+@case("model.animal_batch")
+def bench_animal_batch(ctx: Context) -> int:
+    batch = AnimalBatch(ctx.records)
+    batch.filter(animal_type="Dog", reserved=False)
+    return len(batch)
+
+
+@case("model.search_index")
+def bench_search_index(ctx: Context) -> int:
+    index = SearchIndex()
+    for i, record in enumerate(ctx.records):
+        index.add(str(i), record)
+    for text in ("b", "be", "bea", "ger can", "zzz"):
+        index.search(text)
+    return len(ctx.records)
+
+
+# ----- data layer (order matters: later cases use the rows inserted here) -----
+
+@case("db.insert_one")
+def bench_insert_one(ctx: Context) -> int:
+    rows = [dict(r) for r in ctx.records[:ctx.row_limit]]
+    for row in rows:
+        ctx.db.create_animal(row)
+    ctx.db.collection.delete_many({})
+    return len(rows)
+
+
+@case("db.insert_many")
+def bench_insert_many(ctx: Context) -> int:
+    batch = 1000
+    for start in range(0, ctx.size, batch):
+        ctx.db.insert_animals([dict(r) for r in ctx.records[start:start + batch]])
+    return ctx.size
+
+
+@case("db.read_all_animals")
+def bench_read_all(ctx: Context) -> int:
+    return len(ctx.db.read_all_animals(projection=DISPLAY_PROJECTION))
+
+
+@case("db.page_scan")
+def bench_page_scan(ctx: Context) -> int:
+    count, after = 0, None
+    while True:
+        page, after = ctx.db.find_animals_page(after=after, limit=200, projection=DISPLAY_PROJECTION)
+        count += len(page)
+        if after is None:
+            return count
+
+
+@case("db.page_scan.sorted")
+def bench_sorted_page_scan(ctx: Context) -> int:
+    count, after = 0, None
+    while True:
+        page, after = ctx.db.find_animals_page(after=after, limit=200, projection=DISPLAY_PROJECTION,
+                                               sort=[("name", -1), ("_id", -1)])
+        count += len(page)
+        if after is None:
+            return count
+
+
+def _query_case(label: str) -> Case:
+    def run(ctx: Context) -> int:
+        return sum(1 for _ in ctx.db.iter_animals(APP_QUERIES[label], projection=DISPLAY_PROJECTION))
+    return run
+
+
+for _label in APP_QUERIES:
+    case(f"db.query.{_label}")(_query_case(_label))
+
+
+@case("db.animal_stats")
+def bench_animal_stats(ctx: Context) -> int:
+    return ctx.db.animal_stats(use_cache=False)["total"]
+
+
+# The counts and first pages the GUI needs for its views, issued one after
+# another on the blocking class and all at once on the async one
+
+COUNT_VIEWS = {label: APP_QUERIES[label] for label in ("dogs", "monkeys", "available")}
+READ_ROUNDS = 10
+
+
+@case("db.count_views")
+def bench_count_views(ctx: Context) -> int:
+    for _ in range(READ_ROUNDS):
+        ctx.db.count_animals_many(COUNT_VIEWS)
+    return READ_ROUNDS * len(COUNT_VIEWS)
+
+
+@case("db.count_views.async")
+def bench_count_views_async(ctx: Context) -> int:
+    async def run() -> None:
+        db = ctx.async_db()
+        await asyncio.gather(*(db.count_animals_many(COUNT_VIEWS) for _ in range(READ_ROUNDS)))
+        await db.close()
+    asyncio.run(run())
+    return READ_ROUNDS * len(COUNT_VIEWS)
+
+
+@case("db.first_pages")
+def bench_first_pages(ctx: Context) -> int:
+    for _ in range(READ_ROUNDS):
+        for query in APP_QUERIES.values():
+            ctx.db.find_animals_page(query, projection=DISPLAY_PROJECTION)
+    return READ_ROUNDS * len(APP_QUERIES)
+
+
+@case("db.first_pages.async")
+def bench_first_pages_async(ctx: Context) -> int:
+    async def run() -> None:
+        db = ctx.async_db()
+        await asyncio.gather(*(db.find_animals_page(query, projection=DISPLAY_PROJECTION)
+                               for _ in range(READ_ROUNDS) for query in APP_QUERIES.values()))
+        await db.close()
+    asyncio.run(run())
+    return READ_ROUNDS * len(APP_QUERIES)
+
+
+@case("db.update_one")
+def bench_update_one(ctx: Context) -> int:
+    ids = ctx.ids()
+    for animal_id in ids:
+        ctx.db.update_animal(animal_id, {"age": 1})
+    return len(ids)
+
+
+@case("db.set_reserved_many")
+def bench_set_reserved_many(ctx: Context) -> int:
+    ids = ctx.ids()
+    ctx.db.set_reserved_many(ids, True)
+    return len(ids)
+
+
+@case("db.delete_one")
+def bench_delete_one(ctx: Context) -> int:
+    ids = ctx.ids()[: ctx.row_limit // 2]
+    for animal_id in ids:
+        ctx.db.delete_animal(animal_id)
+    return len(ids)
+
+
+@case("db.delete_many")
+def bench_delete_many(ctx: Context) -> int:
+    ids = ctx.ids()
+    return ctx.db.delete_animals(ids)
+
+
+# ----- GUI and auth -----
+
+@case("gui.display_animals")
+def bench_display(ctx: Context) -> int:
+    import tkinter as tk  # pylint: disable=import-outside-toplevel
+    from gui.app import AnimalApp  # pylint: disable=import-outside-toplevel
+    from gui.virtual_table import VirtualTable  # pylint: disable=import-outside-toplevel
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as exc:
+        raise SkipCase(f"no display: {exc}") from exc
+    try:
+        root.withdraw()
+        docs = [dict(r, _id=i) for i, r in enumerate(ctx.records)]
+        table = VirtualTable(root, [f"col{i}" for i in range(11)], {})
+        table.load(AnimalApp._animal_row(doc) for doc in docs)  # pylint: disable=protected-access
+        root.update_idletasks()
+        return len(docs)
+    finally:
+        root.destroy()
+
+
+@case("startup.import_app")
+def bench_import_app(_ctx: Context) -> int:
+    # A fresh interpreter each time; the import cost is what delays the first paint
+    subprocess.run([sys.executable, "-c", "import gui.app"], cwd=os.path.dirname(os.path.dirname(RESULTS_DIR)), check=True)
+    return 1
+
+
+@case("auth.bcrypt")
+def bench_bcrypt(ctx: Context) -> int:
+    rounds = 5
+    ctx.db.users.delete_many({"username": {"$regex": "^bench"}})
+    ctx.db.create_user("bench", "benchpass", first_login=False)
+    for _ in range(rounds):
+        ctx.db.authenticate_user("bench", "benchpass")
+    return rounds
+
+
+@case("auth.reauthenticate")
+def bench_reauthenticate(ctx: Context) -> int:
+    rounds = 1000
+    ctx.db.users.delete_many({"username": "bench_session"})
+    ctx.db.create_user("bench_session", "benchpass", first_login=False)
+    _, _, token = ctx.db.login("bench_session", "benchpass")
+    for _ in range(rounds):
+        ctx.db.reauthenticate(token, "bench_session", "benchpass")
+    return rounds
+
+
+@case("auth.provision_users")
+def bench_provision_users(ctx: Context) -> int:
+    count = 32
+    ctx.db.users.delete_many({"username": {"$regex": "^bench_staff"}})
+    records = [(i, {"username": f"bench_staff{i}", "password": "benchpass"}) for i in range(count)]
+    provision_users(ctx.db, records)
+    return count
+
+
+def run_suite(sizes: List[int], cases: List[str], backend: str = "mongomock",
+              mongo_uri: Optional[str] = None, repeat: int = 3,
+              row_limit: int = 10_000) -> List[Dict[str, Any]]:
+    results = []
+    for size in sizes:
+        ctx = Context(size, backend, mongo_uri, min(row_limit, size))
+        try:
+            for name in cases:
+                # Stateful DB cases run once; pure model cases take the best of ``repeat``
+                attempts = repeat if name.startswith("model.") else 1
+                best = None
+                try:
+                    for _ in range(attempts):
+                        start = time.perf_counter()
+                        ops = CASES[name](ctx)
+                        elapsed = time.perf_counter() - start
+                        best = elapsed if best is None else min(best, elapsed)
+                except SkipCase as exc:
+                    print(f"{name:<26} n={size:<8} skipped ({exc})")
+                    continue
+                results.append({
+                    "name": name,
+                    "size": size,
+                    "ops": ops,
+                    "seconds": best,
+                    "ops_per_sec": ops / best if best else 0.0,
+                })
+                print(f"{name:<26} n={size:<8} {results[-1]['ops_per_sec']:>12,.0f} ops/s")
+        finally:
+            ctx.close()
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: List[Dict[str, Any]], baseline: List[Dict[str, Any]],
+            threshold: float = 0.10) -> List[Dict[str, Any]]:
+    """
+    Pairs results by (name, size) and returns those whose throughput dropped by
+    more than ``threshold`` relative to the baseline.
+    """
+    before = {(r["name"], r["size"]): r["ops_per_sec"] for r in baseline}
+    regressions = []
+    for result in current:
+        old = before.get((result["name"], result["size"]))
+        if old and result["ops_per_sec"] < old * (1 - threshold):
+            regressions.append({**result, "baseline_ops_per_sec": old,
+                                "change": result["ops_per_sec"] / old - 1})
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the animal rescue benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--cases", nargs="+", default=None,
+                        help="case names or prefixes (e.g. model. db.query)")
+    parser.add_argument("--backend", choices=["mongomock", "mongod"], default="mongomock")
+    parser.add_argument("--mongo-uri", default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--row-limit", type=int, default=10_000,
+                        help="cap for one-call-per-row cases such as insert_one")
+    parser.add_argument("--output", default=None, help="defaults to results/<commit>.json")
+    parser.add_argument("--compare", default=None, help="baseline results file")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    # The data layer logs every insert at INFO; keep that out of the results table
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+
+    selected = [name for name in CASES
+                if not args.cases or any(name.startswith(prefix) for prefix in args.cases)]
+    results = run_suite(args.sizes, selected, args.backend, args.mongo_uri,
+                        args.repeat, args.row_limit)
+
+    commit = _git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": args.backend,
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"Wrote {len(results)} results to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            baseline = json.load(handle)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for reg in regressions:
+            print(f"REGRESSION {reg['name']} n={reg['size']}: "
+                  f"{reg['ops_per_sec']:.0f} vs {reg['baseline_ops_per_sec']:.0f} ops/s "
+                  f"({reg['change']:+.1%})")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,532 @@
+"""
+data.async_database
+asyncio counterpart of AnimalDatabase on pymongo's native async driver,
+so many reads can be in flight at once from a single thread
+"""
+
+import asyncio
+import copy
+import functools
+import itertools
+import logging
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple, Union
+
+from bson.objectid import ObjectId
+from pymongo import AsyncMongoClient, IndexModel, errors
+
+from data.auth import DEFAULT_SESSION_TTL, SessionStore, check_password, configured_rounds, hash_password, hash_rounds
+from data.database_manager import (
+    ANIMAL_INDEXES, DEFAULT_PAGE_SIZE, DUPLICATE_KEY, EMPTY_STATS, STAT_FIELDS,
+    AnimalDatabase, SortSpec, utcnow
+)
+from data.metrics import METRICS, MetricsRegistry, instrumented
+from data.query_cache import QueryCache, freeze
+from data.search_index import SEARCH_FIELDS, search_words
+
+# Query building and result shaping are shared with the blocking class
+# pylint: disable=protected-access
+
+
+class AsyncAnimalDatabase:  # pylint: disable=too-many-public-methods
+    """
+    The animal and user operations of AnimalDatabase as coroutines, with the
+    same arguments and return values. Errors are logged and reported as
+    False / 0 / empty results, except that ``iter_animals`` raises on a failed
+    page. Unlike AnimalDatabase, calls are not routed through Resilience (no
+    retries or circuit breaker), a read that fails while the server is
+    unreachable gets no stale cached result, and ``raise_errors`` is not
+    offered. Independent calls can be awaited together, e.g.
+    ``count_animals_many`` runs its counts concurrently.
+
+    ``client`` defaults to a pymongo AsyncMongoClient for ``mongo_uri``; tests
+    pass a ThreadedAsyncClient around mongomock instead. Pass the blocking
+    database's ``cache`` to share cached pages with it. Index creation and the
+    admin bootstrap stay with AnimalDatabase (``ensure_indexes`` is here for
+    processes that only use this class). Use an instance from one event loop.
+    """
+
+    def __init__(
+        self,
+        mongo_uri: Optional[str] = None,
+        database: str = "rescue_animals_db",
+        collection: str = "animals",
+        user_collection: str = "users",
+        *,
+        max_pool_size: Optional[int] = None,
+        cache: Optional[QueryCache] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        bcrypt_rounds: Optional[int] = None,
+        session_ttl: float = DEFAULT_SESSION_TTL,
+        client: Any = None,
+    ) -> None:
+        if client is None:
+            options: Dict[str, Any] = {"serverSelectionTimeoutMS": 3000}
+            pool_size = max_pool_size or os.getenv("MONGO_MAX_POOL_SIZE")
+            if pool_size:
+                options["maxPoolSize"] = int(pool_size)
+            client = AsyncMongoClient(mongo_uri or os.getenv("MONGO_URI", "mongodb://localhost:27017"),
+                                      **options)
+        self.client = client
+        db = client[database]
+        self.collection = db[collection]
+        self.users = db[user_collection]
+        self.tombstones = db[f"{collection}_tombstones"]
+        self.cache = cache if cache is not None else QueryCache()
+        self.metrics = metrics if metrics is not None else METRICS
+        self._bcrypt_rounds = bcrypt_rounds
+        self.sessions = SessionStore(session_ttl)
+
+    async def connect(self) -> "AsyncAnimalDatabase":
+        """
+        Pings the server (the driver itself connects lazily). Raises
+        RuntimeError like AnimalDatabase when it cannot be reached.
+        """
+        try:
+            await self.client.admin.command("ping")
+        except errors.ConnectionFailure as exc:
+            logging.error("Failed to connect to MongoDB: %s", exc)
+            raise RuntimeError("Unable to connect to MongoDB") from exc
+        return self
+
+    async def close(self) -> None:
+        await self.client.close()
+
+    async def ensure_indexes(self) -> List[str]:
+        models = [IndexModel(spec["keys"], name=spec["name"], **spec.get("options", {}))
+                  for spec in ANIMAL_INDEXES]
+        return await self.collection.create_indexes(models)
+
+    # ----- users -----
+
+    is_admin = staticmethod(AnimalDatabase.is_admin)
+
+    @property
+    def bcrypt_rounds(self) -> int:
+        if self._bcrypt_rounds is None:
+            self._bcrypt_rounds = configured_rounds()
+        return self._bcrypt_rounds
+
+    @instrumented("async.authenticate_user")
+    async def authenticate_user(self, username: str, password: str) -> Tuple[Optional[Dict], bool]:
+        user = await self.users.find_one({"username": username})
+        # bcrypt would stall the event loop, so it runs on a thread
+        if user and await asyncio.to_thread(check_password, password, user["password"]):
+            if hash_rounds(user["password"]) < self.bcrypt_rounds:
+                try:
+                    await self._store_password(user["_id"], password)
+                except errors.PyMongoError as exc:
+                    logging.warning("Failed to rehash password for %s: %s", username, exc)
+            return user, bool(user.get("is_first_login"))
+        return None, False
+
+    async def login(self, username: str, password: str) -> Tuple[Optional[Dict], bool, Optional[str]]:
+        user, first_login = await self.authenticate_user(username, password)
+        if user is None:
+            return None, False, None
+        return user, first_login, self.sessions.open(user, password)
+
+    @instrumented("async.reauthenticate")
+    async def reauthenticate(self, token: Optional[str], username: str, password: str) -> Optional[Dict]:
+        user = self.sessions.verify(token, password)
+        if user is not None and user["username"] == username:
+            return user
+        user, _ = await self.authenticate_user(username, password)
+        return user
+
+    def session_user(self, token: Optional[str]) -> Optional[Dict]:
+        return self.sessions.user(token)
+
+    def logout(self, token: Optional[str]) -> None:
+        self.sessions.close(token)
+
+    async def _store_password(self, user_id: Any, password: str, **extra: Any) -> None:
+        hashed = await asyncio.to_thread(hash_password, password, self.bcrypt_rounds)
+        await self.users.update_one({"_id": user_id}, {"$set": {"password": hashed, **extra}})
+
+    @instrumented("async.set_password")
+    async def set_password(self, user: Dict[str, Any], password: str) -> str:
+        await self._store_password(user["_id"], password, is_first_login=False)
+        self.sessions.close_user(user["username"])
+        return self.sessions.open({**user, "is_first_login": False}, password)
+
+    @instrumented("async.create_user")
+    async def create_user(self, username: str, password: str, role: str = "user", *,
+                          first_login: bool = True) -> None:
+        if role not in {"user", "admin"}:
+            raise ValueError("Role must be 'user' or 'admin'")
+        hashed = await asyncio.to_thread(hash_password, password, self.bcrypt_rounds)
+        try:
+            await self.users.insert_one({"username": username, "password": hashed, "role": role,
+                                         "is_first_login": first_login})
+            logging.info("User %s created with role %s", username, role)
+        except errors.DuplicateKeyError as exc:
+            raise ValueError(f"User {username} already exists") from exc
+
+    @instrumented("async.insert_users", count=lambda result: result[0])
+    async def insert_users(self, users: List[Dict[str, Any]]) -> Tuple[int, List[Tuple[int, str]]]:
+        if not users:
+            return 0, []
+        try:
+            result = await self.users.insert_many(users, ordered=False)
+            return len(result.inserted_ids), []
+        except errors.BulkWriteError as exc:
+            failures = []
+            for err in exc.details.get("writeErrors", []):
+                if err.get("code") == DUPLICATE_KEY:
+                    failures.append((err["index"], f"user {users[err['index']].get('username')} already exists"))
+                else:
+                    self.metrics.mark_failed()
+                    failures.append((err["index"], err.get("errmsg", "write error")))
+            return exc.details.get("nInserted", 0), failures
+        except errors.PyMongoError as exc:
+            logging.error("Failed to insert users: %s", exc)
+            self.metrics.mark_failed()
+            return 0, [(i, str(exc)) for i in range(len(users))]
+
+    # ----- animals: reads -----
+
+    @instrumented("async.find_animals_page", count=lambda result: len(result[0]))
+    async def find_animals_page(
+        self,
+        query: Optional[Dict] = None,
+        *,
+        after: Optional[Sequence[Any]] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        sort: Optional[SortSpec] = None,
+        projection: Optional[Dict[str, int]] = None,
+        use_cache: bool = True,
+    ) -> Tuple[List[Dict], Optional[Tuple[Any, ...]]]:
+        """
+        See AnimalDatabase.find_animals_page; cache keys are the same, so a
+        shared cache serves pages to both classes.
+        """
+        try:
+            return await self._read_page(query, after, limit, sort=sort, projection=projection,
+                                         use_cache=use_cache)
+        except errors.PyMongoError as exc:
+            logging.error("Failed to read animals: %s", exc)
+            self.metrics.mark_failed()
+            return [], None
+
+    async def _read_page(
+        self,
+        query: Optional[Dict],
+        after: Optional[Sequence[Any]],
+        limit: int,
+        *,
+        sort: Optional[SortSpec],
+        projection: Optional[Dict[str, int]],
+        use_cache: bool,
+    ) -> Tuple[List[Dict], Optional[Tuple[Any, ...]]]:
+        key = freeze((query or {}, after, limit, sort, projection)) if use_cache else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return [dict(doc) for doc in cached[0]], cached[1]
+
+        sort_keys = AnimalDatabase._normalize_sort(sort)
+        if projection is not None:
+            projection = {**projection, **{field: 1 for field, _ in sort_keys}}
+
+        criteria = dict(query or {})
+        if after is not None:
+            keyset = AnimalDatabase._keyset_filter(sort_keys, after)
+            criteria = {"$and": [criteria, keyset]} if criteria else keyset
+
+        docs = await self.collection.find(criteria, projection).sort(sort_keys).limit(limit).to_list()
+        next_after = None
+        if len(docs) == limit:
+            next_after = tuple(docs[-1].get(field) for field, _ in sort_keys)
+        if key is not None:
+            self.cache.put(key, ([dict(doc) for doc in docs], next_after))
+        return docs, next_after
+
+    async def iter_animals(
+        self,
+        query: Optional[Dict] = None,
+        *,
+        batch_size: int = DEFAULT_PAGE_SIZE,
+        sort: Optional[SortSpec] = None,
+        projection: Optional[Dict[str, int]] = None,
+        use_cache: bool = True,
+    ) -> AsyncIterator[Dict]:
+        # Like AnimalDatabase.iter_animals, a page that cannot be read raises
+        after = None
+        while True:
+            docs, after = await self._read_page(query, after, batch_size, sort=sort, projection=projection,
+                                                    use_cache=use_cache)
+            for doc in docs:
+                yield doc
+            if after is None:
+                return
+
+    @instrumented("async.read_all_animals", count=len)
+    async def read_all_animals(
+        self,
+        query: Optional[Dict] = None,
+        projection: Optional[Dict[str, int]] = None,
+        sort: Optional[SortSpec] = None,
+    ) -> List[Dict]:
+        try:
+            return [doc async for doc in self.iter_animals(query, sort=sort, projection=projection)]
+        except errors.PyMongoError as exc:
+            logging.error("Failed to read animals: %s", exc)
+            self.metrics.mark_failed()
+            return []
+
+    @instrumented("async.count_animals")
+    async def count_animals(self, query: Optional[Dict] = None, *, use_cache: bool = True) -> int:
+        key = freeze(("count_animals", query or {})) if use_cache else None
+        cached = self.cache.get(key) if key is not None else None
+        if cached is not None:
+            return cached
+        try:
+            count = await self.collection.count_documents(dict(query or {}))
+        except errors.PyMongoError as exc:
+            logging.error("Failed to count animals: %s", exc)
+            self.metrics.mark_failed()
+            return 0
+        if key is not None:
+            self.cache.put(key, count)
+        return count
+
+    async def count_animals_many(self, queries: Dict[str, Optional[Dict]]) -> Dict[str, int]:
+        """
+        Counts for several labelled queries, all in flight at once, e.g.
+        ``{label: APP_QUERIES[label] for label in ("dogs", "monkeys", "available")}``.
+        """
+        counts = await asyncio.gather(*(self.count_animals(query) for query in queries.values()))
+        return dict(zip(queries, counts))
+
+    @instrumented("async.animal_stats")
+    async def animal_stats(
+        self,
+        query: Optional[Dict] = None,
+        *,
+        group_by: Sequence[str] = STAT_FIELDS,
+        use_cache: bool = True,
+    ) -> Dict[str, Any]:
+        group_by = tuple(group_by)
+        key = freeze(("animal_stats", query or {}, group_by)) if use_cache else None
+        facets = self.cache.get(key) if key is not None else None
+        if facets is None:
+            try:
+                cursor = await self.collection.aggregate(AnimalDatabase._stats_pipeline(query, group_by))
+                results = await cursor.to_list()
+                facets = results[0]
+            except (errors.PyMongoError, IndexError) as exc:
+                logging.error("Failed to aggregate animal statistics: %s", exc)
+                self.metrics.mark_failed()
+                return copy.deepcopy(EMPTY_STATS)
+            if key is not None:
+                self.cache.put(key, facets)
+        return AnimalDatabase._stats_result(facets, group_by)
+
+    # ----- animals: writes -----
+
+    @instrumented("async.create_animal")
+    async def create_animal(self, animal_data: Dict[str, Any]) -> bool:
+        animal_data["updated_at"] = utcnow()
+        animal_data["search_keys"] = search_words(animal_data)
+        try:
+            await self.collection.insert_one(animal_data)
+            logging.info("Animal inserted: %s", animal_data.get("name"))
+            return True
+        except errors.PyMongoError as exc:
+            logging.error("Failed to insert animal: %s", exc)
+            self.metrics.mark_failed()
+            return False
+        finally:
+            self.cache.invalidate()
+
+    @instrumented("async.insert_animals", count=lambda result: result[0])
+    async def insert_animals(self, animals: List[Dict[str, Any]]) -> Tuple[int, List[Tuple[int, str]]]:
+        if not animals:
+            return 0, []
+        stamp = utcnow()
+        for animal in animals:
+            animal["updated_at"] = stamp
+            animal["search_keys"] = search_words(animal)
+        try:
+            result = await self.collection.insert_many(animals, ordered=False)
+            return len(result.inserted_ids), []
+        except errors.BulkWriteError as exc:
+            self.metrics.mark_failed()
+            failures = [(err["index"], err.get("errmsg", "write error"))
+                        for err in exc.details.get("writeErrors", [])]
+            return exc.details.get("nInserted", 0), failures
+        except errors.PyMongoError as exc:
+            logging.error("Failed to insert animals: %s", exc)
+            self.metrics.mark_failed()
+            return 0, [(i, str(exc)) for i in range(len(animals))]
+        finally:
+            self.cache.invalidate()
+
+    async def _refresh_search_keys(self, ids: List[ObjectId]) -> None:
+        docs = await self.collection.find({"_id": {"$in": ids}},
+                                          {field: 1 for field in SEARCH_FIELDS}).to_list()
+        await asyncio.gather(*(self.collection.update_one(
+            {"_id": doc["_id"]}, {"$set": {"search_keys": search_words(doc)}}) for doc in docs))
+
+    @instrumented("async.update_animal")
+    async def update_animal(self, animal_id: Union[str, ObjectId], updated_fields: Dict[str, Any]) -> bool:
+        _, modified = await self._update({"_id": ObjectId(animal_id)}, [ObjectId(animal_id)],
+                                               updated_fields, many=False)
+        return modified > 0
+
+    @instrumented("async.update_animals", count=lambda result: result[1])
+    async def update_animals(self, animal_ids: List[Union[str, ObjectId]],
+                             updated_fields: Dict[str, Any]) -> Tuple[int, int]:
+        if not animal_ids or not updated_fields:
+            return 0, 0
+        ids = [ObjectId(animal_id) for animal_id in animal_ids]
+        return await self._update({"_id": {"$in": ids}}, ids, updated_fields, many=True)
+
+    async def _update(self, criteria: Dict[str, Any], ids: List[ObjectId],
+                      updated_fields: Dict[str, Any], many: bool) -> Tuple[int, int]:
+        update = self.collection.update_many if many else self.collection.update_one
+        try:
+            result = await update(criteria, {"$set": {**updated_fields, "updated_at": utcnow()}})
+            if result.modified_count and any(field in updated_fields for field in SEARCH_FIELDS):
+                await self._refresh_search_keys(ids)
+            return result.matched_count, result.modified_count
+        except errors.PyMongoError as exc:
+            logging.error("Failed to update %s: %s", "animals" if many else "animal", exc)
+            self.metrics.mark_failed()
+            return 0, 0
+        finally:
+            self.cache.invalidate()
+
+    @instrumented("async.set_reserved_many", count=lambda result: result[1])
+    async def set_reserved_many(self, animal_ids: List[Union[str, ObjectId]],
+                                reserved: bool) -> Tuple[int, int]:
+        if not animal_ids:
+            return 0, 0
+        ids = [ObjectId(animal_id) for animal_id in animal_ids]
+        try:
+            result = await self.collection.update_many({"_id": {"$in": ids}},
+                                                       AnimalDatabase._reserve_update(reserved))
+            return result.matched_count, result.modified_count
+        except errors.PyMongoError as exc:
+            logging.error("Failed to update animals: %s", exc)
+            self.metrics.mark_failed()
+            return 0, 0
+        finally:
+            self.cache.invalidate()
+
+    @instrumented("async.delete_animal")
+    async def delete_animal(self, animal_id: Union[str, ObjectId]) -> bool:
+        return await self.delete_animals([animal_id]) > 0
+
+    @instrumented("async.delete_animals", count=lambda deleted: deleted)
+    async def delete_animals(self, animal_ids: List[Union[str, ObjectId]]) -> int:
+        if not animal_ids:
+            return 0
+        ids = [ObjectId(animal_id) for animal_id in animal_ids]
+        try:
+            result = await self.collection.delete_many({"_id": {"$in": ids}})
+            if result.deleted_count:
+                stamp = utcnow()
+                await self.tombstones.insert_many(
+                    [{"animal_id": animal_id, "deleted_at": stamp} for animal_id in ids], ordered=False)
+            return result.deleted_count
+        except errors.PyMongoError as exc:
+            logging.error("Failed to delete animals: %s", exc)
+            self.metrics.mark_failed()
+            return 0
+        finally:
+            self.cache.invalidate()
+
+
+_shared_async_db: Optional[AsyncAnimalDatabase] = None
+
+
+def get_async_database(**kwargs: Any) -> AsyncAnimalDatabase:
+    """
+    Returns the process-wide AsyncAnimalDatabase, creating it on first use.
+    Call it from the event loop that will use it (the GUI's TaskRunner loop).
+    Keyword arguments only apply to the call that creates the instance.
+    """
+    global _shared_async_db  # pylint: disable=global-statement
+    if _shared_async_db is None:
+        _shared_async_db = AsyncAnimalDatabase(**kwargs)
+    return _shared_async_db
+
+
+async def close_shared_async_database() -> None:
+    global _shared_async_db  # pylint: disable=global-statement
+    if _shared_async_db is not None:
+        await _shared_async_db.close()
+        _shared_async_db = None
+
+
+# ----- stand-in for blocking drivers -----
+
+class _ThreadedCursor:
+    def __init__(self, cursor: Any) -> None:
+        self._cursor = cursor
+
+    def sort(self, *args: Any, **kwargs: Any) -> "_ThreadedCursor":
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, limit: int) -> "_ThreadedCursor":
+        self._cursor = self._cursor.limit(limit)
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict]:
+        return await asyncio.to_thread(lambda: list(itertools.islice(self._cursor, length)))
+
+
+class _ThreadedCollection:
+    def __init__(self, collection: Any) -> None:
+        self._collection = collection
+
+    def find(self, *args: Any, **kwargs: Any) -> _ThreadedCursor:
+        # A blocking cursor does no I/O until it is iterated, in to_list()
+        return _ThreadedCursor(self._collection.find(*args, **kwargs))
+
+    async def aggregate(self, pipeline: List[Dict[str, Any]], **kwargs: Any) -> _ThreadedCursor:
+        return _ThreadedCursor(await asyncio.to_thread(self._collection.aggregate, pipeline, **kwargs))
+
+    def __getattr__(self, name: str) -> Any:
+        method = getattr(self._collection, name)
+
+        @functools.wraps(method)
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return await asyncio.to_thread(method, *args, **kwargs)
+        return call
+
+
+class _ThreadedDatabase:
+    def __init__(self, database: Any) -> None:
+        self._database = database
+
+    def __getitem__(self, name: str) -> _ThreadedCollection:
+        return _ThreadedCollection(self._database[name])
+
+    async def command(self, *args: Any, **kwargs: Any) -> Any:
+        return await asyncio.to_thread(self._database.command, *args, **kwargs)
+
+
+class ThreadedAsyncClient:
+    """
+    The slice of AsyncMongoClient that AsyncAnimalDatabase uses, over a
+    blocking client (mongomock in tests, or a MongoClient) whose calls run on
+    asyncio's default thread pool.
+    """
+
+    def __init__(self, client: Any) -> None:
+        self._client = client
+
+    def __getitem__(self, name: str) -> _ThreadedDatabase:
+        return _ThreadedDatabase(self._client[name])
+
+    @property
+    def admin(self) -> _ThreadedDatabase:
+        return _ThreadedDatabase(self._client.admin)
+
+    async def close(self) -> None:
+        # The blocking client belongs to whoever passed it in
+        return None
@@ -0,0 +1,139 @@
+"""
+data.auth
+bcrypt work-factor calibration and short-lived in-process login sessions
+"""
+
+import hashlib
+import hmac
+import math
+import os
+import secrets
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# bcrypt's own default, the fixed cost used before calibration; never go below it
+MIN_ROUNDS = 12
+MAX_ROUNDS = 16
+DEFAULT_TARGET_SECONDS = 0.25
+DEFAULT_SESSION_TTL = 15 * 60
+
+_calibration_lock = threading.Lock()
+_calibrated: Dict[float, int] = {}
+
+
+def calibrate_rounds(target_seconds: float = DEFAULT_TARGET_SECONDS, probe_rounds: int = 8,
+                     min_rounds: int = MIN_ROUNDS, max_rounds: int = MAX_ROUNDS) -> int:
+    """
+    Picks the bcrypt cost whose hash time is closest to ``target_seconds`` on
+    this machine, never below ``min_rounds``. Each extra round doubles the
+    work, so one cheap probe hash is enough to extrapolate. Cached per target.
+    """
+    with _calibration_lock:
+        if target_seconds in _calibrated:
+            return _calibrated[target_seconds]
+        import bcrypt  # pylint: disable=import-outside-toplevel
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            bcrypt.hashpw(b"calibration", bcrypt.gensalt(probe_rounds))
+            timings.append(time.perf_counter() - start)
+        probe = max(sorted(timings)[1], 1e-6)
+        rounds = probe_rounds + round(math.log2(target_seconds / probe))
+        rounds = max(min_rounds, min(rounds, max_rounds))
+        _calibrated[target_seconds] = rounds
+        return rounds
+
+
+def configured_rounds() -> int:
+    """
+    BCRYPT_ROUNDS pins the cost; otherwise it is calibrated against
+    BCRYPT_TARGET_MS (default 250 ms). Either way it is at least MIN_ROUNDS.
+    """
+    if os.getenv("BCRYPT_ROUNDS"):
+        return max(int(os.environ["BCRYPT_ROUNDS"]), MIN_ROUNDS)
+    target_ms = float(os.getenv("BCRYPT_TARGET_MS", str(DEFAULT_TARGET_SECONDS * 1000)))
+    return calibrate_rounds(target_ms / 1000)
+
+
+# bcrypt is imported on first use so starting the GUI does not load it
+
+def hash_password(password: str, rounds: int) -> bytes:
+    import bcrypt  # pylint: disable=import-outside-toplevel
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds))
+
+
+def check_password(password: str, hashed: bytes) -> bool:
+    import bcrypt  # pylint: disable=import-outside-toplevel
+    return bcrypt.checkpw(password.encode(), hashed)
+
+
+def hash_rounds(hashed: bytes) -> int:
+    # Modular crypt format: $2b$<cost>$<salt+hash>
+    return int(hashed.split(b"$")[2])
+
+
+class SessionStore:
+    """
+    Tokens for logged-in users, valid for ``ttl`` seconds after last use.
+
+    Each session keeps a keyed SHA-256 of the password it was opened with, so
+    re-entering the password later in the session (e.g. to confirm an admin
+    action) is checked in microseconds instead of another bcrypt hash. The key
+    is random per process and nothing is persisted.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_SESSION_TTL,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.ttl = ttl
+        self._clock = clock
+        self._key = secrets.token_bytes(32)
+        self._sessions: Dict[str, Tuple[Dict[str, Any], bytes, float]] = {}
+        self._lock = threading.Lock()
+
+    def _digest(self, username: str, password: str) -> bytes:
+        return hmac.new(self._key, f"{username}\0{password}".encode(), hashlib.sha256).digest()
+
+    def open(self, user: Dict[str, Any], password: str) -> str:
+        token = secrets.token_urlsafe(32)
+        public = {k: v for k, v in user.items() if k != "password"}
+        with self._lock:
+            self._sessions[token] = (public, self._digest(user["username"], password),
+                                     self._clock() + self.ttl)
+        return token
+
+    def user(self, token: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        The session's user (without the password hash), or None once expired.
+        Using a session extends it.
+        """
+        with self._lock:
+            entry = self._sessions.get(token) if token else None
+            if entry is None:
+                return None
+            user, digest, expires = entry
+            now = self._clock()
+            if expires <= now:
+                del self._sessions[token]
+                return None
+            self._sessions[token] = (user, digest, now + self.ttl)
+            return dict(user)
+
+    def verify(self, token: Optional[str], password: str) -> Optional[Dict[str, Any]]:
+        user = self.user(token)
+        if user is None:
+            return None
+        with self._lock:
+            entry = self._sessions.get(token)
+        if entry is None or not hmac.compare_digest(entry[1], self._digest(user["username"], password)):
+            return None
+        return user
+
+    def close(self, token: Optional[str]) -> None:
+        with self._lock:
+            self._sessions.pop(token, None)
+
+    def close_user(self, username: str) -> None:
+        with self._lock:
+            for token in [t for t, (user, _, _) in self._sessions.items() if user["username"] == username]:
+                del self._sessions[token]
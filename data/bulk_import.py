@@ -0,0 +1,231 @@
+"""
+data.bulk_import
+Streams Dog/Monkey records from CSV or JSON Lines files into MongoDB in batches
+
+Usage: python -m data.bulk_import animals.csv [--batch-size 1000]
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import logging
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from animals.dog import Dog
+from animals.monkey import Monkey
+from data.database_manager import get_database
+
+DEFAULT_BATCH_SIZE = 1000
+
+ANIMAL_CLASSES = {"dog": (Dog, "breed"), "monkey": (Monkey, "species")}
+
+Record = Tuple[int, Union[Dict[str, Any], str]]
+
+
+class ImportStats:
+    """
+    Running totals for an import; ``errors`` holds (row number, message) pairs.
+    """
+
+    def __init__(self) -> None:
+        self.read = 0
+        self.inserted = 0
+        self.errors: List[Tuple[int, str]] = []
+        self._started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def failed(self) -> int:
+        return len(self.errors)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+    def tick(self) -> None:
+        self.elapsed = time.perf_counter() - self._started
+
+    def summary(self) -> str:
+        return (f"Read {self.read} rows, inserted {self.inserted}, failed {self.failed} "
+                f"in {self.elapsed:.2f}s ({self.rows_per_second:,.0f} rows/s)")
+
+
+def _open(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def read_records(path: str) -> Iterator[Record]:
+    """
+    Yields (row number, raw record) pairs one at a time. CSV rows come back as
+    dicts; JSON Lines rows are left as text so a malformed line only fails that row.
+    """
+    name = path[:-3] if path.endswith(".gz") else path
+    with _open(path) as handle:
+        if name.endswith(".csv"):
+            # Header is line 1, so data rows start at 2
+            for row_no, row in enumerate(csv.DictReader(handle), start=2):
+                yield row_no, row
+        elif name.endswith((".jsonl", ".ndjson")):
+            for row_no, line in enumerate(handle, start=1):
+                if line.strip():
+                    yield row_no, line
+        else:
+            raise ValueError(f"Unsupported file type: {path}")
+
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in {"yes", "y", "true", "1"}:
+        return True
+    if text in {"no", "n", "false", "0", ""}:
+        return False
+    raise ValueError(f"reserved must be yes/no, got {value!r}")
+
+
+def _prepare(record: Dict[str, Any]) -> Dict[str, Any]:
+    prepared = dict(record)
+    prepared["reserved"] = _to_bool(record.get("reserved", False))
+    if record.get("acquisition_date"):
+        prepared["acquisition_date"] = str(record["acquisition_date"])[:10]
+    else:
+        prepared.pop("acquisition_date", None)
+    return prepared
+
+
+def build_animals(records: List[Dict[str, Any]]) -> Tuple[List[Optional[Dict[str, Any]]],
+                                                          List[Tuple[int, str]]]:
+    """
+    Validates a chunk of raw records through Dog/Monkey.from_records and returns
+    the documents to store aligned with the input (``None`` for rejected rows)
+    plus (index, message) errors.
+    """
+    docs: List[Optional[Dict[str, Any]]] = [None] * len(records)
+    errors: List[Tuple[int, str]] = []
+    groups: Dict[str, List[int]] = {kind: [] for kind in ANIMAL_CLASSES}
+    prepared: Dict[int, Dict[str, Any]] = {}
+
+    for index, record in enumerate(records):
+        kind = str(record.get("animal_type", "")).strip().lower()
+        if kind not in ANIMAL_CLASSES:
+            errors.append((index, f"animal_type must be Dog or Monkey, got {record.get('animal_type')!r}"))
+            continue
+        try:
+            prepared[index] = _prepare(record)
+        except ValueError as exc:
+            errors.append((index, str(exc)))
+            continue
+        groups[kind].append(index)
+
+    for kind, indexes in groups.items():
+        if not indexes:
+            continue
+        animal_class = ANIMAL_CLASSES[kind][0]
+        animals, failures = animal_class.from_records([prepared[i] for i in indexes])
+        failed = {indexes[pos] for pos, _ in failures}
+        errors.extend((indexes[pos], message) for pos, message in failures)
+        for index, animal in zip((i for i in indexes if i not in failed), animals):
+            docs[index] = animal.to_dict()
+
+    return docs, sorted(errors)
+
+
+def build_animal(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validates a single raw record and returns the document to store.
+    Raises ValueError describing the first problem found.
+    """
+    docs, errors = build_animals([record])
+    if errors:
+        raise ValueError(errors[0][1])
+    return docs[0]
+
+
+def import_animals(
+    db,
+    records: Iterable[Record],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    on_progress: Optional[Callable[[ImportStats], None]] = None,
+) -> ImportStats:
+    """
+    Validates and inserts records in unordered batches. Invalid rows and rows the
+    server rejects are recorded in the returned stats instead of aborting the import.
+    """
+    stats = ImportStats()
+    parsed: List[Dict[str, Any]] = []
+    parsed_rows: List[int] = []
+
+    def flush() -> None:
+        docs, failures = build_animals(parsed)
+        stats.errors.extend((parsed_rows[index], message) for index, message in failures)
+        batch = [doc for doc in docs if doc is not None]
+        row_numbers = [row for row, doc in zip(parsed_rows, docs) if doc is not None]
+
+        inserted, failures = db.insert_animals(batch)
+        stats.inserted += inserted
+        stats.errors.extend((row_numbers[index], message) for index, message in failures)
+        parsed.clear()
+        parsed_rows.clear()
+        stats.tick()
+        if on_progress:
+            on_progress(stats)
+
+    for row_no, raw in records:
+        stats.read += 1
+        try:
+            record = json.loads(raw) if isinstance(raw, str) else raw
+        except ValueError as exc:  # json.JSONDecodeError
+            stats.errors.append((row_no, str(exc)))
+            continue
+        if not isinstance(record, dict):
+            stats.errors.append((row_no, "record must be an object"))
+            continue
+        parsed.append(record)
+        parsed_rows.append(row_no)
+        if len(parsed) >= batch_size:
+            flush()
+
+    if parsed:
+        flush()
+    stats.tick()
+    stats.errors.sort()
+    logging.info("Bulk import finished: %s", stats.summary())
+    return stats
+
+
+def import_file(db, path: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                on_progress: Optional[Callable[[ImportStats], None]] = None) -> ImportStats:
+    return import_animals(db, read_records(path), batch_size, on_progress)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import Dog/Monkey records into MongoDB")
+    parser.add_argument("path", help="CSV or JSON Lines file (optionally .gz)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--mongo-uri", default=None)
+    parser.add_argument("--max-errors", type=int, default=20,
+                        help="number of row errors to print")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    db = get_database(mongo_uri=args.mongo_uri)
+    stats = import_file(db, args.path, args.batch_size,
+                        on_progress=lambda s: logging.info("%s", s.summary()))
+
+    print(stats.summary())
+    for row_no, message in stats.errors[:args.max_errors]:
+        print(f"  row {row_no}: {message}")
+    if stats.failed > args.max_errors:
+        print(f"  ... {stats.failed - args.max_errors} more")
+    return 1 if stats.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+data.change_feed
+Delivers inserts, updates and deletes made by other clients since a view was loaded
+"""
+
+import logging
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, errors
+
+from data.database_manager import AnimalDatabase, utcnow
+
+Changes = Tuple[List[Dict[str, Any]], List[Any]]
+
+UPDATED_ORDER = [("updated_at", ASCENDING), ("_id", ASCENDING)]
+
+
+class StreamsUnsupported(Exception):
+    """The collection cannot open a change stream at all (e.g. a mock or a driver without one)."""
+
+
+class ChangeFeed:
+    """
+    Tracks changes to the animals that match ``query``.
+
+    ``poll()`` returns ``(upserts, removed_ids)``: documents that were inserted or
+    changed and still match the query, and ids that were deleted or no longer match.
+    With a replica set it reads a MongoDB change stream ("stream" mode); otherwise it
+    polls the ``updated_at`` field and the delete tombstones written by
+    AnimalDatabase ("poll" mode). The default "auto" mode tries the change stream
+    first and falls back to polling when the server does not support it.
+    """
+
+    MAX_EVENTS = 1000
+
+    def __init__(self, db, query: Optional[Dict[str, Any]] = None,
+                 projection: Optional[Dict[str, int]] = None, mode: str = "auto",
+                 overlap: float = 5.0) -> None:
+        if mode not in {"auto", "stream", "poll"}:
+            raise ValueError("mode must be 'auto', 'stream' or 'poll'")
+        self.db = db
+        self.query = dict(query or {})
+        self.projection = projection
+        self.mode = mode
+        # Re-scan this far back on every poll so writes stamped by a client whose
+        # clock lags ours are still picked up; _seen filters the repeats.
+        self.overlap = timedelta(seconds=overlap)
+        self._mark = utcnow()
+        self._seen: Dict[Any, Any] = {}
+        # Where the last poll stopped when it hit MAX_EVENTS, as (updated_at, _id)
+        self._after: Optional[Tuple[Any, Any]] = None
+        self._stream = None
+        self._resume_token = None
+
+    def poll(self) -> Changes:
+        if self.mode in {"auto", "stream"}:
+            try:
+                return self._poll_stream()
+            except (errors.PyMongoError, StreamsUnsupported) as exc:
+                self._close_stream()
+                if self.mode == "stream":
+                    raise
+                logging.info("Change streams unavailable (%s); polling updated_at instead", exc)
+                self.mode = "poll"
+        return self._poll_updated_at()
+
+    def close(self) -> None:
+        self._close_stream()
+
+    def _close_stream(self) -> None:
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    def _poll_stream(self) -> Changes:
+        if self._stream is None:
+            try:
+                self._stream = self.db.collection.watch(resume_after=self._resume_token)
+            except (AttributeError, NotImplementedError, TypeError) as exc:
+                # Not a server error: this client has no working watch() at all
+                raise StreamsUnsupported(str(exc)) from exc
+            self.mode = "stream"
+
+        changed, removed = [], []
+        for _ in range(self.MAX_EVENTS):
+            event = self._stream.try_next()
+            if event is None:
+                break
+            self._resume_token = self._stream.resume_token
+            animal_id = event.get("documentKey", {}).get("_id")
+            if event["operationType"] == "delete":
+                removed.append(animal_id)
+            elif event["operationType"] in {"insert", "update", "replace"}:
+                changed.append(animal_id)
+        upserts, unmatched = self._match(changed)
+        return upserts, removed + unmatched
+
+    def _poll_updated_at(self) -> Changes:
+        since = self._mark - self.overlap
+        changed = []
+        # Paged on (updated_at, _id): a bulk insert gives a whole batch one stamp,
+        # so a bare limit could keep returning the same already-seen documents.
+        after = self._after
+        self._after = None
+        while len(changed) < self.MAX_EVENTS:
+            criteria = {"updated_at": {"$gte": since}}
+            if after is not None:
+                criteria = AnimalDatabase._keyset_filter(  # pylint: disable=protected-access
+                    UPDATED_ORDER, after)
+            docs = list(self.db.collection.find(criteria, {"updated_at": 1})
+                        .sort(UPDATED_ORDER).limit(self.MAX_EVENTS))
+            for doc in docs:
+                after = (doc["updated_at"], doc["_id"])
+                if self._remember(doc["_id"], doc["updated_at"]):
+                    changed.append(doc["_id"])
+                    if len(changed) == self.MAX_EVENTS:
+                        # The rest is picked up from here on the next poll
+                        self._after = after
+                        break
+            if len(docs) < self.MAX_EVENTS:
+                break
+
+        removed = []
+        for tomb in self.db.tombstones.find({"deleted_at": {"$gte": since}}):
+            if self._remember(("deleted", tomb["_id"]), tomb["deleted_at"]):
+                removed.append(tomb["animal_id"])
+
+        # Forget entries that have fallen out of the overlap window
+        floor = self._mark - self.overlap
+        self._seen = {key: stamp for key, stamp in self._seen.items() if stamp >= floor}
+
+        upserts, unmatched = self._match(changed)
+        return upserts, removed + unmatched
+
+    def _remember(self, key: Any, stamp) -> bool:
+        if self._seen.get(key) == stamp:
+            return False
+        self._seen[key] = stamp
+        self._mark = max(self._mark, stamp)
+        return True
+
+    def _match(self, ids: List[Any]) -> Changes:
+        # The server decides which changed documents still belong in the view
+        if not ids:
+            return [], []
+        criteria = {"_id": {"$in": ids}}
+        if self.query:
+            criteria = {"$and": [self.query, criteria]}
+        upserts = list(self.db.collection.find(criteria, self.projection))
+        matched = {doc["_id"] for doc in upserts}
+        return upserts, [animal_id for animal_id in ids if animal_id not in matched]
@@ -1,14 +1,103 @@
+import copy
 import logging
 import os
-from typing import Optional, Dict, Tuple, List, Union, Any
-import bcrypt
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Tuple, List, Union, Any, Iterator, Sequence
 from bson.objectid import ObjectId
-from pymongo import MongoClient, errors
+from pymongo import MongoClient, ASCENDING, IndexModel, errors
 
+from data.auth import (
+    DEFAULT_SESSION_TTL, SessionStore, check_password, configured_rounds, hash_password, hash_rounds
+)
+from data.metrics import METRICS, MetricsRegistry, instrumented
+from data.query_cache import QueryCache, freeze
+from data.resilience import CLOSED, Resilience, is_unavailable
+from data.search_index import SEARCH_FIELDS, search_words
+from data.snapshot import open_snapshot, snapshot_path, write_snapshot
 
-class AnimalDatabase:
+# Fields rendered by the AnimalApp table; breed/species share a single column.
+DISPLAY_PROJECTION: Dict[str, int] = {
+    field: 1 for field in (
+        "name", "animal_type", "breed", "species", "gender", "age", "weight",
+        "acquisition_date", "acquisition_country", "training_status",
+        "reserved", "in_service_country",
+    )
+}
+
+DEFAULT_PAGE_SIZE = 500
+
+# Query shapes issued by the GUI; every one of them should be served by an index below.
+APP_QUERIES: Dict[str, Dict[str, Any]] = {
+    "dogs": {"animal_type": "Dog"},
+    "monkeys": {"animal_type": "Monkey"},
+    "available": {"animal_type": {"$in": ["Dog", "Monkey"]}, "reserved": False},
+    "all": {},
+}
+
+# Declarative index registry for the animals collection. Pages are sorted on _id,
+# so it is the trailing key of each compound index.
+ANIMAL_INDEXES: List[Dict[str, Any]] = [
+    {"name": "animal_type_id", "keys": [("animal_type", ASCENDING), ("_id", ASCENDING)]},
+    {"name": "reserved_animal_type_id",
+     "keys": [("reserved", ASCENDING), ("animal_type", ASCENDING), ("_id", ASCENDING)]},
+    {"name": "updated_at", "keys": [("updated_at", ASCENDING)]},
+    # Multikey index of lower-cased words for type-ahead prefix search
+    {"name": "search_keys", "keys": [("search_keys", ASCENDING)]},
+    # Column-click sorts on high-cardinality fields walk these instead of
+    # sorting in memory; MongoDB reads them backwards for descending sorts.
+    *({"name": f"{field}_id", "keys": [(field, ASCENDING), ("_id", ASCENDING)]}
+      for field in ("name", "age", "weight", "acquisition_date", "in_service_country")),
+]
+
+# Fields animal_stats() counts by, and the bucket boundaries of its distributions
+STAT_FIELDS: Tuple[str, ...] = ("animal_type", "training_status", "reserved", "in_service_country")
+AGE_BUCKETS: Tuple[int, ...] = (0, 1, 3, 6, 10, 20)
+WEIGHT_BUCKETS: Tuple[float, ...] = (0, 5, 10, 20, 40, 80)
+
+DUPLICATE_KEY = 11000
+
+# What animal_stats() returns when the aggregation fails
+EMPTY_STATS: Dict[str, Any] = {"total": 0, "counts": {}, "breakdown": [], "age": {}, "weight": {}}
+
+# Deleted ids are kept this long so polling clients can drop them from their views
+TOMBSTONE_TTL_SECONDS = 24 * 60 * 60
+
+# Snapshot syncs re-read this far before the last sync, for writers whose clocks lag ours
+SNAPSHOT_OVERLAP = timedelta(seconds=5)
+
+
+_stamp_lock = threading.Lock()
+_last_stamp = datetime.min
+
+
+def utcnow() -> datetime:
+    """
+    Naive UTC timestamp truncated to milliseconds, matching what MongoDB stores
+    and hands back, so values read from the server compare equal to ones we wrote.
+    Stamps are strictly increasing within the process, so two writes to the same
+    animal in one millisecond still look like separate changes to a ChangeFeed.
+    """
+    global _last_stamp  # pylint: disable=global-statement
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    with _stamp_lock:
+        if now <= _last_stamp:
+            now = _last_stamp + timedelta(milliseconds=1)
+        _last_stamp = now
+    return now
+
+
+SortSpec = Sequence[Tuple[str, int]]
+
+
+class AnimalDatabase:  # pylint: disable=too-many-public-methods
     """
     Handles MongoDB interactions including user management and CRUD operations for rescue animals.
+
+    Calls go through ``resilience`` (see data.resilience): transient failures
+    are retried with backoff, and a run of failures opens a circuit breaker so
+    calls fail fast while cached reads are served instead.
     """
 
     def __init__(
@@ -16,55 +105,236 @@ class AnimalDatabase:
         mongo_uri: Optional[str] = None,
         database: str = "rescue_animals_db",
         collection: str = "animals",
-        user_collection: str = "users"
+        user_collection: str = "users",
+        *,
+        max_pool_size: Optional[int] = None,
+        cache: Optional[QueryCache] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        bcrypt_rounds: Optional[int] = None,
+        session_ttl: float = DEFAULT_SESSION_TTL,
+        resilience: Optional[Resilience] = None,
     ) -> None:
         self._mongo_uri = mongo_uri or os.getenv("MONGO_URI", "mongodb://localhost:27017")
         self._database = database
         self._collection_name = collection
         self._user_collection_name = user_collection
+        pool_size = max_pool_size or os.getenv("MONGO_MAX_POOL_SIZE")
+        self._max_pool_size = int(pool_size) if pool_size else None
+        self.cache = cache if cache is not None else QueryCache()
+        self._bcrypt_rounds = bcrypt_rounds
+        self.sessions = SessionStore(session_ttl)
+        self.metrics = metrics if metrics is not None else METRICS
+        for name in ("hits", "misses", "evictions", "invalidations", "stale_hits", "size"):
+            self.metrics.register_gauge(f"cache_{name}",
+                                        lambda name=name: self.cache.stats()[name])
+        self.resilience = resilience if resilience is not None else Resilience.from_env()
+        self.resilience.register_metrics(self.metrics)
         self._connect()
+        self._bootstrap()
 
     def _connect(self) -> None:
+        options: Dict[str, Any] = {"serverSelectionTimeoutMS": 3000}
+        if self._max_pool_size:
+            options["maxPoolSize"] = self._max_pool_size
         try:
-            self.client = MongoClient(self._mongo_uri, serverSelectionTimeoutMS=3000)
+            self.client = MongoClient(self._mongo_uri, **options)
             self.client.admin.command("ping")
             db = self.client[self._database]
             self.collection = db[self._collection_name]
             self.users = db[self._user_collection_name]
-            self.users.create_index("username", unique=True)
-
+            self.tombstones = db[f"{self._collection_name}_tombstones"]
             logging.info("Connected to MongoDB: %s", self._mongo_uri)
+        except errors.ConnectionFailure as exc:
+            logging.error("Failed to connect to MongoDB: %s", exc)
+            raise RuntimeError("Unable to connect to MongoDB") from exc
 
+    # Schema and default admin setup; runs once per client
+    def _bootstrap(self) -> None:
+        try:
+            self.users.create_index("username", unique=True)
+            self.ensure_indexes()
+            self.tombstones.create_index("deleted_at", expireAfterSeconds=TOMBSTONE_TTL_SECONDS)
+            self.backfill_search_keys()
+            missing = self.verify_indexes()["missing"]
+            if missing:
+                logging.warning("Missing indexes on %s: %s", self._collection_name, missing)
             if self.users.count_documents({}) == 0:
                 default_pwd = os.getenv("ADMIN_PASSWORD", "admin1234")
                 logging.info("Creating default admin user")
                 self.create_user("admin", default_pwd, role="admin", first_login=True)
-
         except errors.ConnectionFailure as exc:
             logging.error("Failed to connect to MongoDB: %s", exc)
             raise RuntimeError("Unable to connect to MongoDB") from exc
 
+    def close(self) -> None:
+        self.client.close()
+
+    # ----- index management -----
+
+    def ensure_indexes(self) -> List[str]:
+        models = [IndexModel(spec["keys"], name=spec["name"], **spec.get("options", {}))
+                  for spec in ANIMAL_INDEXES]
+        return self.collection.create_indexes(models)
+
+    @staticmethod
+    def _index_keys(keys: Any) -> List[Tuple[str, int]]:
+        return [(field, int(direction)) for field, direction in list(keys)]
+
+    def verify_indexes(self) -> Dict[str, List[str]]:
+        """
+        Compares the live indexes against ANIMAL_INDEXES by key pattern.
+        Returns the registry names that are missing and the live index names
+        that are not declared (other than the built-in _id index).
+        """
+        live = {name: self._index_keys(info["key"])
+                for name, info in self.collection.index_information().items()}
+        declared = {spec["name"]: self._index_keys(spec["keys"]) for spec in ANIMAL_INDEXES}
+        live_keys = list(live.values())
+        return {
+            "missing": [name for name, keys in declared.items() if keys not in live_keys],
+            "unexpected": [name for name, keys in live.items()
+                           if name != "_id_" and keys not in declared.values()],
+        }
+
+    def unused_indexes(self) -> List[str]:
+        """
+        Names of indexes with no recorded accesses since the server started ($indexStats).
+        """
+        try:
+            stats = self.collection.aggregate([{"$indexStats": {}}])
+            return [s["name"] for s in stats
+                    if s["name"] != "_id_" and not s.get("accesses", {}).get("ops")]
+        except errors.PyMongoError as exc:
+            logging.error("Failed to read index stats: %s", exc)
+            return []
+
+    @staticmethod
+    def _uses_collscan(plan: Any) -> bool:
+        if isinstance(plan, dict):
+            return plan.get("stage") == "COLLSCAN" or any(
+                AnimalDatabase._uses_collscan(value) for value in plan.values())
+        if isinstance(plan, list):
+            return any(AnimalDatabase._uses_collscan(value) for value in plan)
+        return False
+
+    def check_query_plans(self, queries: Optional[Dict[str, Dict]] = None) -> Dict[str, bool]:
+        """
+        Explains each app query as the GUI issues it (sorted by _id, one page)
+        and maps its label to True when the winning plan falls back to COLLSCAN.
+        """
+        report = {}
+        for label, query in (queries or APP_QUERIES).items():
+            try:
+                plan = (self.collection.find(query).sort(self._normalize_sort(None))
+                        .limit(DEFAULT_PAGE_SIZE).explain())
+            except errors.PyMongoError as exc:
+                logging.error("Failed to explain query %s: %s", label, exc)
+                continue
+            report[label] = self._uses_collscan(plan.get("queryPlanner", {}).get("winningPlan"))
+            if report[label]:
+                logging.warning("Query %s falls back to a collection scan: %s", label, query)
+        return report
+
+    @property
+    def available(self) -> bool:
+        """
+        False while the circuit breaker is open or probing, i.e. recent calls
+        could not reach the server and results may come from the cache.
+        """
+        return self.resilience.breaker.state == CLOSED
+
+    def _call(self, fn: Any, *args: Any, **kwargs: Any) -> Any:
+        return self.resilience.call(fn, *args, **kwargs)
+
+    def _stale(self, key: Optional[Any], exc: Exception) -> Optional[Any]:
+        # While the server is unreachable, the last result seen for the same read beats none
+        if key is None or not is_unavailable(exc):
+            return None
+        value = self.cache.get(key, stale=True)
+        if value is not None:
+            logging.warning("Serving cached results while the database is unavailable: %s", exc)
+        return value
+
     @staticmethod
     def is_admin(user: Dict[str, Any]) -> bool:
         return user.get("role") == "admin"
 
+    @property
+    def bcrypt_rounds(self) -> int:
+        # Calibrating costs a few hashes, so it waits until a password is first needed
+        if self._bcrypt_rounds is None:
+            self._bcrypt_rounds = configured_rounds()
+        return self._bcrypt_rounds
+
+    @instrumented("authenticate_user")
     def authenticate_user(self, username: str, password: str) -> Tuple[Optional[Dict], bool]:
-        user = self.users.find_one({"username": username})
-        if user and bcrypt.checkpw(password.encode(), user["password"]):
+        user = self._call(self.users.find_one, {"username": username})
+        if user and check_password(password, user["password"]):
+            if hash_rounds(user["password"]) < self.bcrypt_rounds:
+                # Transparent upgrade to the configured cost; stronger hashes are kept.
+                # The login is valid either way, so a failed write only gets logged.
+                try:
+                    self._store_password(user["_id"], password)
+                except errors.PyMongoError as exc:
+                    logging.warning("Failed to rehash password for %s: %s", username, exc)
             return user, bool(user.get("is_first_login"))
         return None, False
 
+    def login(self, username: str, password: str) -> Tuple[Optional[Dict], bool, Optional[str]]:
+        """
+        authenticate_user plus a session token; see reauthenticate().
+        """
+        user, first_login = self.authenticate_user(username, password)
+        if user is None:
+            return None, False, None
+        return user, first_login, self.sessions.open(user, password)
+
+    @instrumented("reauthenticate")
+    def reauthenticate(self, token: Optional[str], username: str, password: str) -> Optional[Dict]:
+        """
+        Confirms a password again during a session. A live session for the same
+        user is checked in memory; otherwise this falls back to bcrypt.
+        """
+        user = self.sessions.verify(token, password)
+        if user is not None and user["username"] == username:
+            return user
+        user, _ = self.authenticate_user(username, password)
+        return user
+
+    def session_user(self, token: Optional[str]) -> Optional[Dict]:
+        return self.sessions.user(token)
+
+    def logout(self, token: Optional[str]) -> None:
+        self.sessions.close(token)
+
+    def _store_password(self, user_id: Any, password: str, **extra: Any) -> None:
+        self._call(
+            self.users.update_one,
+            {"_id": user_id},
+            {"$set": {"password": hash_password(password, self.bcrypt_rounds), **extra}}
+        )
+
+    @instrumented("set_password")
+    def set_password(self, user: Dict[str, Any], password: str) -> str:
+        """
+        Stores a new password and clears the first-login flag. Open sessions of
+        the user vouch for the old password, so they are closed and the token
+        of a fresh session is returned.
+        """
+        self._store_password(user["_id"], password, is_first_login=False)
+        self.sessions.close_user(user["username"])
+        return self.sessions.open({**user, "is_first_login": False}, password)
+
+    @instrumented("create_user")
     def create_user(self, username: str, password: str, role: str = "user", *, first_login: bool = True) -> None:
         if role not in {"user", "admin"}:
             raise ValueError("Role must be 'user' or 'admin'")
 
-        if self.users.find_one({"username": username}):
-            raise ValueError(f"Username {username} already exists")
-
-        hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+        # The unique username index rejects duplicates; no separate lookup needed
+        hashed = hash_password(password, self.bcrypt_rounds)
 
         try:
-            self.users.insert_one({
+            self.resilience.insert_one(self.users, {
                 "username": username,
                 "password": hashed,
                 "role": role,
@@ -74,37 +344,572 @@ class AnimalDatabase:
         except errors.DuplicateKeyError as exc:
             raise ValueError(f"User {username} already exists") from exc
 
+    @instrumented("insert_users", count=lambda result: result[0])
+    def insert_users(self, users: List[Dict[str, Any]]) -> Tuple[int, List[Tuple[int, str]]]:
+        """
+        Unordered bulk insert of ready-made user documents (password already
+        hashed). Returns the inserted count and (index, message) pairs for the
+        rejected ones; duplicates are caught by the unique username index.
+        """
+        if not users:
+            return 0, []
+        try:
+            return self.resilience.insert_many(self.users, users), []
+        except errors.BulkWriteError as exc:
+            failures = []
+            for err in exc.details.get("writeErrors", []):
+                if err.get("code") == DUPLICATE_KEY:
+                    failures.append((err["index"], f"user {users[err['index']].get('username')} already exists"))
+                else:
+                    # Existing usernames are an expected outcome; anything else is a failure
+                    self.metrics.mark_failed()
+                    failures.append((err["index"], err.get("errmsg", "write error")))
+            return exc.details.get("nInserted", 0), failures
+        except errors.PyMongoError as exc:
+            logging.error("Failed to insert users: %s", exc)
+            self.metrics.mark_failed()
+            return 0, [(i, str(exc)) for i in range(len(users))]
+
+    def backfill_search_keys(self, batch_size: int = 1000) -> int:
+        """
+        Adds ``search_keys`` to animals written before search existed.
+        Returns the number of documents updated.
+        """
+        projection = {field: 1 for field in SEARCH_FIELDS}
+        updated = 0
+        while True:
+            docs = list(self.collection.find({"search_keys": {"$exists": False}}, projection)
+                        .limit(batch_size))
+            if not docs:
+                return updated
+            # One-off migration, so plain update_one calls are fine here
+            for doc in docs:
+                self.collection.update_one({"_id": doc["_id"]},
+                                           {"$set": {"search_keys": search_words(doc)}})
+            updated += len(docs)
+
+    @instrumented("create_animal")
     def create_animal(self, animal_data: Dict[str, Any]) -> bool:
+        animal_data["updated_at"] = utcnow()
+        animal_data["search_keys"] = search_words(animal_data)
         try:
-            self.collection.insert_one(animal_data)
+            self.resilience.insert_one(self.collection, animal_data)
             logging.info("Animal inserted: %s", animal_data.get("name"))
             return True
         except errors.PyMongoError as exc:
             logging.error("Failed to insert animal: %s", exc)
+            self.metrics.mark_failed()
             return False
+        finally:
+            self.cache.invalidate()
+
+    @instrumented("insert_animals", count=lambda result: result[0])
+    def insert_animals(self, animals: List[Dict[str, Any]]) -> Tuple[int, List[Tuple[int, str]]]:
+        """
+        Unordered bulk insert. Returns the inserted count and (index, message)
+        pairs for documents the server rejected; one bad document does not
+        stop the rest of the batch.
+        """
+        if not animals:
+            return 0, []
+        stamp = utcnow()
+        for animal in animals:
+            animal["updated_at"] = stamp
+            animal["search_keys"] = search_words(animal)
+        try:
+            return self.resilience.insert_many(self.collection, animals), []
+        except errors.BulkWriteError as exc:
+            self.metrics.mark_failed()
+            failures = [(err["index"], err.get("errmsg", "write error"))
+                        for err in exc.details.get("writeErrors", [])]
+            return exc.details.get("nInserted", 0), failures
+        except errors.PyMongoError as exc:
+            logging.error("Failed to insert animals: %s", exc)
+            self.metrics.mark_failed()
+            return 0, [(i, str(exc)) for i in range(len(animals))]
+        finally:
+            self.cache.invalidate()
+
+    @staticmethod
+    def _normalize_sort(sort: Optional[SortSpec]) -> List[Tuple[str, int]]:
+        # _id is always the final key so every page boundary is unambiguous
+        keys = [(field, direction) for field, direction in (sort or []) if field != "_id"]
+        id_direction = next((d for f, d in (sort or []) if f == "_id"), ASCENDING)
+        keys.append(("_id", id_direction))
+        return keys
 
-    def read_all_animals(self, query: Optional[Dict] = None) -> List[Dict]:
+    @staticmethod
+    def _keyset_filter(sort_keys: List[Tuple[str, int]], after: Sequence[Any]) -> Dict[str, Any]:
+        # Null and missing values sort first, but $gt / $lt only match values of
+        # the same type, so a null boundary needs its own comparisons
+        clauses = []
+        for i, (field, direction) in enumerate(sort_keys):
+            clause = {f: after[j] for j, (f, _) in enumerate(sort_keys[:i])}
+            if after[i] is None:
+                if direction != ASCENDING:
+                    continue  # nothing sorts after null in descending order
+                clause[field] = {"$ne": None}
+            elif direction == ASCENDING:
+                clause[field] = {"$gt": after[i]}
+            else:
+                clause["$or"] = [{field: {"$lt": after[i]}}, {field: None}]
+            clauses.append(clause)
+        return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+    @instrumented("find_animals_page", count=lambda result: len(result[0]))
+    def find_animals_page(
+        self,
+        query: Optional[Dict] = None,
+        *,
+        after: Optional[Sequence[Any]] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        sort: Optional[SortSpec] = None,
+        projection: Optional[Dict[str, int]] = None,
+        use_cache: bool = True,
+    ) -> Tuple[List[Dict], Optional[Tuple[Any, ...]]]:
+        """
+        Returns one page of animals plus the keyset cursor for the next page.
+        Pass the returned cursor back as ``after``; it is ``None`` once the
+        collection is exhausted. Paging is keyset based, so the cost of a page
+        does not grow with how deep into the result set it is.
+        Pages are served from ``self.cache`` when possible; callers get copies,
+        so mutating a returned document never corrupts the cache.
+        """
+        try:
+            return self._read_page(query, after, limit, sort=sort, projection=projection,
+                                   use_cache=use_cache)
+        except errors.PyMongoError as exc:
+            logging.error("Failed to read animals: %s", exc)
+            self.metrics.mark_failed()
+            return [], None
+
+    def _read_page(
+        self,
+        query: Optional[Dict],
+        after: Optional[Sequence[Any]],
+        limit: int,
+        *,
+        sort: Optional[SortSpec],
+        projection: Optional[Dict[str, int]],
+        use_cache: bool,
+    ) -> Tuple[List[Dict], Optional[Tuple[Any, ...]]]:
+        # find_animals_page without the error handling: raises PyMongoError
+        key = freeze((query or {}, after, limit, sort, projection)) if use_cache else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return [dict(doc) for doc in cached[0]], cached[1]
+
+        sort_keys = self._normalize_sort(sort)
+        if projection is not None:
+            projection = {**projection, **{field: 1 for field, _ in sort_keys}}
+
+        criteria = dict(query or {})
+        if after is not None:
+            keyset = self._keyset_filter(sort_keys, after)
+            criteria = {"$and": [criteria, keyset]} if criteria else keyset
+
+        try:
+            docs = self._call(
+                lambda: list(self.collection.find(criteria, projection).sort(sort_keys).limit(limit)))
+        except errors.PyMongoError as exc:
+            stale = self._stale(key, exc)
+            if stale is None:
+                raise
+            return [dict(doc) for doc in stale[0]], stale[1]
+
+        next_after = None
+        if len(docs) == limit:
+            next_after = tuple(docs[-1].get(field) for field, _ in sort_keys)
+        if key is not None:
+            self.cache.put(key, ([dict(doc) for doc in docs], next_after))
+        return docs, next_after
+
+    def iter_animals(
+        self,
+        query: Optional[Dict] = None,
+        *,
+        batch_size: int = DEFAULT_PAGE_SIZE,
+        sort: Optional[SortSpec] = None,
+        projection: Optional[Dict[str, int]] = None,
+        use_cache: bool = True,
+    ) -> Iterator[Dict]:
+        """
+        Streams matching animals page by page without holding the full result set.
+        A page that cannot be read raises PyMongoError, so a failure part-way
+        through is never mistaken for the end of the results.
+        """
+        after = None
+        while True:
+            docs, after = self._read_page(query, after, batch_size, sort=sort, projection=projection,
+                                              use_cache=use_cache)
+            yield from docs
+            if after is None:
+                return
+
+    @instrumented("read_all_animals", count=len)
+    def read_all_animals(
+        self,
+        query: Optional[Dict] = None,
+        projection: Optional[Dict[str, int]] = None,
+        sort: Optional[SortSpec] = None,
+    ) -> List[Dict]:
+        """
+        Every matching animal, or an empty list if any page cannot be read.
+        """
         try:
-            return list(self.collection.find(query or {}))
+            return list(self.iter_animals(query, sort=sort, projection=projection))
         except errors.PyMongoError as exc:
             logging.error("Failed to read animals: %s", exc)
+            self.metrics.mark_failed()
             return []
 
+    # ----- local snapshot (see data.snapshot) -----
+
+    @instrumented("save_snapshot", count=lambda count: count)
+    def save_snapshot(self, path: Optional[str] = None) -> int:
+        """
+        Writes every animal (the table's fields) to the local snapshot file.
+        Returns the number written, or 0 on failure, leaving any old file as is.
+        """
+        synced_at = utcnow()
+        try:
+            # A fresh cursor per attempt; the file is only replaced once it is complete
+            return self._call(lambda: write_snapshot(path or snapshot_path(),
+                                                     self.collection.find({}, DISPLAY_PROJECTION), synced_at))
+        except (errors.PyMongoError, OSError) as exc:
+            logging.error("Failed to save snapshot: %s", exc)
+            self.metrics.mark_failed()
+            return 0
+        except (TypeError, ValueError) as exc:
+            # A document the columnar format cannot hold; the app works without a snapshot
+            logging.warning("Skipping snapshot, an animal could not be stored: %s", exc)
+            return 0
+
+    @instrumented("sync_snapshot")
+    def sync_snapshot(self, path: Optional[str] = None
+                      ) -> Optional[Tuple[List[Dict[str, Any]], List[Any]]]:
+        """
+        Brings the local snapshot up to date and returns what changed since it
+        was taken as (upserts, removed ids), so a view of the old snapshot can be
+        reconciled. Only animals stamped since then are read (through the
+        updated_at index), plus the delete tombstones. Returns None when the file
+        was missing, unreadable or older than the tombstones and was rewritten
+        in full, and ([], []) when the server could not be read.
+        """
+        path = path or snapshot_path()
+        snapshot = open_snapshot(path)
+        if snapshot is not None and utcnow() - snapshot.synced_at > timedelta(seconds=TOMBSTONE_TTL_SECONDS):
+            snapshot.close()
+            snapshot = None
+        if snapshot is None:
+            self.save_snapshot(path)
+            return None
+
+        synced_at = utcnow()
+        since = snapshot.synced_at - SNAPSHOT_OVERLAP
+        with snapshot:
+            try:
+                upserts = self._call(lambda: list(self.collection.find({"updated_at": {"$gte": since}},
+                                                                       DISPLAY_PROJECTION)))
+                removed = self._call(lambda: [tomb["animal_id"] for tomb in self.tombstones.find(
+                    {"deleted_at": {"$gte": since}}, {"animal_id": 1})])
+            except errors.PyMongoError as exc:
+                logging.error("Failed to sync snapshot: %s", exc)
+                self.metrics.mark_failed()
+                return [], []
+            changed = {str(doc["_id"]) for doc in upserts} | {str(animal_id) for animal_id in removed}
+            # Copied out of the map, which has to be closed before the file is replaced
+            kept = snapshot.batch.take(row for row, animal_id in enumerate(snapshot.batch.column("_id"))
+                                       if animal_id not in changed)
+        try:
+            kept.extend(upserts)
+            write_snapshot(path, kept, synced_at)
+        except OSError as exc:
+            logging.error("Failed to save snapshot: %s", exc)
+            self.metrics.mark_failed()
+        except (TypeError, ValueError) as exc:
+            logging.warning("Skipping snapshot, an animal could not be stored: %s", exc)
+        return upserts, removed
+
+    @instrumented("count_animals")
+    def count_animals(self, query: Optional[Dict] = None, *, use_cache: bool = True,
+                      raise_errors: bool = False) -> int:
+        """
+        Number of animals matching ``query``. While the server is unreachable the
+        last cached count is returned; with none, 0, or the PyMongoError when
+        ``raise_errors`` is set.
+        """
+        key = freeze(("count_animals", query or {})) if use_cache else None
+        cached = self.cache.get(key) if key is not None else None
+        if cached is not None:
+            return cached
+        try:
+            count = self._call(self.collection.count_documents, dict(query or {}))
+        except errors.PyMongoError as exc:
+            stale = self._stale(key, exc)
+            if stale is not None:
+                return stale
+            logging.error("Failed to count animals: %s", exc)
+            self.metrics.mark_failed()
+            if raise_errors:
+                raise
+            return 0
+        if key is not None:
+            self.cache.put(key, count)
+        return count
+
+    def count_animals_many(self, queries: Dict[str, Optional[Dict]],
+                           raise_errors: bool = False) -> Dict[str, int]:
+        """
+        Counts for several labelled queries, one after the other; see
+        AsyncAnimalDatabase.count_animals_many for the concurrent version.
+        """
+        return {label: self.count_animals(query, raise_errors=raise_errors)
+                for label, query in queries.items()}
+
+    @staticmethod
+    def _distribution_facets(field: str, boundaries: Sequence[float]) -> Dict[str, List[Dict[str, Any]]]:
+        return {
+            f"{field}_buckets": [{"$bucket": {"groupBy": f"${field}", "boundaries": list(boundaries),
+                                              "default": "other", "output": {"count": {"$sum": 1}}}}],
+            f"{field}_summary": [{"$group": {"_id": None, "min": {"$min": f"${field}"},
+                                             "max": {"$max": f"${field}"}, "avg": {"$avg": f"${field}"}}}],
+        }
+
+    @staticmethod
+    def _distribution(facets: Dict[str, Any], field: str, boundaries: Sequence[float]) -> Dict[str, Any]:
+        summary = (facets[f"{field}_summary"] or [{}])[0]
+        uppers = dict(zip(boundaries, boundaries[1:]))
+        buckets = [
+            {"lower": None if b["_id"] == "other" else b["_id"],
+             "upper": uppers.get(b["_id"]), "count": b["count"]}
+            for b in facets[f"{field}_buckets"]
+        ]
+        return {"min": summary.get("min"), "max": summary.get("max"), "avg": summary.get("avg"),
+                "buckets": buckets}
+
+    @instrumented("animal_stats")
+    def animal_stats(
+        self,
+        query: Optional[Dict] = None,
+        *,
+        group_by: Sequence[str] = STAT_FIELDS,
+        use_cache: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Aggregated counts and distributions for the animals matching ``query``,
+        computed in one $facet pipeline so only the numbers leave the server.
+
+        Returns ``total``, ``counts`` (per field in ``group_by``: value -> count),
+        ``breakdown`` (one row per combination of the ``group_by`` values) and
+        ``age``/``weight`` (min, max, avg and bucket counts; ``lower=None`` is the
+        bucket for values outside the boundaries or missing). For example,
+        fully trained, unreserved dogs per country:
+
+            db.animal_stats({"animal_type": "Dog", "training_status": "Fully Trained",
+                             "reserved": False})["counts"]["in_service_country"]
+        """
+        group_by = tuple(group_by)
+        key = freeze(("animal_stats", query or {}, group_by)) if use_cache else None
+        facets = self.cache.get(key) if key is not None else None
+
+        if facets is None:
+            try:
+                facets = self._call(
+                    lambda: next(self.collection.aggregate(self._stats_pipeline(query, group_by))))
+            except (errors.PyMongoError, StopIteration) as exc:
+                facets = self._stale(key, exc)
+                if facets is not None:
+                    return self._stats_result(facets, group_by)
+                logging.error("Failed to aggregate animal statistics: %s", exc)
+                self.metrics.mark_failed()
+                return copy.deepcopy(EMPTY_STATS)
+            if key is not None:
+                self.cache.put(key, facets)
+        return self._stats_result(facets, group_by)
+
+    @classmethod
+    def _stats_pipeline(cls, query: Optional[Dict], group_by: Tuple[str, ...]) -> List[Dict[str, Any]]:
+        facets: Dict[str, List[Dict[str, Any]]] = {
+            "total": [{"$count": "count"}],
+            "breakdown": [{"$group": {"_id": {field: f"${field}" for field in group_by},
+                                      "count": {"$sum": 1}}}],
+            **{f"by_{field}": [{"$group": {"_id": f"${field}", "count": {"$sum": 1}}}]
+               for field in group_by},
+            **cls._distribution_facets("age", AGE_BUCKETS),
+            **cls._distribution_facets("weight", WEIGHT_BUCKETS),
+        }
+        return [{"$match": dict(query or {})}, {"$facet": facets}]
+
+    @classmethod
+    def _stats_result(cls, facets: Dict[str, Any], group_by: Tuple[str, ...]) -> Dict[str, Any]:
+        counts = {
+            field: {group["_id"]: group["count"]
+                    for group in sorted(facets[f"by_{field}"], key=lambda g: (-g["count"], str(g["_id"])))}
+            for field in group_by
+        }
+        breakdown = sorted(
+            ({**group["_id"], "count": group["count"]} for group in facets["breakdown"]),
+            key=lambda row: (-row["count"], [str(row.get(field)) for field in group_by]),
+        )
+        return {
+            "total": facets["total"][0]["count"] if facets["total"] else 0,
+            "counts": counts,
+            "breakdown": breakdown,
+            "age": cls._distribution(facets, "age", AGE_BUCKETS),
+            "weight": cls._distribution(facets, "weight", WEIGHT_BUCKETS),
+        }
+
+    @instrumented("update_animal")
     def update_animal(self, animal_id: Union[str, ObjectId], updated_fields: Dict[str, Any]) -> bool:
         try:
-            result = self.collection.update_one(
+            # $set is safe to repeat, so a retried update just writes the same values
+            result = self._call(
+                self.collection.update_one,
                 {"_id": ObjectId(animal_id)},
-                {"$set": updated_fields}
+                {"$set": {**updated_fields, "updated_at": utcnow()}}
             )
+            if result.modified_count and any(field in updated_fields for field in SEARCH_FIELDS):
+                self._call(self._refresh_search_keys, [ObjectId(animal_id)])
             return result.modified_count > 0
         except errors.PyMongoError as exc:
             logging.error("Failed to update animal: %s", exc)
+            self.metrics.mark_failed()
             return False
+        finally:
+            self.cache.invalidate()
+
+    def _refresh_search_keys(self, ids: List[ObjectId]) -> None:
+        for doc in self.collection.find({"_id": {"$in": ids}}, {field: 1 for field in SEARCH_FIELDS}):
+            self.collection.update_one({"_id": doc["_id"]}, {"$set": {"search_keys": search_words(doc)}})
 
+    @instrumented("update_animals", count=lambda result: result[1])
+    def update_animals(self, animal_ids: List[Union[str, ObjectId]],
+                       updated_fields: Dict[str, Any], raise_errors: bool = False) -> Tuple[int, int]:
+        """
+        Applies the same ``$set`` to every listed animal with one update_many.
+        Returns (matched, modified). Errors are reported as (0, 0) unless
+        ``raise_errors`` is set, in which case the PyMongoError propagates.
+        """
+        if not animal_ids or not updated_fields:
+            return 0, 0
+        ids = [ObjectId(animal_id) for animal_id in animal_ids]
+        try:
+            result = self._call(
+                self.collection.update_many,
+                {"_id": {"$in": ids}},
+                {"$set": {**updated_fields, "updated_at": utcnow()}}
+            )
+            if result.modified_count and any(field in updated_fields for field in SEARCH_FIELDS):
+                self._call(self._refresh_search_keys, ids)
+            return result.matched_count, result.modified_count
+        except errors.PyMongoError as exc:
+            logging.error("Failed to update animals: %s", exc)
+            self.metrics.mark_failed()
+            if raise_errors:
+                raise
+            return 0, 0
+        finally:
+            self.cache.invalidate()
+
+    @instrumented("delete_animal")
     def delete_animal(self, animal_id: Union[str, ObjectId]) -> bool:
         try:
-            result = self.collection.delete_one({"_id": ObjectId(animal_id)})
+            result = self._call(self.collection.delete_one, {"_id": ObjectId(animal_id)})
+            if result.deleted_count:
+                self.resilience.insert_one(self.tombstones,
+                                           {"animal_id": ObjectId(animal_id), "deleted_at": utcnow()})
             return result.deleted_count > 0
         except errors.PyMongoError as exc:
             logging.error("Failed to delete animal: %s", exc)
+            self.metrics.mark_failed()
             return False
+        finally:
+            self.cache.invalidate()
+
+    @instrumented("delete_animals", count=lambda deleted: deleted)
+    def delete_animals(self, animal_ids: List[Union[str, ObjectId]], raise_errors: bool = False) -> int:
+        """
+        Deletes every listed animal in a single round trip and returns the deleted count.
+        Errors are reported as 0 unless ``raise_errors`` is set, in which case the
+        PyMongoError propagates.
+        """
+        if not animal_ids:
+            return 0
+        ids = [ObjectId(animal_id) for animal_id in animal_ids]
+        try:
+            result = self._call(self.collection.delete_many, {"_id": {"$in": ids}})
+            if result.deleted_count:
+                stamp = utcnow()
+                self.resilience.insert_many(
+                    self.tombstones, [{"animal_id": animal_id, "deleted_at": stamp} for animal_id in ids])
+            return result.deleted_count
+        except errors.PyMongoError as exc:
+            logging.error("Failed to delete animals: %s", exc)
+            self.metrics.mark_failed()
+            if raise_errors:
+                raise
+            return 0
+        finally:
+            self.cache.invalidate()
+
+    @instrumented("set_reserved_many", count=lambda result: result[1])
+    def set_reserved_many(self, animal_ids: List[Union[str, ObjectId]], reserved: bool,
+                          raise_errors: bool = False) -> Tuple[int, int]:
+        """
+        Sets the reserved flag on every listed animal with one update_many.
+        Returns (matched, modified); animals already in the requested state are
+        matched but not modified. Errors are reported as (0, 0) unless
+        ``raise_errors`` is set.
+        """
+        if not animal_ids:
+            return 0, 0
+        ids = [ObjectId(animal_id) for animal_id in animal_ids]
+        try:
+            result = self._call(self.collection.update_many, {"_id": {"$in": ids}},
+                                self._reserve_update(reserved))
+            return result.matched_count, result.modified_count
+        except errors.PyMongoError as exc:
+            logging.error("Failed to update animals: %s", exc)
+            self.metrics.mark_failed()
+            if raise_errors:
+                raise
+            return 0, 0
+        finally:
+            self.cache.invalidate()
+
+    @staticmethod
+    def _reserve_update(reserved: bool) -> List[Dict[str, Any]]:
+        # A pipeline update, so updated_at only moves on animals whose flag changes
+        # and modified_count leaves out the ones already in the requested state
+        return [{"$set": {
+            "updated_at": {"$cond": [{"$ne": ["$reserved", reserved]}, utcnow(), "$updated_at"]},
+            "reserved": reserved,
+        }}]
+
+
+_shared_lock = threading.Lock()
+_shared_db: Optional[AnimalDatabase] = None
+
+
+def get_database(**kwargs: Any) -> AnimalDatabase:
+    """
+    Returns the process-wide AnimalDatabase, creating it on first use.
+    Every window shares its MongoClient (and connection pool), so the ping,
+    index creation and admin bootstrap happen once per process.
+    Keyword arguments only apply to the call that creates the instance.
+    """
+    global _shared_db  # pylint: disable=global-statement
+    with _shared_lock:
+        if _shared_db is None:
+            _shared_db = AnimalDatabase(**kwargs)
+        return _shared_db
+
+
+def close_shared_database() -> None:
+    global _shared_db  # pylint: disable=global-statement
+    with _shared_lock:
+        if _shared_db is not None:
+            _shared_db.close()
+            _shared_db = None
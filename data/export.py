@@ -0,0 +1,147 @@
+"""
+data.export
+Streams animal query results from MongoDB straight to CSV, JSON Lines or Parquet files
+
+Usage: python -m data.export dogs.csv.gz --query dogs
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import logging
+import os
+import sys
+from typing import Any, Dict, Iterable, List, Optional
+
+from data.database_manager import APP_QUERIES, DEFAULT_PAGE_SIZE, DISPLAY_PROJECTION, get_database
+
+EXPORT_FIELDS: List[str] = ["_id"] + list(DISPLAY_PROJECTION)
+
+FORMATS = ("csv", "jsonl", "parquet")
+
+
+def detect_format(path: str) -> str:
+    name = path[:-3] if path.endswith(".gz") else path
+    for fmt in FORMATS:
+        if name.endswith("." + fmt):
+            return fmt
+    if name.endswith(".ndjson"):
+        return "jsonl"
+    raise ValueError(f"Cannot tell export format from {path}; use .csv, .jsonl or .parquet")
+
+
+def _open_text(path: str, compress: bool):
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def _write_csv(animals: Iterable[Dict[str, Any]], handle) -> int:
+    writer = csv.DictWriter(handle, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    count = 0
+    for animal in animals:
+        animal["_id"] = str(animal["_id"])
+        writer.writerow(animal)
+        count += 1
+    return count
+
+
+def _write_jsonl(animals: Iterable[Dict[str, Any]], handle) -> int:
+    count = 0
+    for animal in animals:
+        handle.write(json.dumps(animal, default=str))
+        handle.write("\n")
+        count += 1
+    return count
+
+
+def _write_parquet(animals: Iterable[Dict[str, Any]], path: str, batch_size: int,
+                   compression: str) -> int:
+    try:
+        import pyarrow as pa  # pylint: disable=import-outside-toplevel
+        import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+    except ImportError as exc:
+        raise RuntimeError("Parquet export requires the optional 'pyarrow' package") from exc
+
+    types = {"age": pa.int64(), "weight": pa.float64(), "reserved": pa.bool_()}
+    schema = pa.schema([(field, types.get(field, pa.string())) for field in EXPORT_FIELDS])
+
+    count = 0
+    columns: Dict[str, list] = {field: [] for field in EXPORT_FIELDS}
+    with pq.ParquetWriter(path, schema, compression=compression) as writer:
+        # One row group per batch keeps memory bounded by batch_size
+        for animal in animals:
+            animal["_id"] = str(animal["_id"])
+            for field in EXPORT_FIELDS:
+                columns[field].append(animal.get(field))
+            count += 1
+            if count % batch_size == 0:
+                writer.write_table(pa.table(columns, schema=schema))
+                columns = {field: [] for field in EXPORT_FIELDS}
+        if columns["_id"]:
+            writer.write_table(pa.table(columns, schema=schema))
+    return count
+
+
+def export_animals(
+    db,
+    path: str,
+    query: Optional[Dict[str, Any]] = None,
+    fmt: Optional[str] = None,
+    compress: Optional[bool] = None,
+    batch_size: int = DEFAULT_PAGE_SIZE,
+) -> int:
+    """
+    Writes every animal matching ``query`` to ``path`` and returns the row count.
+    Rows are pulled page by page from AnimalDatabase.iter_animals, so memory use
+    stays flat regardless of the result size. A ``.gz`` suffix turns on gzip for
+    CSV/JSONL; Parquet files use snappy unless ``compress`` is False.
+    If the server cannot be read part-way through, the partial file is removed
+    and the PyMongoError is raised.
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    # Exports are one-off scans; keep them out of the query cache
+    animals = db.iter_animals(query, batch_size=batch_size, projection=DISPLAY_PROJECTION,
+                              use_cache=False)
+    try:
+        if fmt == "parquet":
+            count = _write_parquet(animals, path, batch_size, "none" if compress is False else "snappy")
+        else:
+            gzip_output = path.endswith(".gz") if compress is None else compress
+            with _open_text(path, gzip_output) as handle:
+                count = _write_csv(animals, handle) if fmt == "csv" else _write_jsonl(animals, handle)
+    except Exception:
+        # A truncated export would pass for a complete one
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+    logging.info("Exported %d animals to %s", count, path)
+    return count
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export animals to CSV, JSON Lines or Parquet")
+    parser.add_argument("path", help="output file; format comes from the extension")
+    parser.add_argument("--query", choices=sorted(APP_QUERIES), default="all")
+    parser.add_argument("--format", choices=FORMATS, default=None)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--mongo-uri", default=None)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    db = get_database(mongo_uri=args.mongo_uri)
+    count = export_animals(db, args.path, APP_QUERIES[args.query], args.format,
+                           batch_size=args.batch_size)
+    print(f"Exported {count} animals to {args.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
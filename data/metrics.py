@@ -0,0 +1,247 @@
+"""
+data.metrics
+Per-operation call counts, error counts, document counts and latency histograms,
+with a local HTTP endpoint and periodic JSON dump for reading them
+"""
+
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, Optional, Tuple
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+# Histogram bucket upper bounds in seconds (Prometheus style, +Inf is implicit)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class OperationStats:
+    """
+    Counters and latency samples for one operation. Percentiles come from a
+    bounded window of recent samples; bucket counts cover the whole lifetime.
+    """
+
+    def __init__(self, window: int = 2048) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.documents = 0
+        self.total_seconds = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self._recent: deque = deque(maxlen=window)
+
+    def observe(self, seconds: float, documents: int = 0, failed: bool = False) -> None:
+        self.calls += 1
+        self.errors += int(failed)
+        self.documents += documents
+        self.total_seconds += seconds
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+        self._recent.append(seconds)
+
+    def percentile(self, pct: float) -> float:
+        if not self._recent:
+            return 0.0
+        ordered = sorted(self._recent)
+        rank = max(int(round(pct / 100 * len(ordered))) - 1, 0)
+        return ordered[min(rank, len(ordered) - 1)]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "documents": self.documents,
+            "total_seconds": self.total_seconds,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], self.buckets)),
+        }
+
+
+class MetricsRegistry:
+    """
+    Thread-safe collection of OperationStats keyed by operation name, plus
+    free-form gauges (e.g. cache sizes) read at snapshot time.
+    """
+
+    def __init__(self) -> None:
+        self._ops: Dict[str, OperationStats] = {}
+        self._gauges: Dict[str, Callable[[], float]] = {}
+        self._lock = threading.Lock()
+        # Running timers per thread and per asyncio task, innermost last
+        self._stack: ContextVar[Tuple[Dict[str, Any], ...]] = ContextVar(
+            f"metrics_timers_{id(self)}", default=())
+
+    def observe(self, op: str, seconds: float, documents: int = 0, failed: bool = False) -> None:
+        with self._lock:
+            stats = self._ops.get(op)
+            if stats is None:
+                stats = self._ops[op] = OperationStats()
+            stats.observe(seconds, documents, failed)
+
+    def register_gauge(self, name: str, read: Callable[[], float]) -> None:
+        with self._lock:
+            self._gauges[name] = read
+
+    @contextmanager
+    def timer(self, op: str) -> Iterator[Dict[str, Any]]:
+        """
+        Times the block under ``op``. The yielded dict may be updated with
+        ``documents`` or ``failed``; a raised exception always counts as failed.
+        """
+        outcome: Dict[str, Any] = {"documents": 0, "failed": False}
+        token = self._stack.set(self._stack.get() + (outcome,))
+        start = time.perf_counter()
+        try:
+            yield outcome
+        except BaseException:
+            outcome["failed"] = True
+            raise
+        finally:
+            self._stack.reset(token)
+            self.observe(op, time.perf_counter() - start, outcome["documents"], outcome["failed"])
+
+    def mark_failed(self) -> None:
+        """
+        Flags every running timer as failed, for code that handles an error
+        itself (logs and returns False) instead of raising. The enclosing
+        operations are flagged too: their result is missing what failed.
+        """
+        for outcome in self._stack.get():
+            outcome["failed"] = True
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            ops = {name: stats.snapshot() for name, stats in sorted(self._ops.items())}
+            gauges = dict(self._gauges)
+        values = {}
+        for name, read in gauges.items():
+            try:
+                values[name] = read()
+            except Exception as exc:  # pylint: disable=broad-except
+                logging.debug("Gauge %s failed: %s", name, exc)
+        return {"timestamp": time.time(), "operations": ops, "gauges": values}
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        snap = self.snapshot()
+        lines = []
+        for op, stats in snap["operations"].items():
+            label = f'op="{op}"'
+            lines.append(f"animal_db_calls_total{{{label}}} {stats['calls']}")
+            lines.append(f"animal_db_errors_total{{{label}}} {stats['errors']}")
+            lines.append(f"animal_db_documents_total{{{label}}} {stats['documents']}")
+            cumulative = 0
+            for bound, count in stats["buckets"].items():
+                cumulative += count
+                lines.append(f'animal_db_latency_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f"animal_db_latency_seconds_sum{{{label}}} {stats['total_seconds']}")
+            lines.append(f"animal_db_latency_seconds_count{{{label}}} {stats['calls']}")
+            for pct in ("p50", "p95", "p99"):
+                lines.append(f'animal_db_latency_seconds{{{label},quantile="{pct}"}} {stats[pct]}')
+        for name, value in snap["gauges"].items():
+            lines.append(f"animal_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._ops.clear()
+
+
+METRICS = MetricsRegistry()
+
+
+def instrumented(op: str, count: Optional[Callable[[Any], int]] = None):
+    """
+    Method decorator recording calls, latency and errors under ``op`` in the
+    instance's ``metrics`` registry. ``count`` maps the return value to the
+    number of documents it carried. Coroutine methods are timed until they
+    return, not until they first suspend.
+    """
+    def decorator(method):
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(self, *args, **kwargs):
+                registry = getattr(self, "metrics", METRICS)
+                with registry.timer(op) as outcome:
+                    result = await method(self, *args, **kwargs)
+                    if count is not None:
+                        outcome["documents"] = count(result)
+                    return result
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            registry = getattr(self, "metrics", METRICS)
+            with registry.timer(op) as outcome:
+                result = method(self, *args, **kwargs)
+                if count is not None:
+                    outcome["documents"] = count(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def serve_metrics(registry: MetricsRegistry = METRICS, port: int = 9464,
+                  host: str = "127.0.0.1") -> "ThreadingHTTPServer":
+    """
+    Serves /metrics (Prometheus text) and /metrics.json from a daemon thread.
+    """
+    # Imported here: http.server pulls in ssl and email, which the GUI rarely needs
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # pylint: disable=import-outside-toplevel
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):  # pylint: disable=invalid-name
+            if self.path == "/metrics":
+                body, content_type = registry.to_prometheus(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, content_type = registry.to_json(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):  # keep request noise out of the app log
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logging.info("Serving metrics on http://%s:%d/metrics", host, server.server_port)
+    return server
+
+
+def start_json_dump(path: str, interval: float = 60.0,
+                    registry: MetricsRegistry = METRICS) -> threading.Event:
+    """
+    Writes a JSON snapshot to ``path`` every ``interval`` seconds until the
+    returned event is set.
+    """
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            tmp = f"{path}.tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as handle:
+                    handle.write(registry.to_json())
+                os.replace(tmp, path)
+            except OSError as exc:
+                logging.error("Failed to write metrics to %s: %s", path, exc)
+
+    threading.Thread(target=run, name="metrics-dump", daemon=True).start()
+    return stop
@@ -0,0 +1,111 @@
+"""
+data.query_cache
+LRU + TTL cache for animal query results, keyed on a normalized query
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+def freeze(value: Any) -> Hashable:
+    """
+    Turns a query (nested dicts/lists) into a hashable key. Dict key order is
+    ignored so {"a": 1, "b": 2} and {"b": 2, "a": 1} share a cache entry.
+    Numbers and booleans carry their type: True == 1 in Python, but MongoDB
+    does not match a boolean field against a number.
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, (int, float)):  # bool is an int
+        return (type(value).__name__, value)
+    if isinstance(value, str) or value is None:
+        return value
+    return (type(value).__name__, str(value))
+
+
+class QueryCache:
+    """
+    Thread-safe result cache. Entries expire after ``ttl`` seconds and the least
+    recently used entry is evicted once ``maxsize`` is reached. ``maxsize=0``
+    disables caching entirely.
+
+    Expired and invalidated entries are kept aside (up to ``maxsize`` more) for
+    ``get(key, stale=True)``, the fallback while the database is unreachable.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._stale: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_hits = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def get(self, key: Hashable, stale: bool = False) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if stale and (entry is not None or key in self._stale):
+                self.stale_hits += 1
+                return entry[1] if entry is not None else self._stale[key]
+            if entry is None or entry[0] <= self._clock():
+                if entry is not None:
+                    del self._entries[key]
+                    self._keep_stale(key, entry[1])
+                    self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self) -> None:
+        with self._lock:
+            for key, (_, value) in self._entries.items():
+                self._keep_stale(key, value)
+            self._entries.clear()
+            self.invalidations += 1
+
+    def _keep_stale(self, key: Hashable, value: Any) -> None:
+        self._stale[key] = value
+        self._stale.move_to_end(key)
+        while len(self._stale) > self.maxsize:
+            self._stale.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "stale_hits": self.stale_hits,
+            }
@@ -0,0 +1,307 @@
+"""
+data.resilience
+Retries with jittered exponential backoff and a circuit breaker around
+MongoDB calls, so a brief election is ridden out and a longer outage fails fast
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from bson.objectid import ObjectId
+from pymongo import errors
+
+from data.metrics import MetricsRegistry
+
+# Server error codes that mean "try again shortly" (elections, shutdowns, network)
+RETRYABLE_CODES = frozenset({
+    6,      # HostUnreachable
+    7,      # HostNotFound
+    89,     # NetworkTimeout
+    91,     # ShutdownInProgress
+    189,    # PrimarySteppedDown
+    262,    # ExceededTimeLimit
+    9001,   # SocketException
+    10107,  # NotWritablePrimary
+    11600,  # InterruptedAtShutdown
+    11602,  # InterruptedDueToReplStateChange
+    13435,  # NotPrimaryNoSecondaryOk
+    13436,  # NotPrimaryOrSecondary
+})
+
+DUPLICATE_KEY = 11000
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(errors.PyMongoError):
+    """
+    Raised instead of calling the server while the breaker is open. It is a
+    PyMongoError, so the data layer's existing error handling covers it.
+    """
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"database unavailable; retrying in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """
+    True for failures that may succeed if repeated: lost connections, server
+    selection timeouts, primary step-downs and errors the server labels as
+    retryable. Validation errors, duplicate keys and the like are final.
+    """
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, errors.ConnectionFailure):  # AutoReconnect, NotPrimaryError, timeouts
+        return True
+    if isinstance(exc, errors.PyMongoError) and (exc.has_error_label("RetryableWriteError")
+                                                 or exc.has_error_label("TransientTransactionError")):
+        return True
+    return (isinstance(exc, errors.OperationFailure) and not isinstance(exc, errors.BulkWriteError)
+            and exc.code in RETRYABLE_CODES)
+
+
+def is_unavailable(exc: BaseException) -> bool:
+    # The database could not be reached, as opposed to rejecting the request
+    return isinstance(exc, CircuitOpenError) or is_retryable(exc)
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+class RetryPolicy:
+    """
+    Up to ``attempts`` tries per call. Before retry ``n`` (from 0) it sleeps a
+    random time between 0 and ``min(max_delay, base_delay * 2**n)`` ("full
+    jitter"), so clients that failed together do not retry in lockstep.
+    Each attempt can itself wait up to the driver's serverSelectionTimeoutMS
+    for a primary, so the defaults cover a typical election.
+    """
+
+    def __init__(self, attempts: int = 4, base_delay: float = 0.1, max_delay: float = 2.0,
+                 rng: Callable[[], float] = random.random) -> None:
+        if attempts < 1:
+            raise ValueError("attempts must be at least 1")
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rng = rng
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        """
+        MONGO_RETRY_ATTEMPTS, MONGO_RETRY_BASE_MS and MONGO_RETRY_MAX_MS.
+        """
+        return cls(attempts=int(os.getenv("MONGO_RETRY_ATTEMPTS", "4")),
+                   base_delay=_env_float("MONGO_RETRY_BASE_MS", 100) / 1000,
+                   max_delay=_env_float("MONGO_RETRY_MAX_MS", 2000) / 1000)
+
+    def delay(self, retry: int) -> float:
+        return self._rng() * min(self.max_delay, self.base_delay * 2 ** retry)
+
+
+class CircuitBreaker:
+    """
+    Opens after ``failure_threshold`` consecutive failed calls and then
+    rejects calls for ``reset_timeout`` seconds. After that one call is let
+    through as a probe (half-open): success closes the breaker, failure opens
+    it for another ``reset_timeout``. Thread-safe.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 15.0,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.opened = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls) -> "CircuitBreaker":
+        """
+        MONGO_BREAKER_FAILURES and MONGO_BREAKER_RESET_S.
+        """
+        return cls(failure_threshold=int(os.getenv("MONGO_BREAKER_FAILURES", "5")),
+                   reset_timeout=_env_float("MONGO_BREAKER_RESET_S", 15.0))
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._clock() >= self._opened_at + self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def retry_after(self) -> float:
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(self._opened_at + self.reset_timeout - self._clock(), 0.0)
+
+    def allow(self) -> bool:
+        """
+        Whether a call may go to the server now. In the half-open state only
+        the first caller gets through; the rest are rejected until it reports.
+        """
+        with self._lock:
+            if self._state == OPEN and self._clock() >= self._opened_at + self.reset_timeout:
+                self._state = HALF_OPEN
+                self._probing = False
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def release(self) -> None:
+        """
+        Ends a call that gave no verdict on the server, so a half-open breaker
+        lets the next caller probe instead of waiting for this one forever.
+        """
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != CLOSED:
+                logging.info("Database reachable again; circuit breaker closed")
+            self._state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self.opened += 1
+                    logging.warning("Circuit breaker open after %d failure(s); failing fast for %.0fs",
+                                    self._failures, self.reset_timeout)
+                self._state = OPEN
+                self._opened_at = self._clock()
+                self._probing = False
+
+
+class Resilience:
+    """
+    Runs database calls under a RetryPolicy and a CircuitBreaker. Retryable
+    failures are retried (for idempotent calls) and, once retries run out,
+    count against the breaker; any answer from the server, including an
+    error like a duplicate key, counts as healthy.
+    """
+
+    def __init__(self, policy: Optional[RetryPolicy] = None, breaker: Optional[CircuitBreaker] = None,
+                 sleep: Callable[[float], None] = time.sleep) -> None:
+        self.policy = policy if policy is not None else RetryPolicy()
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self._sleep = sleep
+        self.retries = 0
+
+    @classmethod
+    def from_env(cls) -> "Resilience":
+        return cls(RetryPolicy.from_env(), CircuitBreaker.from_env())
+
+    def register_metrics(self, registry: MetricsRegistry) -> None:
+        registry.register_gauge("breaker_state", lambda: STATE_VALUES[self.breaker.state])
+        registry.register_gauge("breaker_opened_total", lambda: self.breaker.opened)
+        registry.register_gauge("breaker_rejected_total", lambda: self.breaker.rejected)
+        registry.register_gauge("mongo_retries_total", lambda: self.retries)
+
+    def call(self, fn: Callable[..., Any], *args: Any, retry: bool = True, **kwargs: Any) -> Any:
+        """
+        ``fn(*args, **kwargs)``, retried on retryable errors when ``retry`` is
+        true (only pass it for calls that are safe to repeat). Raises
+        CircuitOpenError without calling ``fn`` while the breaker is open.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.breaker.retry_after())
+        attempt = 1
+        while True:
+            try:
+                result = fn(*args, **kwargs)
+            except errors.PyMongoError as exc:
+                if not is_retryable(exc):
+                    self.breaker.record_success()
+                    raise
+                if not retry or attempt >= self.policy.attempts:
+                    self.breaker.record_failure()
+                    raise
+                delay = self.policy.delay(attempt - 1)
+                logging.warning("Database call failed (%s); retry %d of %d in %.2fs",
+                                exc, attempt, self.policy.attempts - 1, delay)
+                self.retries += 1
+                self._sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                # Not the driver's (e.g. an OSError writing the snapshot), so it says
+                # nothing about the server; a half-open probe must not stay taken
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            return result
+
+    # ----- idempotent inserts -----
+    # The client-assigned _id is the idempotency key: if a retry hits a
+    # duplicate _id, an earlier attempt was stored before its reply was lost.
+
+    def insert_one(self, collection: Any, document: Dict[str, Any]) -> None:
+        document.setdefault("_id", ObjectId())
+        attempts = [0]
+
+        def attempt() -> None:
+            attempts[0] += 1
+            try:
+                collection.insert_one(document)
+            except errors.DuplicateKeyError as exc:
+                if attempts[0] == 1 or not _duplicate_id(exc.details or {}, str(exc)):
+                    raise
+
+        self.call(attempt)
+
+    def insert_many(self, collection: Any, documents: List[Dict[str, Any]]) -> int:
+        """
+        Unordered insert_many that is safe to retry. Returns the number of
+        documents stored; on a BulkWriteError, duplicate-_id errors caused by
+        an earlier attempt are counted as inserted rather than reported.
+        """
+        for document in documents:
+            document.setdefault("_id", ObjectId())
+        attempts = [0]
+
+        def attempt() -> int:
+            attempts[0] += 1
+            try:
+                return len(collection.insert_many(documents, ordered=False).inserted_ids)
+            except errors.BulkWriteError as exc:
+                if attempts[0] == 1:
+                    raise
+                write_errors = exc.details.get("writeErrors", [])
+                rest = [err for err in write_errors
+                        if not (err.get("code") == DUPLICATE_KEY and _duplicate_id(err, err.get("errmsg", "")))]
+                if not rest:
+                    return len(documents)
+                exc.details["nInserted"] = exc.details.get("nInserted", 0) + len(write_errors) - len(rest)
+                exc.details["writeErrors"] = rest
+                raise
+
+        return self.call(attempt)
+
+
+def _duplicate_id(details: Dict[str, Any], message: str) -> bool:
+    key_pattern = details.get("keyPattern")
+    if key_pattern is not None:
+        return key_pattern == {"_id": 1}
+    return "index: _id_ " in message
@@ -0,0 +1,132 @@
+"""
+data.search_index
+Word-prefix search over animal names, breeds/species and countries,
+both as a MongoDB filter and as an in-memory index over loaded rows
+"""
+
+import re
+from bisect import bisect_left
+from typing import Any, Dict, List, Mapping, Optional, Set
+
+SEARCH_FIELDS = ("name", "breed", "species", "acquisition_country", "in_service_country")
+
+_WORD = re.compile(r"\w+")
+_PREFIX_SIZES = (1, 2, 3)
+
+
+def search_tokens(text: str) -> List[str]:
+    """
+    Lower-cased words of ``text``; a query matches a row when every token is a
+    prefix of one of the row's words.
+    """
+    return _WORD.findall(text.lower())
+
+
+def search_words(doc: Mapping[str, Any]) -> List[str]:
+    """
+    Distinct words of the searchable fields, stored on each document as
+    ``search_keys`` so one multikey index serves prefix queries on all of them.
+    """
+    words: Set[str] = set()
+    for field in SEARCH_FIELDS:
+        value = doc.get(field)
+        if isinstance(value, str):
+            words.update(search_tokens(value))
+    return sorted(words)
+
+
+def search_filter(text: str) -> Dict[str, Any]:
+    """
+    MongoDB filter for ``text``. Each token becomes an anchored regex on the
+    ``search_keys`` index, which the server answers with an index range scan.
+    """
+    clauses = [{"search_keys": {"$regex": f"^{re.escape(token)}"}} for token in search_tokens(text)]
+    if not clauses:
+        return {}
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+class SearchIndex:
+    """
+    In-memory index over the rows loaded in the table. Tokens of up to three
+    characters are answered exactly by a table of 1-3 character word prefixes;
+    longer tokens intersect that with trigrams of " " + word (the leading space
+    pins the first trigram to the start of a word) and the candidates are
+    checked with ``startswith``, so results match ``search_filter`` exactly.
+    """
+
+    def __init__(self) -> None:
+        self._words: Dict[str, List[str]] = {}
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._prefixes: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    @staticmethod
+    def _grams(word: str) -> Set[str]:
+        padded = f" {word}"
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def add(self, key: str, doc: Mapping[str, Any]) -> None:
+        self.remove(key)
+        words = search_words(doc)
+        self._words[key] = words
+        for word in words:
+            for gram in self._grams(word):
+                self._trigrams.setdefault(gram, set()).add(key)
+            for size in _PREFIX_SIZES:
+                self._prefixes.setdefault(word[:size], set()).add(key)
+
+    def remove(self, key: str) -> None:
+        words = self._words.pop(key, None)
+        if not words:
+            return
+        for word in words:
+            for gram in self._grams(word):
+                self._trigrams[gram].discard(key)
+            for size in _PREFIX_SIZES:
+                self._prefixes[word[:size]].discard(key)
+
+    def clear(self) -> None:
+        self._words.clear()
+        self._trigrams.clear()
+        self._prefixes.clear()
+
+    def _candidates(self, token: str) -> Set[str]:
+        if len(token) <= _PREFIX_SIZES[-1]:
+            return self._prefixes.get(token, set())
+        sets = [self._prefixes.get(token[:_PREFIX_SIZES[-1]], set())]
+        sets += [self._trigrams.get(gram, set()) for gram in self._grams(token)]
+        sets.sort(key=len)
+        return set(sets[0]).intersection(*sets[1:])
+
+    def search(self, text: str) -> Optional[Set[str]]:
+        """
+        Keys of the rows matching ``text``, or ``None`` for an empty query
+        (meaning "everything").
+        """
+        tokens = search_tokens(text)
+        if not tokens:
+            return None
+        result: Optional[Set[str]] = None
+        for token in sorted(tokens, key=len, reverse=True):
+            candidates = self._candidates(token) if result is None else result & self._candidates(token)
+            if len(token) <= _PREFIX_SIZES[-1]:
+                # The prefix table is exact; only trigram hits need checking
+                result = set(candidates)
+            else:
+                result = {key for key in candidates if self._has_prefix(self._words[key], token)}
+            if not result:
+                break
+        return result
+
+    @staticmethod
+    def _has_prefix(words: List[str], token: str) -> bool:
+        # words are sorted, so the only candidate is where token would be inserted
+        pos = bisect_left(words, token)
+        return pos < len(words) and words[pos].startswith(token)
+
+    def matches(self, key: str, text: str) -> bool:
+        words = self._words.get(key, [])
+        return all(self._has_prefix(words, token) for token in search_tokens(text))
@@ -0,0 +1,510 @@
+"""
+data.service
+Local HTTP/JSON service in front of one shared AnimalDatabase, so thin clients
+and scripts share its connection pool, query cache and login sessions
+
+Usage: python -m data.service [--port 8080] [--max-pool-size 50]
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import logging
+import re
+import sys
+import threading
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Hashable, List, Mapping, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from bson import json_util
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+from data.bulk_import import build_animals
+from data.database_manager import (
+    APP_QUERIES, DEFAULT_PAGE_SIZE, DISPLAY_PROJECTION, AnimalDatabase, close_shared_database, get_database
+)
+from data.query_cache import freeze
+from data.resilience import OPEN
+
+DEFAULT_PORT = 8080
+MAX_PAGE_SIZE = 1000
+MAX_BULK = 10_000
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+# Fields clients may sort on and set; everything else is server-managed
+EDITABLE_FIELDS = frozenset(DISPLAY_PROJECTION) - {"animal_type"}
+SORT_FIELDS = frozenset(DISPLAY_PROJECTION) | {"_id"}
+
+Response = Tuple[int, Dict[str, str], bytes]
+
+
+class ServiceError(Exception):
+    """
+    A request the service refuses; becomes a JSON ``{"error": ...}`` response
+    with ``status``.
+    """
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def to_json(value: Any) -> bytes:
+    # ObjectIds go out as plain hex strings, which every endpoint accepts back
+    return json.dumps(value, default=_json_default, separators=(",", ":")).encode()
+
+
+def encode_cursor(after: Optional[Tuple[Any, ...]]) -> Optional[str]:
+    """
+    The keyset cursor of a page as an opaque URL-safe token. Extended JSON
+    keeps ObjectIds and dates intact on the way back in.
+    """
+    if after is None:
+        return None
+    return base64.urlsafe_b64encode(json_util.dumps(list(after)).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[Any, ...]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        after = json_util.loads(raw)
+    except (ValueError, TypeError) as exc:
+        raise ServiceError(400, "invalid cursor") from exc
+    if not isinstance(after, list):
+        raise ServiceError(400, "invalid cursor")
+    return tuple(after)
+
+
+def etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def _object_id(value: Any) -> ObjectId:
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError) as exc:
+        raise ServiceError(400, f"invalid animal id {value!r}") from exc
+
+
+class AnimalService:
+    """
+    Routes requests to an AnimalDatabase. ``handle()`` takes the parsed parts
+    of a request and returns (status, headers, body) without touching a
+    socket; ``make_server()`` puts it behind HTTP.
+
+    Every endpoint but ``/health`` and ``/login`` needs ``Authorization:
+    Bearer <token>`` from ``POST /login``; creating users needs an admin.
+    A user still on their first-login password can only call ``POST
+    /password`` (which returns a fresh token) and ``/logout``; everything
+    else answers 403 until the password is changed.
+    GET responses carry an ETag and answer a matching ``If-None-Match`` with
+    304. Their encoded bodies are cached in the database's QueryCache, so they
+    are shared by every client and dropped by any write made through it.
+    Concurrent misses on the same response are computed once. While the
+    database's circuit breaker is open, writes get 503 with Retry-After and
+    reads are answered from cached results where there are any. A read the
+    data layer fails on gets 503 and is not cached.
+    """
+
+    def __init__(self, db: AnimalDatabase) -> None:
+        self.db = db
+        self._inflight: Dict[Hashable, List[Any]] = {}
+        self._inflight_lock = threading.Lock()
+        self._routes: List[Tuple[str, "re.Pattern[str]", str, Callable[..., Any]]] = []
+        for method, pattern, handler in (
+            ("GET", r"/health", self._health),
+            ("POST", r"/login", self._login),
+            ("POST", r"/logout", self._logout),
+            ("POST", r"/password", self._change_password),
+            ("POST", r"/users", self._create_user),
+            ("GET", r"/animals", self._list_animals),
+            ("POST", r"/animals", self._insert_animals),
+            ("PATCH", r"/animals", self._update_animals),
+            ("POST", r"/animals/reserve", self._reserve_animals),
+            ("POST", r"/animals/delete", self._delete_animals),
+            ("GET", r"/animals/(?P<animal_id>[0-9a-fA-F]{24})", self._get_animal),
+            ("PATCH", r"/animals/(?P<animal_id>[0-9a-fA-F]{24})", self._update_animal),
+            ("DELETE", r"/animals/(?P<animal_id>[0-9a-fA-F]{24})", self._delete_animal),
+            ("GET", r"/counts", self._counts),
+            ("GET", r"/stats", self._stats),
+        ):
+            self._routes.append((method, re.compile(pattern + r"/?\Z"), pattern, handler))
+
+    # ----- dispatch -----
+
+    def handle(self, method: str, path: str, params: Mapping[str, List[str]],
+               headers: Mapping[str, str], body: bytes = b"") -> Response:
+        """
+        ``params`` is a parse_qs() mapping and ``headers`` any mapping of
+        request headers (names are matched case-insensitively).
+        """
+        headers = {name.lower(): value for name, value in headers.items()}
+        route, handler, match = self._route(method, path)
+        if handler is None:
+            return self._error(405 if route else 404, "method not allowed" if route else "not found")
+        with self.db.metrics.timer(f"http.{method} {route}") as outcome:
+            try:
+                kwargs = dict(match.groupdict())
+                if route in ("/logout", "/password"):
+                    kwargs["token"] = self._bearer(headers)
+                if route not in ("/health", "/login", "/logout"):
+                    kwargs["user"] = self._authenticate(headers, first_login=route == "/password")
+                if method in ("POST", "PATCH"):
+                    kwargs["payload"] = self._payload(body)
+                if method != "GET" and "user" in kwargs and self.db.resilience.breaker.state == OPEN:
+                    # Nothing was attempted, so the client can safely send the same request again
+                    retry_after = self.db.resilience.breaker.retry_after()
+                    status, headers, data = self._error(503, "database unavailable")
+                    return status, {**headers, "Retry-After": str(max(int(retry_after + 0.5), 1))}, data
+                if method == "GET" and route != "/health":
+                    return self._cached(path, params, headers, lambda: handler(params, **kwargs), outcome)
+                status, result = handler(params, **kwargs)
+                return status, {}, to_json(result)
+            except ServiceError as exc:
+                outcome["failed"] = exc.status >= 500
+                return self._error(exc.status, str(exc))
+            except Exception as exc:  # pylint: disable=broad-except
+                logging.exception("Request %s %s failed: %s", method, path, exc)
+                outcome["failed"] = True
+                return self._error(500, "internal error")
+
+    def _route(self, method: str, path: str):
+        route = None
+        for route_method, pattern, name, handler in self._routes:
+            match = pattern.match(path)
+            if match:
+                route = name
+                if route_method == method:
+                    return name, handler, match
+        return route, None, None
+
+    @staticmethod
+    def _error(status: int, message: str) -> Response:
+        headers = {"WWW-Authenticate": "Bearer"} if status == 401 else {}
+        return status, headers, to_json({"error": message})
+
+    @staticmethod
+    def _bearer(headers: Mapping[str, str]) -> Optional[str]:
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        return (token.strip() or None) if scheme.lower() == "bearer" else None
+
+    def _authenticate(self, headers: Mapping[str, str], first_login: bool = False) -> Dict[str, Any]:
+        # ``first_login`` admits sessions still on a temporary password
+        user = self.db.session_user(self._bearer(headers))
+        if user is None:
+            raise ServiceError(401, "login required")
+        if user.get("is_first_login") and not first_login:
+            raise ServiceError(403, "password change required")
+        return user
+
+    @staticmethod
+    def _payload(body: bytes) -> Any:
+        try:
+            return json.loads(body or b"null")
+        except ValueError as exc:
+            raise ServiceError(400, f"request body is not valid JSON: {exc}") from exc
+
+    def _cached(self, path: str, params: Mapping[str, List[str]], headers: Mapping[str, str],
+                build: Callable[[], Tuple[int, Any]], outcome: Dict[str, Any]) -> Response:
+        # Responses do not depend on who asks, so one cached body serves every client
+        key = freeze(("http", path, params))
+        cached = self.db.cache.get(key)
+        if cached is None:
+            cached = self._build_once(key, build, outcome)
+        body, tag = cached
+        response_headers = {"ETag": tag, "Cache-Control": "no-cache"}
+        if tag in {value.strip() for value in headers.get("if-none-match", "").split(",")}:
+            return 304, response_headers, b""
+        return 200, response_headers, body
+
+    def _build_once(self, key: Hashable, build: Callable[[], Tuple[int, Any]],
+                    outcome: Dict[str, Any]) -> Tuple[bytes, str]:
+        # After a write invalidates the cache, every client asks again at once;
+        # the first request for a key builds it and the rest wait for its result
+        with self._inflight_lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = [threading.Event(), None]
+        if not leader:
+            flight[0].wait()
+            if flight[1] is not None:
+                return flight[1]
+            # The leader failed; try on our own so its error is reported here too
+            return self._encode(build, outcome)
+        try:
+            flight[1] = self._encode(build, outcome)
+            # Reads answered from stale data during an outage are not cached as fresh
+            if self.db.available:
+                self.db.cache.put(key, flight[1])
+            return flight[1]
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+            flight[0].set()
+
+    @staticmethod
+    def _encode(build: Callable[[], Tuple[int, Any]], outcome: Dict[str, Any]) -> Tuple[bytes, str]:
+        _, result = build()
+        if outcome["failed"]:
+            # The data layer logged an error (mark_failed flags the request's timer)
+            # and answered with an empty result, which must not pass for the real one
+            raise ServiceError(503, "database unavailable")
+        body = to_json(result)
+        return body, etag(body)
+
+    # ----- parameters -----
+
+    @staticmethod
+    def _param(params: Mapping[str, List[str]], name: str, default: Optional[str] = None) -> Optional[str]:
+        values = params.get(name)
+        return values[-1] if values else default
+
+    def _view(self, params: Mapping[str, List[str]]) -> Dict[str, Any]:
+        view = self._param(params, "view", "all")
+        if view not in APP_QUERIES:
+            raise ServiceError(400, f"view must be one of {', '.join(sorted(APP_QUERIES))}")
+        return APP_QUERIES[view]
+
+    def _limit(self, params: Mapping[str, List[str]]) -> int:
+        try:
+            limit = int(self._param(params, "limit", str(DEFAULT_PAGE_SIZE)))
+        except ValueError as exc:
+            raise ServiceError(400, "limit must be an integer") from exc
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ServiceError(400, f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        return limit
+
+    def _sort(self, params: Mapping[str, List[str]]) -> Optional[List[Tuple[str, int]]]:
+        # sort=name,-age: comma-separated fields, a leading "-" for descending
+        text = self._param(params, "sort")
+        if not text:
+            return None
+        sort = []
+        for item in text.split(","):
+            field = item.strip().lstrip("-")
+            if field not in SORT_FIELDS:
+                raise ServiceError(400, f"cannot sort on {field!r}")
+            sort.append((field, DESCENDING if item.strip().startswith("-") else ASCENDING))
+        return sort
+
+    @staticmethod
+    def _ids(payload: Any) -> List[ObjectId]:
+        ids = payload.get("ids") if isinstance(payload, dict) else None
+        if not isinstance(ids, list) or not ids:
+            raise ServiceError(400, "ids must be a non-empty list")
+        if len(ids) > MAX_BULK:
+            raise ServiceError(413, f"at most {MAX_BULK} ids per request")
+        return [_object_id(animal_id) for animal_id in ids]
+
+    @staticmethod
+    def _fields(fields: Any) -> Dict[str, Any]:
+        if not isinstance(fields, dict) or not fields:
+            raise ServiceError(400, "expected an object of fields to set")
+        unknown = sorted(set(fields) - EDITABLE_FIELDS)
+        if unknown:
+            raise ServiceError(400, f"cannot set {', '.join(unknown)}")
+        if "reserved" in fields and not isinstance(fields["reserved"], bool):
+            raise ServiceError(400, "reserved must be true or false")
+        return fields
+
+    # ----- sessions and users -----
+
+    def _health(self, _params):
+        try:
+            self.db.client.admin.command("ping")
+        except Exception as exc:  # pylint: disable=broad-except
+            raise ServiceError(503, f"database unavailable: {exc}") from exc
+        return 200, {"status": "ok", "breaker": self.db.resilience.breaker.state}
+
+    def _login(self, _params, payload):
+        if not isinstance(payload, dict) or not payload.get("username") or not payload.get("password"):
+            raise ServiceError(400, "username and password are required")
+        user, first_login, token = self.db.login(str(payload["username"]), str(payload["password"]))
+        if user is None:
+            raise ServiceError(401, "invalid username or password")
+        return 200, {"token": token, "username": user["username"], "role": user.get("role"),
+                     "first_login": first_login, "expires_in": self.db.sessions.ttl}
+
+    def _logout(self, _params, token, payload):  # pylint: disable=unused-argument
+        # Closing an unknown or expired token is harmless, so it always succeeds
+        self.db.logout(token)
+        return 200, {"logged_out": True}
+
+    def _change_password(self, _params, token, user, payload):
+        if not isinstance(payload, dict) or not payload.get("password") or not payload.get("new_password"):
+            raise ServiceError(400, "password and new_password are required")
+        new_password = str(payload["new_password"])
+        if len(new_password) < 6:
+            raise ServiceError(400, "new_password must be at least 6 characters")
+        # Checked against the session's own record of the password, not bcrypt
+        current = self.db.reauthenticate(token, user["username"], str(payload["password"]))
+        if current is None:
+            raise ServiceError(403, "current password is incorrect")
+        token = self.db.set_password(current, new_password)
+        return 200, {"token": token, "username": current["username"], "expires_in": self.db.sessions.ttl}
+
+    def _create_user(self, _params, user, payload):
+        if not self.db.is_admin(user):
+            raise ServiceError(403, "only admins can create users")
+        if not isinstance(payload, dict) or not payload.get("username") or not payload.get("password"):
+            raise ServiceError(400, "username and password are required")
+        role = payload.get("role", "user")
+        if role not in {"user", "admin"}:
+            raise ServiceError(400, "role must be 'user' or 'admin'")
+        try:
+            self.db.create_user(str(payload["username"]), str(payload["password"]), role)
+        except ValueError as exc:
+            raise ServiceError(409, str(exc)) from exc
+        return 201, {"username": payload["username"], "role": role}
+
+    # ----- animals: reads -----
+
+    def _list_animals(self, params, user):  # pylint: disable=unused-argument
+        after = self._param(params, "after")
+        docs, next_after = self.db.find_animals_page(
+            self._view(params), after=decode_cursor(after) if after else None,
+            limit=self._limit(params), sort=self._sort(params), projection=DISPLAY_PROJECTION,
+        )
+        return 200, {"animals": docs, "next": encode_cursor(next_after)}
+
+    def _get_animal(self, _params, user, animal_id):  # pylint: disable=unused-argument
+        docs, _ = self.db.find_animals_page({"_id": _object_id(animal_id)}, limit=1,
+                                            projection=DISPLAY_PROJECTION)
+        if not docs:
+            raise ServiceError(404, "animal not found")
+        return 200, docs[0]
+
+    def _counts(self, params, user):  # pylint: disable=unused-argument
+        views = (self._param(params, "views") or ",".join(APP_QUERIES)).split(",")
+        unknown = sorted(set(views) - set(APP_QUERIES))
+        if unknown:
+            raise ServiceError(400, f"unknown views: {', '.join(unknown)}")
+        return 200, self.db.count_animals_many({view: APP_QUERIES[view] for view in views})
+
+    def _stats(self, params, user):  # pylint: disable=unused-argument
+        return 200, self.db.animal_stats(self._view(params))
+
+    # ----- animals: writes -----
+
+    def _insert_animals(self, _params, user, payload):  # pylint: disable=unused-argument
+        records = payload if isinstance(payload, list) else [payload]
+        if not records or not all(isinstance(record, dict) for record in records):
+            raise ServiceError(400, "expected an animal object or a list of them")
+        if len(records) > MAX_BULK:
+            raise ServiceError(413, f"at most {MAX_BULK} animals per request")
+        docs, failures = build_animals(records)
+        valid = [i for i, doc in enumerate(docs) if doc is not None]
+        inserted, rejected = self.db.insert_animals([docs[i] for i in valid])
+        failures += [(valid[pos], message) for pos, message in rejected]
+        failed = {index for index, _ in failures}
+        # The driver fills in _id on the documents it was given
+        ids = [docs[i].get("_id") for i in valid if i not in failed]
+        return (201 if inserted else 400), {
+            "inserted": inserted, "ids": ids,
+            "failures": [{"index": index, "error": message} for index, message in sorted(failures)],
+        }
+
+    def _update_animals(self, _params, user, payload):  # pylint: disable=unused-argument
+        ids = self._ids(payload)
+        matched, modified = self.db.update_animals(ids, self._fields(payload.get("set")))
+        return 200, {"matched": matched, "modified": modified}
+
+    def _update_animal(self, _params, user, payload, animal_id):  # pylint: disable=unused-argument
+        matched, modified = self.db.update_animals([_object_id(animal_id)], self._fields(payload))
+        if not matched:
+            raise ServiceError(404, "animal not found")
+        return 200, {"matched": matched, "modified": modified}
+
+    def _reserve_animals(self, _params, user, payload):  # pylint: disable=unused-argument
+        ids = self._ids(payload)
+        if not isinstance(payload.get("reserved"), bool):
+            raise ServiceError(400, "reserved must be true or false")
+        matched, modified = self.db.set_reserved_many(ids, payload["reserved"])
+        return 200, {"matched": matched, "modified": modified}
+
+    def _delete_animals(self, _params, user, payload):  # pylint: disable=unused-argument
+        return 200, {"deleted": self.db.delete_animals(self._ids(payload))}
+
+    def _delete_animal(self, _params, user, animal_id):  # pylint: disable=unused-argument
+        if not self.db.delete_animals([_object_id(animal_id)]):
+            raise ServiceError(404, "animal not found")
+        return 200, {"deleted": 1}
+
+
+def make_server(service: AnimalService, host: str = "127.0.0.1",
+                port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    """
+    An HTTP/1.1 server (keep-alive, one thread per connection) for
+    ``service``. Call ``serve_forever()`` on it; ``port=0`` picks a free port.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _dispatch(self):
+            url = urlsplit(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_BODY_BYTES:
+                self.close_connection = True
+                status, headers, body = AnimalService._error(413, "request body too large")  # pylint: disable=protected-access
+            else:
+                payload = self.rfile.read(length) if length else b""
+                status, headers, body = service.handle(self.command, url.path, parse_qs(url.query),
+                                                       dict(self.headers.items()), payload)
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            if status != 304:
+                self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = do_POST = do_PATCH = do_DELETE = _dispatch
+
+        def log_message(self, *args):  # per-request timings go to the metrics registry instead
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve the animal database over HTTP/JSON")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--mongo-uri", default=None)
+    parser.add_argument("--max-pool-size", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    server = make_server(AnimalService(get_database(mongo_uri=args.mongo_uri,
+                                                    max_pool_size=args.max_pool_size)),
+                         args.host, args.port)
+    logging.info("Serving animals on http://%s:%d", args.host, server.server_port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        close_shared_database()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""
+data.snapshot
+Local read-only copy of the animals collection in a compact columnar file,
+memory-mapped so the GUI can show it at once and keep serving reads while
+MongoDB is unreachable
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Union
+
+from animals.animal_batch import STRING_FIELDS, AnimalBatch
+
+MAGIC = b"ANIMSNP1"
+VERSION = 1
+
+_HEADER_LENGTH = struct.Struct("<I")
+_ID_SIZE = 12  # ObjectId bytes
+
+# Column name -> memoryview format, in file order
+_COLUMN_FORMATS = {**{field: "I" for field in STRING_FIELDS},
+                   "age": "q", "weight": "d", "reserved": "B", "_id": "B"}
+
+
+def snapshot_path() -> str:
+    """
+    ANIMAL_SNAPSHOT, or animals.snapshot in ~/.grazioso.
+    """
+    return os.getenv("ANIMAL_SNAPSHOT") or os.path.join(
+        os.path.expanduser("~"), ".grazioso", "animals.snapshot")
+
+
+def _aligned(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def write_snapshot(path: str, rows: Union[AnimalBatch, Iterable[Mapping[str, Any]]],
+                   synced_at: datetime) -> int:
+    """
+    Writes ``rows`` (animal documents with ObjectId ``_id``s, or a batch of
+    them) to ``path``, replacing it atomically. ``synced_at`` is when the rows
+    were read from the server; changes after it are fetched on the next sync.
+    The layout is a JSON header (row count, distinct strings, column offsets)
+    followed by the raw AnimalBatch columns, 8-byte aligned, in native byte
+    order. Returns the number of animals written.
+    """
+    batch = rows if isinstance(rows, AnimalBatch) else AnimalBatch.from_documents(rows)
+    values, buffers = batch.to_buffers()
+    buffers["_id"] = b"".join(bytes.fromhex(str(animal_id)) for animal_id in batch.column("_id"))
+
+    columns: Dict[str, List[int]] = {}
+    offset = 0
+    for name in _COLUMN_FORMATS:
+        size = memoryview(buffers[name]).nbytes
+        columns[name] = [offset, size]
+        offset = _aligned(offset + size)
+    header = json.dumps({
+        "version": VERSION, "rows": len(batch), "synced_at": synced_at.isoformat(),
+        "byteorder": sys.byteorder, "columns": columns,
+        "strings": {field: values[field][1:] for field in STRING_FIELDS},
+    }).encode()
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as handle:
+        handle.write(MAGIC + _HEADER_LENGTH.pack(len(header)) + header)
+        handle.write(b"\0" * (_aligned(handle.tell()) - handle.tell()))
+        start = handle.tell()
+        for name, (column_offset, _) in columns.items():
+            handle.write(b"\0" * (start + column_offset - handle.tell()))
+            handle.write(buffers[name])
+    os.replace(tmp, path)
+    return len(batch)
+
+
+class _HexIds(Sequence):
+    # ``_id`` column of a mapped snapshot: 12 bytes per row, read as hex on demand
+    def __init__(self, view: memoryview) -> None:
+        self._view = view
+
+    def __len__(self) -> int:
+        return len(self._view) // _ID_SIZE
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("snapshot row out of range")
+        return self._view[row * _ID_SIZE:(row + 1) * _ID_SIZE].hex()
+
+
+class Snapshot:
+    """
+    A snapshot file opened read-only. ``batch`` is an AnimalBatch over slices
+    of the memory map, so opening costs one header parse, not a pass over the
+    rows, and the OS pages columns in as they are read. Ids come back as hex
+    strings rather than ObjectIds.
+
+    ``find()`` returns ordinary (copied) batches that outlive ``close()``;
+    ``batch`` itself must not be used after it.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views: List[memoryview] = []
+        try:
+            self._open()
+        except Exception:
+            self.close()
+            raise
+
+    def _view(self, view: memoryview) -> memoryview:
+        self._views.append(view)
+        return view
+
+    def _open(self) -> None:
+        view = self._view(memoryview(self._map))
+        if view[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not an animal snapshot")
+        (length,) = _HEADER_LENGTH.unpack_from(view, len(MAGIC))
+        header_start = len(MAGIC) + _HEADER_LENGTH.size
+        header = json.loads(bytes(view[header_start:header_start + length]))
+        if header["version"] != VERSION or header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{self.path} was written by an incompatible version or platform")
+        start = _aligned(header_start + length)
+
+        buffers = {}
+        for name, fmt in _COLUMN_FORMATS.items():
+            offset, size = header["columns"][name]
+            buffers[name] = self._view(self._view(view[start + offset:start + offset + size]).cast(fmt))
+        self.rows: int = header["rows"]
+        self.synced_at = datetime.fromisoformat(header["synced_at"])
+        values = {field: [None] + strings for field, strings in header["strings"].items()}
+        self.batch = AnimalBatch.from_buffers(self.rows, values, buffers, _HexIds(buffers["_id"]))
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def find(self, query: Optional[Dict[str, Any]] = None) -> AnimalBatch:
+        """
+        Rows matching ``query``, which may use equality and ``$in`` (the
+        APP_QUERIES shapes).
+        """
+        equals = {}
+        for field, condition in (query or {}).items():
+            if isinstance(condition, dict):
+                if set(condition) != {"$in"}:
+                    raise ValueError(f"unsupported snapshot condition on {field}: {condition}")
+                equals[field] = list(condition["$in"])
+            else:
+                equals[field] = condition
+        return self.batch.filter(**equals)
+
+    def close(self) -> None:
+        # The map can only be closed once no memoryview exports it
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._map.close()
+
+
+def open_snapshot(path: str) -> Optional[Snapshot]:
+    """
+    The snapshot at ``path``, or None when there is none yet or it cannot be
+    read (it is rewritten on the next sync).
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        return Snapshot(path)
+    except (OSError, ValueError, KeyError) as exc:
+        logging.warning("Ignoring unreadable snapshot %s: %s", path, exc)
+        return None
@@ -0,0 +1,198 @@
+"""
+data.user_provisioning
+Creates many user accounts at once, hashing passwords on all cores
+
+Usage: python -m data.user_provisioning users.csv [--workers 8] [--output results.csv]
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import secrets
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from data.auth import hash_password
+from data.bulk_import import read_records
+from data.database_manager import get_database
+
+DEFAULT_BATCH_SIZE = 500
+
+ROLES = {"user", "admin"}
+
+RESULT_FIELDS = ["row", "username", "role", "status", "message", "password"]
+
+
+class ProvisionResult:
+    """
+    Outcome for one input row. ``password`` is only set for passwords that were
+    generated here, so they can be handed to the new user.
+    """
+
+    __slots__ = ("row", "username", "role", "status", "message", "password")
+
+    def __init__(self, row: int, username: str, role: str, status: str,
+                 message: str = "", password: str = "") -> None:
+        self.row = row
+        self.username = username
+        self.role = role
+        self.status = status
+        self.message = message
+        self.password = password
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in RESULT_FIELDS}
+
+
+def _hash(job: Tuple[str, int]) -> bytes:
+    # Top-level so worker processes can unpickle it
+    password, rounds = job
+    return hash_password(password, rounds)
+
+
+def hash_passwords(passwords: Sequence[str], rounds: int, workers: Optional[int] = None) -> List[bytes]:
+    """
+    bcrypt-hashes ``passwords`` in order, spread over ``workers`` processes
+    (default: every core). ``workers=1`` hashes in this process.
+    """
+    workers = workers or os.cpu_count() or 1
+    jobs = [(password, rounds) for password in passwords]
+    if workers == 1 or len(jobs) < 2:
+        return [_hash(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        return list(pool.map(_hash, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+
+def _parse(row_no: int, raw: Any, seen: set) -> Tuple[Optional[Dict[str, Any]], Optional[ProvisionResult]]:
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except json.JSONDecodeError as exc:
+            return None, ProvisionResult(row_no, "", "", "invalid", f"bad JSON: {exc}")
+    if not isinstance(raw, dict):
+        return None, ProvisionResult(row_no, "", "", "invalid", "record must be an object")
+    username = str(raw.get("username") or "").strip()
+    role = str(raw.get("role") or "user").strip().lower()
+    if not username:
+        return None, ProvisionResult(row_no, "", role, "invalid", "username is required")
+    if role not in ROLES:
+        return None, ProvisionResult(row_no, username, role, "invalid", f"unknown role {role!r}")
+    if username in seen:
+        return None, ProvisionResult(row_no, username, role, "invalid", "duplicate username in input")
+    seen.add(username)
+    return {"row": row_no, "username": username, "role": role,
+            "password": str(raw.get("password") or "")}, None
+
+
+def provision_users(db, records: Iterable[Tuple[int, Any]], *, workers: Optional[int] = None,
+                    batch_size: int = DEFAULT_BATCH_SIZE,
+                    first_login: bool = True) -> List[ProvisionResult]:
+    """
+    Validates (row number, record) pairs, hashes every password in a process
+    pool and inserts the users with unordered insert_many batches. Existing
+    usernames are reported per user rather than looked up beforehand.
+    Records without a password get a generated one, returned in the result.
+    """
+    results: List[ProvisionResult] = []
+    valid: List[Dict[str, Any]] = []
+    seen: set = set()
+    for row_no, raw in records:
+        parsed, invalid = _parse(row_no, raw, seen)
+        if invalid is not None:
+            results.append(invalid)
+        else:
+            valid.append(parsed)
+
+    generated = {}
+    for entry in valid:
+        if not entry["password"]:
+            entry["password"] = generated[entry["username"]] = secrets.token_urlsafe(12)
+
+    hashes = hash_passwords([entry["password"] for entry in valid], db.bcrypt_rounds, workers)
+    results.extend(_insert_users(db, valid, hashes, generated, batch_size=batch_size,
+                                 first_login=first_login))
+    results.sort(key=lambda result: result.row)
+    return results
+
+
+def _insert_users(db, valid: List[Dict[str, Any]], hashes: List[bytes], generated: Dict[str, str], *,
+                  batch_size: int, first_login: bool) -> List[ProvisionResult]:
+    # Unordered insert_many per batch; a duplicate username fails only its own row
+    results: List[ProvisionResult] = []
+    for start in range(0, len(valid), batch_size):
+        chunk = valid[start:start + batch_size]
+        docs = [{"username": entry["username"], "password": hashed, "role": entry["role"],
+                 "is_first_login": first_login}
+                for entry, hashed in zip(chunk, hashes[start:start + batch_size])]
+        _, failures = db.insert_users(docs)
+        failed = dict(failures)
+        for index, entry in enumerate(chunk):
+            if index in failed:
+                status = "exists" if failed[index].endswith("already exists") else "failed"
+                results.append(ProvisionResult(entry["row"], entry["username"], entry["role"],
+                                               status, failed[index]))
+            else:
+                results.append(ProvisionResult(entry["row"], entry["username"], entry["role"],
+                                               "created", password=generated.get(entry["username"], "")))
+    return results
+
+
+def write_results(path: str, results: Iterable[ProvisionResult]) -> None:
+    """
+    Writes the per-user results as CSV. The file can hold generated plaintext
+    passwords, so it is readable by its owner only (0600) whatever the umask.
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    if hasattr(os, "fchmod"):
+        os.fchmod(fd, 0o600)  # os.open keeps the mode of a file that already existed
+    with os.fdopen(fd, "w", encoding="utf-8", newline="") as handle:
+        writer = csv.DictWriter(handle, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        for result in results:
+            writer.writerow(result.to_dict())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Create many user accounts from a CSV or JSON Lines file")
+    parser.add_argument("path", help="file with username, role and optional password columns")
+    parser.add_argument("--workers", type=int, default=None, help="hashing processes (default: all cores)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--mongo-uri", default=None)
+    parser.add_argument("--no-first-login", action="store_true",
+                        help="do not force a password change on first login")
+    parser.add_argument("--output", default=None,
+                        help="CSV of per-user results, including generated passwords; "
+                             "created readable by the owner only (default: <path>.results.csv)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    db = get_database(mongo_uri=args.mongo_uri)
+    started = time.perf_counter()
+    results = provision_users(db, read_records(args.path), workers=args.workers,
+                              batch_size=args.batch_size, first_login=not args.no_first_login)
+    elapsed = time.perf_counter() - started
+
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+        if result.status != "created":
+            print(f"  row {result.row} {result.username}: {result.status} ({result.message})")
+    print(f"Processed {len(results)} users in {elapsed:.2f}s: "
+          + ", ".join(f"{count} {status}" for status, count in sorted(counts.items())))
+    output = args.output or f"{args.path}.results.csv"
+    write_results(output, results)
+    print(f"Wrote results to {output}")
+    generated = sum(1 for result in results if result.password)
+    if generated:
+        print(f"Warning: {output} contains {generated} generated plaintext password(s); "
+              "hand them out securely and delete the file", file=sys.stderr)
+    return 0 if counts.get("created", 0) == len(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
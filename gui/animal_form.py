@@ -9,11 +9,12 @@ from animals.monkey import Monkey
 class AnimalFormWindow(tk.Toplevel):
     """
     A dynamic form for creating Dog or Monkey records in the database.
+    Validated records are handed to the parent's add_animal().
     """
 
     def __init__(self, parent, animal_type: str):
         super().__init__(parent)
-        self.db = parent.db
+        self.on_save = parent.add_animal
         self.animal_type = animal_type
         self.inputs = {}
 
@@ -65,8 +66,8 @@ class AnimalFormWindow(tk.Toplevel):
 
         add_input("In Service Country", 9, lambda: ttk.Entry(frame, width=field_width))
 
-        submit_btn = ttk.Button(frame, text="Submit", command=self._submit_form)
-        submit_btn.grid(row=10, column=1, padx=10, pady=10, sticky="e")
+        self.submit_btn = ttk.Button(frame, text="Submit", command=self._submit_form)
+        self.submit_btn.grid(row=10, column=1, padx=10, pady=10, sticky="e")
 
     @staticmethod
     def _validate_integer(value: str) -> bool:
@@ -108,11 +109,11 @@ class AnimalFormWindow(tk.Toplevel):
             animal_class = Dog if self.animal_type == "Dog" else Monkey
             animal = animal_class(**common_data, **{extra_key: extra_value})
 
-            if self.db.create_animal(animal.to_dict()):
-                messagebox.showinfo("Success", f"{self.animal_type} saved successfully!", parent=self)
-                self.destroy()
+            # The main window shows the animal at once and saves it in the background
+            self.on_save(animal.to_dict())
+            self.destroy()
 
         except ValueError as ve:
             messagebox.showerror("Input Error", str(ve), parent=self)
-        except Exception as e:
+        except Exception as e:  # pylint: disable=broad-except
             messagebox.showerror("Unexpected Error", f"An error occurred: {e}", parent=self)
@@ -4,23 +4,93 @@ Handles the creation and display of the main application window
 Also, houses the functions for the actions to make the dashboard interactive
 """
 
+# Only what the first paint needs is imported here. pymongo (via the data
+# layer), bcrypt and the dialogs are imported where they are first used, so
+# the window appears before they load; see gui.startup for the breakdown.
+# pylint: disable=import-outside-toplevel
+
+import logging
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import sv_ttk
 
-from data.database_manager import AnimalDatabase
-from gui.animal_form import AnimalFormWindow
-from gui.login_form import LoginForm
-from gui.change_password import ChangePasswordWindow
-from gui.user_form import CreateUserWindow
+from data.metrics import METRICS
+from data.search_index import SearchIndex, search_filter
+from gui.startup import STARTUP
+from gui.task_runner import TaskRunner
+from gui.virtual_table import VirtualTable
+
+
+PAGE_SIZE = 200
+REFRESH_MS = 5000
+SEARCH_DEBOUNCE_MS = 150
+SNAPSHOT_MS = 5 * 60 * 1000
+
+# Actions that also work on the offline snapshot
+READ_ACTIONS = ("Load Dogs", "Load Monkey", "Load All", "Available")
+
+# APP_QUERIES counted for the label beside the status line
+COUNT_LABELS = ("dogs", "monkeys", "available")
+
+# Table column -> document field for server-side sorts. Breed/Species maps to
+# whichever field the current query's animal type has (see _sort_field).
+SORT_FIELDS = {
+    "Name": "name", "Type": "animal_type", "Gender": "gender", "Age": "age",
+    "Weight": "weight", "Acquisition Date": "acquisition_date",
+    "Acquisition Country": "acquisition_country", "Training Status": "training_status",
+    "Reserved": "reserved", "In Service Country": "in_service_country",
+}
+
+
+def _open_database():
+    # Runs on a worker thread, so importing pymongo happens there too
+    from data.database_manager import get_database
+    return get_database()
+
+
+def _fetch_counts(db):
+    # Runs on a worker thread through the shared client, so retries, the circuit
+    # breaker and the stale cache apply; an outage with nothing cached raises
+    # rather than reading as zero
+    from data.database_manager import APP_QUERIES
+    return db.count_animals_many({label: APP_QUERIES[label] for label in COUNT_LABELS},
+                                 raise_errors=True)
 
 
 class AnimalApp(tk.Tk):
-    def __init__(self):
+    """
+    The main window. It paints before the database exists: the connection is
+    opened in the background once the window is mapped, and the actions stay
+    disabled until it succeeds. ``on_ready(app, error)`` is called once, when
+    the first connection attempt settles; retries from Login do not call it.
+
+    Meanwhile (and whenever the server cannot be reached) the table shows the
+    local snapshot read-only; once connected it is reconciled with the server.
+    """
+
+    def __init__(self, on_ready=None):
         super().__init__()
-        self.db = AnimalDatabase()
+        self.db = None
+        self.writes = None
+        self.on_ready = on_ready
+        self.runner = TaskRunner(self, on_busy=self._set_busy, on_error=self._show_task_error)
+        self._painted = False
+        self.snapshot = None
+        self._snapshot_view = False
+        self._snapshot_loading = False
         self.logged_in = False
         self.user_role = None
+        self.current_user = None
+        self.session = None
+        self.current_query = None
+        self.feed = None
+        self.search_index = SearchIndex()
+        self._loaded = {}
+        self._fully_loaded = False
+        self._search_job = None
+        self.sort_column = None
+        self.sort_reverse = False
+        self.buttons = {}
 
         self.columns = [
             "Name", "Type", "Breed/Species", "Gender", "Age", "Weight",
@@ -29,20 +99,221 @@ class AnimalApp(tk.Tk):
         ]
 
         self.title("Grazioso Salvare Animal Rescue Operations")
-        self.geometry("1090x600")
+        self.geometry("1090x640")
         self.resizable(False, False)
         sv_ttk.set_theme('light')
 
         self.main_frame = ttk.Frame(self)
         self.main_frame.grid(column=0, row=0, sticky="nw", padx=0, pady=10)
 
+        self.table = None
         self.tree = None
         self.action_frame = None
+        self.status_var = tk.StringVar(value="Starting...")
+        self.counts_var = tk.StringVar()
+        self.search_var = tk.StringVar()
         self._setup_ui()
+        self._enable_actions(False)
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        self.bind("<Map>", self._on_map, add="+")
 
     def _setup_ui(self):
+        self._create_search_bar()
         self._create_table()
         self._create_action_buttons()
+        ttk.Label(self.main_frame, textvariable=self.status_var).grid(
+            row=3, column=0, sticky="w", padx=10, pady=5)
+        ttk.Label(self.main_frame, textvariable=self.counts_var).grid(
+            row=3, column=0, sticky="e", padx=10, pady=5)
+
+    def _on_close(self):
+        self._stop_feed()
+        # Queued writes would be cancelled with the runner, so save them here
+        if self.writes is not None:
+            for iid, _, message in self.writes.close():
+                logging.error("Unsaved change to %s lost on exit: %s", iid, message)
+        self.runner.shutdown()
+        self.destroy()
+        if self.snapshot is not None:
+            self.snapshot.close()
+        if self.db is not None:
+            from data.database_manager import close_shared_database
+            close_shared_database()
+
+    # ----- deferred connection -----
+    # The ping, index creation and admin bootstrap used to run before the
+    # window existed; now they run on a worker once the window is on screen.
+
+    def _on_map(self, event):
+        if event.widget is not self or self._painted:
+            return
+        self._painted = True
+        self.update_idletasks()
+        STARTUP.mark("first_paint")
+        self._open_snapshot()
+        self._connect()
+
+    def _connect(self):
+        self.status_var.set("Connecting to MongoDB...")
+        self.buttons["Login"].state(["disabled"])
+        self.runner.submit(_open_database, key="connect", quiet=True,
+                           on_success=self._on_connected, on_error=self._on_connect_failed)
+
+    def _on_connected(self, db):
+        from gui.write_behind import WriteBehindQueue
+        self.db = db
+        self.writes = WriteBehindQueue(self.db, self.runner, self, on_failed=self._on_writes_failed,
+                                       on_idle=self._on_writes_saved)
+        self._enable_actions(True)
+        self.status_var.set("Connected")
+        STARTUP.mark("db_connected")
+        self._refresh_counts()
+        if self.snapshot is not None:
+            # The sync replaces the file, which cannot happen while it is mapped
+            self.snapshot.close()
+            self.snapshot = None
+        # A sync moves the snapshot forward, so it waits for rows still being
+        # built from the old one; they are reconciled against its changes
+        if not self._snapshot_loading:
+            self._sync_snapshot()
+        self._settle_startup(None)
+
+    def _on_connect_failed(self, exc):
+        logging.error("Could not connect to the database: %s", exc)
+        STARTUP.mark("db_failed")
+        # Login retries the connection
+        self.buttons["Login"].state(["!disabled"])
+        if self.snapshot is None:
+            self.status_var.set("Database unavailable - press Login to retry")
+        elif not self._snapshot_loading:  # otherwise the rows set it when they arrive
+            self.status_var.set(f"{self._snapshot_status()} - database unavailable, press Login to retry")
+        if not self._settle_startup(exc) and self.snapshot is None:
+            messagebox.showerror("Database error", str(exc))
+
+    def _settle_startup(self, error):
+        # on_ready reports start-up timings, so only the first attempt reaches it
+        on_ready, self.on_ready = self.on_ready, None
+        if on_ready is not None:
+            on_ready(self, error)
+        return on_ready is not None
+
+    def _enable_actions(self, enabled, names=None):
+        for name in names or self.buttons:
+            self.buttons[name].state(["!disabled"] if enabled else ["disabled"])
+
+    # ----- offline snapshot -----
+    # A local copy of the collection (data.snapshot) is what the first paint
+    # shows, and what the table keeps showing while the server is unreachable.
+    # It is read-only: loading, search and sort work on it, writes need the server.
+
+    def _open_snapshot(self):
+        from data.snapshot import open_snapshot, snapshot_path
+        self.snapshot = open_snapshot(snapshot_path())
+        if self.snapshot is not None:
+            self._enable_actions(True, READ_ACTIONS)
+            self._show_snapshot(None)
+
+    def _show_snapshot(self, query):
+        # The matching rows are copied out of the map here, so the map can be
+        # closed at any time; the table rows and search index are built on a worker
+        self._stop_feed()
+        self.current_query = query
+        self._snapshot_view = False
+        self._snapshot_loading = True
+        self.runner.submit(self._snapshot_rows, self.snapshot.find(query), key="load",
+                           on_success=self._on_snapshot_rows)
+        self.status_var.set("Loading the local snapshot...")
+
+    @classmethod
+    def _snapshot_rows(cls, animals):
+        loaded, index = {}, SearchIndex()
+        for animal in animals:
+            iid, values = cls._animal_row(animal)
+            loaded[iid] = values
+            index.add(iid, animal)
+        return loaded, index
+
+    def _on_snapshot_rows(self, result):
+        self._snapshot_loading = False
+        if self.db is not None and not self.logged_in:
+            # Connected while the rows were being built, before anyone logged in
+            self._close_snapshot_view()
+            self._sync_snapshot()
+            return
+        self._loaded, self.search_index = result
+        self._fully_loaded = True
+        self._snapshot_view = True
+        self._filter_loaded(self.search_var.get())
+        STARTUP.mark("snapshot_shown")
+        if self.db is None:
+            self.status_var.set(self._snapshot_status())
+        else:
+            # Connected while the rows were being built; reconcile them now
+            self._sync_snapshot()
+
+    def _close_snapshot_view(self):
+        # Offline the snapshot stands in for the server, but once connected
+        # reading needs a login again, so an anonymous session is not shown
+        # (or fed live changes to) the roster
+        self._snapshot_view = False
+        self._stop_feed()
+        self._loaded, self._fully_loaded = {}, False
+        self.search_index.clear()
+        self.table.clear()
+        self.status_var.set("Connected - log in to load animals")
+
+    def _snapshot_status(self):
+        return (f"Offline: {len(self._loaded)} animals from the snapshot of "
+                f"{self.snapshot.synced_at:%Y-%m-%d %H:%M} UTC (read-only)")
+
+    def _sync_snapshot(self):
+        if self.db is None:
+            return
+        self.runner.submit(self.db.sync_snapshot, key="snapshot", quiet=True,
+                           on_success=self._on_snapshot_synced, on_error=self._on_snapshot_sync_failed)
+
+    def _on_snapshot_synced(self, changes):
+        if self._snapshot_view and not self.logged_in:
+            self._close_snapshot_view()
+        elif self._snapshot_view:
+            # Bring the rows shown from the snapshot up to date, then keep them live
+            self._snapshot_view = False
+            if changes is None:
+                # The snapshot was rewritten from scratch, so reload the view
+                self._loaded, self._fully_loaded = {}, False
+                self.search_index.clear()
+                self._load_view(self.current_query, self.search_var.get())
+            else:
+                upserts, removed = changes
+                shown = [animal for animal in upserts if self._in_view(animal)]
+                gone = [animal["_id"] for animal in upserts if not self._in_view(animal)]
+                self._merge_changes(shown, list(removed) + gone)
+                self._start_feed(self.current_query)
+                self.status_var.set(f"Connected - {len(self._loaded)} animals, live")
+        self._refresh_counts()
+        self.after(SNAPSHOT_MS, self._sync_snapshot)
+
+    def _on_snapshot_sync_failed(self, exc):
+        logging.warning("Snapshot sync failed: %s", exc)
+        self.after(SNAPSHOT_MS, self._sync_snapshot)
+
+    # Busy indicator while background tasks are in flight
+    def _set_busy(self, busy):
+        self.configure(cursor="watch" if busy else "")
+        self.status_var.set("Working..." if busy else "Ready")
+
+    def _show_task_error(self, exc):
+        messagebox.showerror("Error", f"An error occurred: {exc}")
+
+    # Filters the loaded view by name, breed/species and countries as the user types
+    def _create_search_bar(self):
+        search_frame = ttk.Frame(self.main_frame)
+        search_frame.grid(row=0, column=0, sticky="w", padx=10, pady=(0, 10))
+        ttk.Label(search_frame, text="Search:").pack(side="left", padx=(0, 5))
+        ttk.Entry(search_frame, textvariable=self.search_var, width=40).pack(side="left")
+        ttk.Button(search_frame, text="Clear",
+                   command=lambda: self.search_var.set("")).pack(side="left", padx=10)
+        self.search_var.trace_add("write", self._on_search_changed)
 
     # Creates the table to hold the Animal Data
     def _create_table(self):
@@ -52,15 +323,14 @@ class AnimalApp(tk.Tk):
             "Training Status": 120, "Reserved": 70, "In Service Country": 120
         }
 
-        self.tree = ttk.Treeview(self.main_frame, columns=self.columns, show="headings")
-        for col in self.columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=column_widths.get(col, 100), anchor="center", stretch=False)
-        self.tree.grid(column=0, row=0, sticky="nsew", padx=10, pady=10)
+        self.table = VirtualTable(self.main_frame, self.columns, column_widths,
+                                  on_sort=self.sort_by)
+        self.table.grid(column=0, row=1, sticky="nsew", padx=10, pady=(0, 10))
+        self.tree = self.table.tree
 
     def _create_action_buttons(self):
         self.action_frame = ttk.LabelFrame(self.main_frame, text="Actions")
-        self.action_frame.grid(row=1, column=0, sticky="nw", padx=10, pady=0)
+        self.action_frame.grid(row=2, column=0, sticky="nw", padx=10, pady=0)
 
         actions = [
             ("Login", self.check_login, 0, 0),
@@ -70,12 +340,14 @@ class AnimalApp(tk.Tk):
             ("Load All", self.load_all_animals, 2, 2),
             ("Add Dog", self.add_dog, 0, 3),
             ("Add Monkey", self.add_monkey, 1, 3),
+            ("Import File", self.import_file, 2, 3),
+            ("Export", self.export_animals, 1, 4),
+            ("Statistics", self.show_statistics, 2, 4),
             ("Delete Animal", self.delete_animal, 0, 4),
             ("Available", self.show_available, 0, 6),
             ("Toggle Reserved", self.toggle_reserved_status, 1, 6)
         ]
 
-        self.buttons = {}
         for text, command, row, col in actions:
             btn = ttk.Button(self.action_frame, text=text, command=command)
             btn.grid(row=row, column=col, padx=15, pady=5)
@@ -85,14 +357,19 @@ class AnimalApp(tk.Tk):
 
     # Login Check
     def check_login(self):
-        if not self.logged_in:
+        if self.db is None:
+            self._connect()
+        elif not self.logged_in:
+            from gui.login_form import LoginForm
             LoginForm(self, self.on_login_success, self.db)
 
     # With Successful Login
     # Checking role, and if first login
-    def on_login_success(self, user, is_first_login=False):
+    def on_login_success(self, user, is_first_login=False, session=None):
         self.logged_in = True
         self.user_role = user["role"]
+        self.current_user = user
+        self.session = session
         if is_first_login:
             self.open_change_password(user)
         if self.db.is_admin(user):
@@ -100,6 +377,7 @@ class AnimalApp(tk.Tk):
 
     # Password Change Window
     def open_change_password(self, user):
+        from gui.change_password import ChangePasswordWindow
         ChangePasswordWindow(self, user)
 
     # Login Warning
@@ -110,92 +388,429 @@ class AnimalApp(tk.Tk):
         return True
 
     def create_user(self):
+        from gui.user_form import CreateUserWindow
         CreateUserWindow(self)
 
     def load_animals(self, query=None):
+        if self.db is None and self.snapshot is not None:
+            self._show_snapshot(query)
+            return
         if not self._require_login():
             return
-        animals = self.db.read_all_animals(query)
-        self.display_animals(animals)
+
+        self.current_query = query
+        self._snapshot_view = False
+        if self._snapshot_loading:
+            # The snapshot rows this replaces will never arrive to trigger the sync
+            self._snapshot_loading = False
+            self._sync_snapshot()
+        self._loaded, self._fully_loaded = {}, False
+        self.search_index.clear()
+        self._load_view(query, self.search_var.get())
+
+    def _load_view(self, query, text=""):
+        from data.database_manager import DISPLAY_PROJECTION
+        # With a search term the server filters through the search_keys index;
+        # without one, the pages also fill the local search index.
+        search = search_filter(text)
+        criteria = {"$and": [query, search]} if query and search else (search or query)
+        filling = not search
+        cursor = None
+
+        sort = self._server_sort(query)
+
+        # Runs on a worker thread; only the resulting rows come back to the UI
+        def fetch_page(after):
+            return self.db.find_animals_page(
+                criteria, after=after, limit=PAGE_SIZE, sort=sort, projection=DISPLAY_PROJECTION
+            )
+
+        def fetch_more():
+            self.runner.submit(fetch_page, cursor, on_success=append_page, key="load")
+
+        def remember(animals):
+            if filling:
+                for animal in animals:
+                    iid, values = self._animal_row(animal)
+                    self._loaded[iid] = values
+                    self.search_index.add(iid, animal)
+                self._fully_loaded = cursor is None
+
+        def show_first_page(result):
+            nonlocal cursor
+            animals, cursor = result
+            if filling:
+                self._loaded = {}
+                self.search_index.clear()
+            remember(animals)
+            more = fetch_more if cursor is not None else None
+            if search:
+                self.table.load((self._animal_row(animal) for animal in animals), more)
+                self.status_var.set(f"{len(self.table)}{'+' if more else ''} match(es)")
+            else:
+                self.display_animals(animals, more)
+            if self.sort_column is not None and sort is None and more is None:
+                self.table.sort(self.sort_column, self.sort_reverse)
+            if self.feed is None or self.feed.query != dict(query or {}):
+                self._start_feed(query)
+            if animals and not self.db.available:
+                self.status_var.set("Database unavailable - showing cached results")
+
+        def append_page(result):
+            nonlocal cursor
+            animals, cursor = result
+            remember(animals)
+            self.table.append([self._animal_row(animal) for animal in animals],
+                              more=cursor is not None)
+
+        self.runner.submit(fetch_page, None, on_success=show_first_page, key="load")
+
+    # ----- search -----
+    # Keystrokes are debounced; once the whole view is loaded, searches run
+    # against the in-memory index, otherwise the server answers them.
+
+    def _on_search_changed(self, *_args):
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(SEARCH_DEBOUNCE_MS, self._run_search)
+
+    def _run_search(self):
+        self._search_job = None
+        text = self.search_var.get()
+        if self._fully_loaded:
+            self._filter_loaded(text)
+            if self._snapshot_view and self.snapshot is not None:
+                self.status_var.set(self._snapshot_status())
+        elif self.logged_in and self.feed is not None:
+            self._load_view(self.current_query, text)
+
+    def _filter_loaded(self, text):
+        matches = self.search_index.search(text)
+        self.table.load((iid, values) for iid, values in self._loaded.items()
+                        if matches is None or iid in matches)
+        if self.sort_column is not None:
+            self.table.sort(self.sort_column, self.sort_reverse)
+        self.status_var.set(f"{len(self.table)} match(es)" if matches is not None else "Ready")
+
+    def _set_loaded_value(self, iid, column, value):
+        values = self._loaded.get(iid)
+        if values is not None:
+            values = list(values)
+            values[self.columns.index(column)] = value
+            self._loaded[iid] = tuple(values)
+
+    def _forget_rows(self, iids):
+        for iid in iids:
+            self._loaded.pop(iid, None)
+            self.search_index.remove(iid)
+        self.table.delete_rows(iids)
+
+    # ----- sorting -----
+    # A fully loaded view is reordered in memory; otherwise the sort is pushed
+    # into the paged query so the server walks an index in the requested order.
+
+    def sort_by(self, column):
+        if column == self.sort_column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column, self.sort_reverse = column, False
+        self.table.show_sort(self.sort_column, self.sort_reverse)
+
+        if self._fully_loaded or self.feed is None:
+            self.table.sort(column, self.sort_reverse)
+        elif self._sort_field(column, self.current_query) is None:
+            self.status_var.set("Load Dogs or Monkeys (or scroll to the end) to sort by breed/species")
+        else:
+            self._load_view(self.current_query, self.search_var.get())
+
+    @staticmethod
+    def _sort_field(column, query):
+        if column != "Breed/Species":
+            return SORT_FIELDS.get(column)
+        # Dogs and monkeys keep this value in different fields; a mixed view has
+        # no single field the server could page on
+        return {"Dog": "breed", "Monkey": "species"}.get((query or {}).get("animal_type"))
+
+    def _server_sort(self, query):
+        from pymongo import ASCENDING, DESCENDING
+        field = self._sort_field(self.sort_column, query)
+        if field is None:
+            return None
+        # _id runs in the same direction so a {field: 1, _id: 1} index serves both ways
+        direction = DESCENDING if self.sort_reverse else ASCENDING
+        return [(field, direction), ("_id", direction)]
+
+    # ----- live updates -----
+    # Instead of reloading, other operators' edits are merged into the loaded rows
+
+    def _start_feed(self, query):
+        from data.change_feed import ChangeFeed
+        from data.database_manager import DISPLAY_PROJECTION
+        self._stop_feed()
+        self.feed = ChangeFeed(self.db, query, projection=DISPLAY_PROJECTION)
+        self.after(REFRESH_MS, self._poll_feed, self.feed)
+
+    def _stop_feed(self):
+        if self.feed is not None:
+            self.runner.cancel("changes")
+            self.feed.close()
+            self.feed = None
+
+    def _poll_feed(self, feed):
+        if feed is not self.feed:
+            return
+        self.runner.submit(feed.poll, key="changes", quiet=True,
+                           on_success=lambda changes: self._apply_changes(feed, changes),
+                           on_error=lambda exc: self._feed_failed(feed, exc))
+
+    def _apply_changes(self, feed, changes):
+        if feed is not self.feed:
+            return
+        self._merge_changes(*changes)
+        self.after(REFRESH_MS, self._poll_feed, feed)
+
+    def _merge_changes(self, upserts, removed):
+        text = self.search_var.get()
+        shown, hidden = [], []
+        for animal in upserts:
+            iid, values = self._animal_row(animal)
+            self._loaded[iid] = values
+            self.search_index.add(iid, animal)
+            (shown if self.search_index.matches(iid, text) else hidden).append((iid, values))
+        if shown:
+            self.table.upsert(shown)
+        # Rows edited so they no longer match the search leave the table but stay loaded
+        self.table.delete_rows(iid for iid, _ in hidden)
+        self._forget_rows([str(animal_id) for animal_id in removed])
+
+    def _feed_failed(self, feed, exc):
+        logging.warning("Live update poll failed: %s", exc)
+        if feed is self.feed:
+            self.after(REFRESH_MS, self._poll_feed, feed)
 
     def load_dogs(self):
-        self.load_animals({"animal_type": "Dog"})
+        from data.database_manager import APP_QUERIES
+        self.load_animals(APP_QUERIES["dogs"])
 
     def load_monkey(self):
-        self.load_animals({"animal_type": "Monkey"})
+        from data.database_manager import APP_QUERIES
+        self.load_animals(APP_QUERIES["monkeys"])
 
     def load_all_animals(self):
         self.load_animals()
 
     def add_dog(self):
         if self._require_login():
+            from gui.animal_form import AnimalFormWindow
             AnimalFormWindow(self, animal_type="Dog")
 
     def add_monkey(self):
         if self._require_login():
+            from gui.animal_form import AnimalFormWindow
             AnimalFormWindow(self, animal_type="Monkey")
 
+    def import_file(self):
+        if not self._require_login():
+            return
+        path = filedialog.askopenfilename(
+            title="Import Animals",
+            filetypes=[("Animal records", "*.csv *.jsonl *.ndjson *.gz"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+
+        def on_imported(stats):
+            details = "\n".join(f"Row {row}: {msg}" for row, msg in stats.errors[:10])
+            if stats.failed > 10:
+                details += f"\n... {stats.failed - 10} more"
+            messagebox.showinfo("Import Complete", f"{stats.summary()}\n\n{details}".strip())
+
+        from data import bulk_import
+        self.status_var.set("Importing...")
+        self.runner.submit(bulk_import.import_file, self.db, path, on_success=on_imported)
+
+    # Exports whatever query the table is currently showing
+    def export_animals(self):
+        if not self._require_login():
+            return
+        path = filedialog.asksaveasfilename(
+            title="Export Animals", defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("CSV (gzip)", "*.csv.gz"), ("JSON Lines", "*.jsonl"),
+                       ("JSON Lines (gzip)", "*.jsonl.gz"), ("Parquet", "*.parquet")]
+        )
+        if not path:
+            return
+
+        def on_exported(count):
+            messagebox.showinfo("Export Complete", f"Exported {count} animals to {path}")
+
+        from data import export
+        self.runner.submit(export.export_animals, self.db, path, self.current_query,
+                           on_success=on_exported)
+
+    def show_statistics(self):
+        if self._require_login():
+            from gui.stats_window import StatsWindow
+            StatsWindow(self)
+
     # Takes the selection from the table and calls the delete CRUD method
     def delete_animal(self):
         if not self._require_login():
             return
 
-        selected = self.tree.selection()
+        selected = self.table.selection()
         if not selected:
             messagebox.showerror("Error", "No animal selected")
             return
 
-        animal_id = selected[0]
-        if self.db.delete_animal(animal_id):
-            self.tree.delete(animal_id)
-            messagebox.showinfo("Deleted", "Animal record removed.")
-        else:
-            messagebox.showerror("Error", "Animal could not be deleted.")
+        # Removed from the table now; the write-behind queue deletes them in one batch
+        for animal_id in selected:
+            self.writes.delete(animal_id, self.table.get_values(animal_id))
+        self._forget_rows(selected)
+        self._show_pending(f"Removing {len(selected)} animal record(s)")
+
+    # ----- optimistic writes -----
+
+    def add_animal(self, animal_data):
+        """
+        Shows a new animal straight away (if it belongs in the current view)
+        and queues its insert.
+        """
+        animal_id = self.writes.create(animal_data)
+        animal = {**animal_data, "_id": animal_id}
+        if self.feed is not None and self._in_view(animal):
+            iid, values = self._animal_row(animal)
+            self._loaded[iid] = values
+            self.search_index.add(iid, animal)
+            if self.search_index.matches(iid, self.search_var.get()):
+                self.table.upsert([(iid, values)])
+        self._show_pending(f"{animal_data.get('animal_type', 'Animal')} {animal_data.get('name', '')} added")
+
+    def _in_view(self, animal):
+        # Enough of MongoDB's matching for the APP_QUERIES shapes (equality and $in)
+        for field, condition in (self.current_query or {}).items():
+            value = animal.get(field)
+            if isinstance(condition, dict):
+                if "$in" in condition and value not in condition["$in"]:
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    def _show_pending(self, message):
+        self.status_var.set(f"{message} (saving...)" if not self.writes.idle else message)
+
+    def _on_writes_saved(self, counts):
+        # What the server actually did, which can differ from what the table
+        # showed optimistically (rows already reserved, or deleted elsewhere)
+        parts = []
+        if counts["inserted"]:
+            parts.append(f"{counts['inserted']} added")
+        if counts["matched"]:
+            parts.append(f"{counts['modified']} updated")
+            if counts["matched"] > counts["modified"]:
+                parts.append(f"{counts['matched'] - counts['modified']} already up to date")
+        if counts["deleted"]:
+            parts.append(f"{counts['deleted']} deleted")
+        self.status_var.set("All changes saved" + (f": {', '.join(parts)}" if parts else ""))
+        self._refresh_counts()
+
+    # ----- counts -----
+    # Cached between writes (which invalidate the shared cache), so a refresh
+    # after browsing usually costs no round trip.
+
+    def _refresh_counts(self):
+        if self.db is None:
+            return
+        self.runner.submit(_fetch_counts, self.db, key="counts", quiet=True,
+                           on_success=self._on_counts, on_error=self._on_counts_failed)
+
+    def _on_counts(self, counts):
+        self.counts_var.set("  |  ".join(f"{label.title()}: {counts[label]}" for label in COUNT_LABELS))
+
+    def _on_counts_failed(self, exc):
+        logging.warning("Could not count animals: %s", exc)
+        self.counts_var.set("Counts unavailable")
+
+    def _on_writes_failed(self, failures):
+        for iid, original, _message in failures:
+            if original is None:
+                self._forget_rows([iid])
+                continue
+            self._loaded[iid] = original
+            self.search_index.add(iid, self._row_doc(original))
+            if self.search_index.matches(iid, self.search_var.get()):
+                self.table.upsert([(iid, original)])
+        details = "\n".join(f"{iid}: {message}" for iid, _, message in failures[:10])
+        self.status_var.set(f"{len(failures)} change(s) could not be saved")
+        messagebox.showerror("Save Failed",
+                             f"{len(failures)} change(s) could not be saved and were undone.\n\n{details}")
+
+    def _row_doc(self, values):
+        # The searchable fields of a table row, for re-indexing a rolled-back row
+        row = dict(zip(self.columns, values))
+        return {"name": row["Name"], "breed": row["Breed/Species"],
+                "acquisition_country": row["Acquisition Country"],
+                "in_service_country": row["In Service Country"]}
 
     # Helper method to display animals in the table
-    def display_animals(self, animals):
+    # Only the first page is converted up front; the table pulls the rest as it scrolls
+    def display_animals(self, animals, fetch_more=None):
         if not animals:
-            messagebox.showerror("Error", "No animals found.")
+            # An outage should not read as an empty collection
+            if self.db is not None and not self.db.available:
+                messagebox.showerror("Database unavailable",
+                                     "The database cannot be reached right now. Please try again shortly.")
+            else:
+                messagebox.showerror("Error", "No animals found.")
             return
 
-        self.tree.delete(*self.tree.get_children())
-
-        for animal in animals:
-            self.tree.insert(
-                "", "end", iid=str(animal["_id"]),
-                values=(
-                    animal["name"],
-                    animal.get("animal_type", ""),
-                    animal.get("breed") or animal.get("species", ""),
-                    animal.get("gender", ""),
-                    animal.get("age", ""),
-                    animal.get("weight", ""),
-                    animal.get("acquisition_date", "")[:10],
-                    animal.get("acquisition_country", ""),
-                    animal.get("training_status", ""),
-                    "Yes" if animal.get("reserved") else "No",
-                    animal.get("in_service_country", "")
-                )
-            )
+        with METRICS.timer("gui.display_animals") as outcome:
+            self.table.load((self._animal_row(animal) for animal in animals), fetch_more)
+            # Force the geometry/paint pass so the timing covers what the user waits for
+            self.update_idletasks()
+            outcome["documents"] = len(animals)
+
+    @staticmethod
+    def _animal_row(animal):
+        return str(animal["_id"]), (
+            animal["name"],
+            animal.get("animal_type", ""),
+            animal.get("breed") or animal.get("species", ""),
+            animal.get("gender", ""),
+            animal.get("age", ""),
+            animal.get("weight", ""),
+            animal.get("acquisition_date", "")[:10],
+            animal.get("acquisition_country", ""),
+            animal.get("training_status", ""),
+            "Yes" if animal.get("reserved") else "No",
+            animal.get("in_service_country", "")
+        )
 
     def show_available(self):
         if self._require_login():
-            self.load_animals({"animal_type": {"$in": ["Dog", "Monkey"]}, "reserved": False})
+            from data.database_manager import APP_QUERIES
+            self.load_animals(APP_QUERIES["available"])
 
     def toggle_reserved_status(self):
         if not self._require_login():
             return
 
-        selected = self.tree.selection()
+        selected = self.table.selection()
         if not selected:
             messagebox.showerror("Error", "No animal selected")
             return
 
-        animal_id = selected[0]
-        current_status = self.tree.set(animal_id, "Reserved")
-        new_status = current_status == "No"
-        if self.db.update_animal(animal_id, {"reserved": new_status}):
-            self.tree.set(animal_id, "Reserved", "Yes" if new_status else "No")
-            messagebox.showinfo("Updated", f"Animal {animal_id} reservation status toggled.")
-        else:
-            messagebox.showerror("Error", "Failed to update reservation status.")
+        # Reserve the whole selection unless every selected animal is already reserved
+        reserved_col = self.columns.index("Reserved")
+        new_status = any(self.table.get_values(animal_id)[reserved_col] == "No"
+                         for animal_id in selected)
+
+        # Shown immediately; the write-behind queue saves it and rolls back on failure
+        value = "Yes" if new_status else "No"
+        for animal_id in selected:
+            original = self.table.get_values(animal_id)
+            self.writes.update(animal_id, {"reserved": new_status}, original)
+            self.table.set_value(animal_id, "Reserved", value)
+            self._set_loaded_value(animal_id, "Reserved", value)
+        self._show_pending(f"{'Reserving' if new_status else 'Releasing'} {len(selected)} animal(s)")
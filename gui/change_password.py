@@ -3,25 +3,27 @@ gui.change_password
 Handles the changing of the password on first login
 """
 
-import bcrypt
 import tkinter as tk
 from tkinter import ttk, messagebox
 from pymongo.errors import PyMongoError
-from data.database_manager import AnimalDatabase
+from data.database_manager import get_database
 
 
 class ChangePasswordWindow(tk.Toplevel):
     """
-    Prompts user to set a new password on first login.
+    Prompts user to set a new password on first login, after confirming the
+    current (temporary) one against their login session.
     """
 
     def __init__(self, parent, user):
         super().__init__(parent)
         self.user = user
-        self.db = AnimalDatabase()
+        self.db = get_database()
+        self.runner = parent.runner
+        self.app = parent
 
         self.title("Change Password")
-        self.geometry("400x200")
+        self.geometry("400x240")
         self.resizable(False, False)
 
         self._build_ui()
@@ -30,18 +32,23 @@ class ChangePasswordWindow(tk.Toplevel):
         form_frame = ttk.Frame(self)
         form_frame.pack(padx=20, pady=20)
 
-        ttk.Label(form_frame, text="New Password:").grid(row=0, column=0, sticky="e", padx=5, pady=5)
+        ttk.Label(form_frame, text="Current Password:").grid(row=0, column=0, sticky="e", padx=5, pady=5)
+        self.current_password_entry = ttk.Entry(form_frame, width=30, show="*")
+        self.current_password_entry.grid(row=0, column=1, padx=5, pady=5)
+
+        ttk.Label(form_frame, text="New Password:").grid(row=1, column=0, sticky="e", padx=5, pady=5)
         self.new_password_entry = ttk.Entry(form_frame, width=30, show="*")
-        self.new_password_entry.grid(row=0, column=1, padx=5, pady=5)
+        self.new_password_entry.grid(row=1, column=1, padx=5, pady=5)
 
-        ttk.Label(form_frame, text="Confirm Password:").grid(row=1, column=0, sticky="e", padx=5, pady=5)
+        ttk.Label(form_frame, text="Confirm Password:").grid(row=2, column=0, sticky="e", padx=5, pady=5)
         self.confirm_password_entry = ttk.Entry(form_frame, width=30, show="*")
-        self.confirm_password_entry.grid(row=1, column=1, padx=5, pady=5)
+        self.confirm_password_entry.grid(row=2, column=1, padx=5, pady=5)
 
-        submit_btn = ttk.Button(self, text="Change Password", command=self._change_password)
-        submit_btn.pack(pady=10)
+        self.submit_btn = ttk.Button(self, text="Change Password", command=self._change_password)
+        self.submit_btn.pack(pady=10)
 
     def _change_password(self):
+        current = self.current_password_entry.get()
         password = self.new_password_entry.get()
         confirm = self.confirm_password_entry.get()
 
@@ -53,13 +60,37 @@ class ChangePasswordWindow(tk.Toplevel):
             messagebox.showwarning("Weak Password", "Password must be at least 6 characters.", parent=self)
             return
 
-        try:
-            hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
-            self.db.users.update_one(
-                {"_id": self.user["_id"]},
-                {"$set": {"password": hashed, "is_first_login": False}}
-            )
+        self.submit_btn.state(["disabled"])
+        self.runner.submit(self._store_password, current, password,
+                           on_success=self._on_changed, on_error=self._on_error)
+
+    # Runs on a worker thread; returns None when the current password is wrong.
+    # The login session remembers the password it was opened with, so this
+    # check does not cost another bcrypt hash.
+    def _store_password(self, current, password):
+        user = self.db.reauthenticate(self.app.session, self.user["username"], current)
+        if user is None:
+            return None
+        return self.db.set_password(user, password)
+
+    def _on_changed(self, session):
+        if session is None:
+            if self.winfo_exists():
+                self.submit_btn.state(["!disabled"])
+                messagebox.showerror("Incorrect Password", "The current password is incorrect.",
+                                     parent=self)
+            return
+        # The old session vouched for the old password; carry on with the new one
+        self.app.session = session
+        if self.winfo_exists():
             messagebox.showinfo("Success", "Password changed successfully.", parent=self)
             self.destroy()
-        except PyMongoError as e:
-            messagebox.showerror("Database Error", f"Could not update password: {e}", parent=self)
+
+    def _on_error(self, exc):
+        if not self.winfo_exists():
+            return
+        self.submit_btn.state(["!disabled"])
+        if isinstance(exc, PyMongoError):
+            messagebox.showerror("Database Error", f"Could not update password: {exc}", parent=self)
+        else:
+            messagebox.showerror("Error", f"An error occurred: {exc}", parent=self)
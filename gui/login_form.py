@@ -15,6 +15,7 @@ class LoginForm(tk.Toplevel):
     def __init__(self, parent, authenticate_callback, db):
         super().__init__(parent)
         self.db = db
+        self.runner = parent.runner
         self.authenticate_callback = authenticate_callback
 
         self.title("Login")
@@ -35,8 +36,8 @@ class LoginForm(tk.Toplevel):
         self.password_entry = ttk.Entry(frame, show="*")
         self.password_entry.grid(row=1, column=1, padx=5, pady=5)
 
-        login_btn = ttk.Button(self, text="Login", command=self._authenticate)
-        login_btn.pack(pady=10)
+        self.login_btn = ttk.Button(self, text="Login", command=self._authenticate)
+        self.login_btn.pack(pady=10)
 
     def _authenticate(self):
         username = self.username_entry.get().strip()
@@ -46,10 +47,26 @@ class LoginForm(tk.Toplevel):
             messagebox.showerror("Missing Input", "Username and password are required.", parent=self)
             return
 
-        user, is_first_login = self.db.authenticate_user(username, password)
+        # bcrypt is deliberately slow, so verify off the Tk thread
+        self.login_btn.state(["disabled"])
+        self.runner.submit(
+            self.db.login, username, password,
+            on_success=lambda result: self._on_authenticated(username, *result),
+            on_error=self._on_error,
+        )
+
+    def _on_authenticated(self, username, user, is_first_login, token):
+        if not self.winfo_exists():
+            return
+        self.login_btn.state(["!disabled"])
         if user:
             messagebox.showinfo("Login Successful", f"Welcome, {username}!", parent=self)
-            self.authenticate_callback(user, is_first_login)
+            self.authenticate_callback(user, is_first_login, token)
             self.destroy()
         else:
             messagebox.showerror("Login Failed", "Invalid username or password.", parent=self)
+
+    def _on_error(self, exc):
+        if self.winfo_exists():
+            self.login_btn.state(["!disabled"])
+            messagebox.showerror("Login Error", f"An error occurred: {exc}", parent=self)
@@ -0,0 +1,155 @@
+"""
+gui.startup
+Times the phases of application start-up (imports, window, first paint,
+database connection) and breaks import time down per module
+
+Usage:
+    python -m gui.startup                 # per-module import times of gui.app
+    python -m gui.startup --run           # also start the app once and report its phases
+    python -m gui.startup --json > startup.json
+"""
+
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from data.metrics import METRICS, MetricsRegistry
+
+# main.py imports this module first, so the report tooling below imports
+# subprocess, tempfile and argparse only when it runs
+# pylint: disable=import-outside-toplevel
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StartupTimer:
+    """
+    Offsets of named start-up phases from ``origin`` (by default, when this
+    module was imported, which main.py does before anything else). Each phase
+    is also observed in the metrics registry as ``startup.<phase>``.
+    """
+
+    def __init__(self, origin: Optional[float] = None, registry: MetricsRegistry = METRICS,
+                 clock: Callable[[], float] = time.perf_counter) -> None:
+        self._clock = clock
+        self.origin = clock() if origin is None else origin
+        self.registry = registry
+        self._phases: List[Tuple[str, float]] = []
+
+    def mark(self, phase: str) -> float:
+        """
+        Records ``phase`` as reached now and returns its offset in seconds.
+        A phase reached again (e.g. a retried connection) keeps its first time.
+        """
+        elapsed = self._clock() - self.origin
+        if phase not in dict(self._phases):
+            self._phases.append((phase, elapsed))
+            self.registry.observe(f"startup.{phase}", elapsed)
+        return elapsed
+
+    def phases(self) -> List[Tuple[str, float]]:
+        return list(self._phases)
+
+    def to_dict(self) -> Dict[str, float]:
+        return dict(self._phases)
+
+    def report(self) -> str:
+        return format_phases(self._phases)
+
+
+STARTUP = StartupTimer()
+
+
+def format_phases(phases: List[Tuple[str, float]]) -> str:
+    lines, previous = [], 0.0
+    for phase, elapsed in phases:
+        lines.append(f"  {phase:<16} {elapsed * 1000:8.1f} ms  (+{(elapsed - previous) * 1000:.1f})")
+        previous = elapsed
+    return "Startup phases:\n" + "\n".join(lines)
+
+
+def parse_importtime(text: str) -> List[Dict[str, Any]]:
+    """
+    Parses ``python -X importtime`` output into one entry per module, in
+    import order, with self and cumulative microseconds and nesting depth.
+    """
+    entries = []
+    for line in text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            continue  # the column header
+        module = name.strip()
+        entries.append({"module": module, "self_us": self_us, "cumulative_us": cumulative_us,
+                        "depth": (len(name) - len(name.lstrip()) - 1) // 2})
+    return entries
+
+
+def import_times(module: str = "gui.app") -> List[Dict[str, Any]]:
+    """
+    Imports ``module`` in a fresh interpreter with ``-X importtime`` and
+    returns the parsed breakdown, so modules already loaded here don't hide
+    their cost.
+    """
+    import subprocess
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, capture_output=True, text=True, check=False)
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{proc.stderr.strip()}")
+    return parse_importtime(proc.stderr)
+
+
+def run_app(timeout: float = 60.0) -> Dict[str, float]:
+    """
+    Starts main.py once, lets it quit as soon as the database connection is
+    settled, and returns its phase timings. Needs a display.
+    """
+    import subprocess
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "startup.json")
+        env = dict(os.environ, ANIMAL_STARTUP_REPORT=path, ANIMAL_STARTUP_EXIT="1")
+        proc = subprocess.run([sys.executable, os.path.join(ROOT, "main.py")], cwd=ROOT, env=env,
+                              capture_output=True, text=True, timeout=timeout, check=False)
+        if not os.path.exists(path):
+            raise RuntimeError(f"main.py exited with {proc.returncode} before reporting:\n"
+                               f"{proc.stderr.strip()}")
+        with open(path, encoding="utf-8") as handle:
+            return json.load(handle)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Report where application start-up time goes")
+    parser.add_argument("--module", default="gui.app", help="module whose imports are timed")
+    parser.add_argument("--limit", type=int, default=15, help="slowest modules to list")
+    parser.add_argument("--run", action="store_true", help="also start the app and time its phases")
+    parser.add_argument("--json", action="store_true", help="print the full breakdown as JSON")
+    args = parser.parse_args(argv)
+
+    entries = import_times(args.module)
+    total_us = sum(entry["cumulative_us"] for entry in entries if entry["depth"] == 0)
+    phases = run_app() if args.run else None
+
+    if args.json:
+        print(json.dumps({"module": args.module, "import_total_us": total_us,
+                          "imports": entries, "phases": phases}, indent=2))
+        return 0
+
+    print(f"import {args.module}: {total_us / 1000:.1f} ms in {len(entries)} modules")
+    print(f"  {'cumulative':>10} {'self':>8}  module")
+    for entry in sorted(entries, key=lambda e: e["cumulative_us"], reverse=True)[:args.limit]:
+        print(f"  {entry['cumulative_us'] / 1000:8.1f}ms {entry['self_us'] / 1000:6.1f}ms  "
+              f"{'  ' * entry['depth']}{entry['module']}")
+    if phases is not None:
+        print(format_phases(sorted(phases.items(), key=lambda item: item[1])))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
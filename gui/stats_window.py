@@ -0,0 +1,136 @@
+"""
+gui.stats_window
+Shows server-side aggregated statistics for the animal fleet
+"""
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+from data.database_manager import STAT_FIELDS, get_database
+
+FILTER_CHOICES = {
+    "animal_type": ["All", "Dog", "Monkey"],
+    "training_status": ["All", "Not Trained", "In Training", "Fully Trained"],
+    "reserved": ["All", "Yes", "No"],
+}
+
+FIELD_LABELS = {
+    "animal_type": "Type",
+    "training_status": "Training Status",
+    "reserved": "Reserved",
+    "in_service_country": "In Service Country",
+}
+
+
+class StatsWindow(tk.Toplevel):
+    """
+    Filters on type, training status and reservation, and shows counts per
+    field, the combined breakdown and age/weight distributions. Only the
+    aggregated numbers are fetched, never the animal documents.
+    """
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.db = get_database()
+        self.runner = parent.runner
+
+        self.title("Fleet Statistics")
+        self.geometry("760x520")
+        self.resizable(False, False)
+
+        self.filters = {}
+        self.total_var = tk.StringVar(value="")
+        self._build_ui()
+        self.refresh()
+
+    def _build_ui(self):
+        filter_frame = ttk.Frame(self)
+        filter_frame.pack(fill="x", padx=10, pady=10)
+        for col, (field, choices) in enumerate(FILTER_CHOICES.items()):
+            ttk.Label(filter_frame, text=f"{FIELD_LABELS[field]}:").grid(row=0, column=col * 2, padx=5)
+            combo = ttk.Combobox(filter_frame, values=choices, state="readonly", width=14)
+            combo.set("All")
+            combo.grid(row=0, column=col * 2 + 1, padx=5)
+            combo.bind("<<ComboboxSelected>>", lambda _event: self.refresh())
+            self.filters[field] = combo
+        self.refresh_btn = ttk.Button(filter_frame, text="Refresh", command=self.refresh)
+        self.refresh_btn.grid(row=0, column=len(FILTER_CHOICES) * 2, padx=10)
+
+        ttk.Label(self, textvariable=self.total_var).pack(anchor="w", padx=10)
+
+        notebook = ttk.Notebook(self)
+        notebook.pack(fill="both", expand=True, padx=10, pady=10)
+        self.counts_tree = self._add_tab(notebook, "Counts", ("Field", "Value", "Count"))
+        self.breakdown_tree = self._add_tab(
+            notebook, "Breakdown", tuple(FIELD_LABELS[field] for field in STAT_FIELDS) + ("Count",))
+        self.distribution_tree = self._add_tab(notebook, "Age / Weight", ("Measure", "Range", "Count"))
+
+    @staticmethod
+    def _add_tab(notebook, title, columns):
+        frame = ttk.Frame(notebook)
+        notebook.add(frame, text=title)
+        tree = ttk.Treeview(frame, columns=columns, show="headings", height=16)
+        for column in columns:
+            tree.heading(column, text=column)
+            tree.column(column, width=max(80, 700 // len(columns)))
+        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+        return tree
+
+    def _query(self):
+        query = {}
+        for field, combo in self.filters.items():
+            value = combo.get()
+            if value == "All":
+                continue
+            query[field] = value == "Yes" if field == "reserved" else value
+        return query
+
+    def refresh(self):
+        self.refresh_btn.state(["disabled"])
+        self.runner.submit(self.db.animal_stats, self._query(), key="stats",
+                           on_success=self._show, on_error=self._on_error)
+
+    @staticmethod
+    def _format(value):
+        if isinstance(value, bool):
+            return "Yes" if value else "No"
+        return "(none)" if value is None else value
+
+    @staticmethod
+    def _range(bucket):
+        if bucket["lower"] is None:
+            return "other / missing"
+        return f"{bucket['lower']} - {bucket['upper']}"
+
+    def _show(self, stats):
+        if not self.winfo_exists():
+            return
+        self.refresh_btn.state(["!disabled"])
+        self.total_var.set(f"Matching animals: {stats['total']}")
+
+        for tree in (self.counts_tree, self.breakdown_tree, self.distribution_tree):
+            tree.delete(*tree.get_children())
+
+        for field, counts in stats["counts"].items():
+            for value, count in counts.items():
+                self.counts_tree.insert("", "end", values=(FIELD_LABELS.get(field, field),
+                                                           self._format(value), count))
+        for row in stats["breakdown"]:
+            self.breakdown_tree.insert("", "end", values=tuple(
+                self._format(row.get(field)) for field in STAT_FIELDS) + (row["count"],))
+        for measure in ("age", "weight"):
+            summary = stats[measure]
+            if summary.get("avg") is not None:
+                self.distribution_tree.insert("", "end", values=(
+                    measure.title(),
+                    f"min {summary['min']} / avg {summary['avg']:.1f} / max {summary['max']}", ""))
+            for bucket in summary.get("buckets", []):
+                self.distribution_tree.insert("", "end", values=(
+                    measure.title(), self._range(bucket), bucket["count"]))
+
+    def _on_error(self, err):
+        if self.winfo_exists():
+            self.refresh_btn.state(["!disabled"])
+            messagebox.showerror("Error", f"Could not load statistics: {err}", parent=self)
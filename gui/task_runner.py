@@ -0,0 +1,156 @@
+"""
+gui.task_runner
+Runs blocking database and hashing calls on worker threads, and coroutines
+on a background asyncio loop, and hands their results back to the Tk main loop
+"""
+
+import itertools
+import logging
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class TaskRunner:
+    """
+    Thread pool bridged to Tk via ``after()`` polling.
+
+    Worker threads never touch widgets: completed futures are queued and the
+    callbacks run on the Tk thread from the poll loop. Tasks submitted with the
+    same ``key`` supersede each other, so only the newest result for a key is
+    delivered (e.g. clicking "Load Dogs" and then "Load All").
+
+    ``submit_async`` does the same for coroutines, which all run on one event
+    loop thread started on first use, so many awaits can be in flight at once.
+    """
+
+    def __init__(self, widget, max_workers: int = 4, poll_ms: int = 30,
+                 on_busy: Optional[Callable[[bool], None]] = None,
+                 on_error: Optional[Callable[[BaseException], None]] = None) -> None:
+        self._widget = widget
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gui-task")
+        self._poll_ms = poll_ms
+        self._on_busy = on_busy
+        self._on_error = on_error or self._log_error
+        self._done: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._seq = itertools.count()
+        self._latest: Dict[str, int] = {}
+        self._futures: Dict[str, Future] = {}
+        self._pending = 0
+        self._busy = 0
+        self._poll_scheduled = False
+        self._loop = None
+
+    @property
+    def busy(self) -> bool:
+        return self._busy > 0
+
+    def submit(self, fn: Callable[..., Any], *args,
+               on_success: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[BaseException], None]] = None,
+               key: Optional[str] = None, quiet: bool = False, **kwargs) -> Future:
+        """
+        Runs ``fn`` on a worker thread. ``quiet`` tasks (e.g. periodic refreshes)
+        do not switch the UI into its busy state.
+        """
+        return self._track(self._executor.submit(fn, *args, **kwargs),
+                           on_success, on_error, key, quiet)
+
+    def submit_async(self, coro: Awaitable[Any], *,
+                     on_success: Optional[Callable[[Any], None]] = None,
+                     on_error: Optional[Callable[[BaseException], None]] = None,
+                     key: Optional[str] = None, quiet: bool = False) -> Future:
+        """
+        Runs ``coro`` (e.g. an AsyncAnimalDatabase call) on the runner's event
+        loop and delivers its result like ``submit``. Cancelling it (or a newer
+        task with the same key) cancels the coroutine.
+        """
+        import asyncio  # pylint: disable=import-outside-toplevel
+        future = asyncio.run_coroutine_threadsafe(coro, self.event_loop())
+        return self._track(future, on_success, on_error, key, quiet)
+
+    def event_loop(self):
+        """
+        The background asyncio loop, started on first use. asyncio is imported
+        here rather than at module level to keep it off the start-up path.
+        """
+        if self._loop is None:
+            import asyncio  # pylint: disable=import-outside-toplevel
+            self._loop = asyncio.new_event_loop()
+            threading.Thread(target=self._loop.run_forever, name="gui-asyncio", daemon=True).start()
+        return self._loop
+
+    def _track(self, future: Future, on_success, on_error, key: Optional[str], quiet: bool) -> Future:
+        token = next(self._seq)
+        if key is not None:
+            self.cancel(key)
+            self._latest[key] = token
+            self._futures[key] = future
+        self._pending += 1
+        if not quiet:
+            self._set_busy(self._busy + 1)
+        future.add_done_callback(
+            lambda f: self._done.put((token, key, quiet, f, on_success, on_error))
+        )
+        self._schedule_poll()
+        return future
+
+    def cancel(self, key: str) -> None:
+        # A task that already started cannot be interrupted; its result is dropped instead
+        self._latest.pop(key, None)
+        previous = self._futures.pop(key, None)
+        if previous is not None:
+            previous.cancel()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _schedule_poll(self) -> None:
+        if not self._poll_scheduled:
+            self._poll_scheduled = True
+            self._widget.after(self._poll_ms, self._poll)
+
+    def _poll(self) -> None:
+        self._poll_scheduled = False
+        while True:
+            try:
+                token, key, quiet, future, on_success, on_error = self._done.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            if not quiet:
+                self._set_busy(self._busy - 1)
+            if key is not None:
+                if self._latest.get(key) != token:
+                    continue
+                del self._latest[key]
+                self._futures.pop(key, None)
+            if future.cancelled():
+                continue
+            self._deliver(future, on_success, on_error)
+
+        if self._pending:
+            self._schedule_poll()
+
+    def _deliver(self, future: Future, on_success, on_error) -> None:
+        exc = future.exception()
+        try:
+            if exc is not None:
+                (on_error or self._on_error)(exc)
+            elif on_success is not None:
+                on_success(future.result())
+        except Exception as callback_exc:  # pylint: disable=broad-except
+            logging.exception("Task callback failed: %s", callback_exc)
+
+    def _set_busy(self, value: int) -> None:
+        was_busy = self.busy
+        self._busy = value
+        if self._on_busy is not None and was_busy != self.busy:
+            self._on_busy(self.busy)
+
+    @staticmethod
+    def _log_error(exc: BaseException) -> None:
+        logging.error("Background task failed: %s", exc, exc_info=exc)
@@ -6,7 +6,7 @@ Handles the creation of new users
 import secrets
 import tkinter as tk
 from tkinter import ttk, messagebox
-from data.database_manager import AnimalDatabase
+from data.database_manager import get_database
 
 class CreateUserWindow(tk.Toplevel):
     """
@@ -15,7 +15,8 @@ class CreateUserWindow(tk.Toplevel):
 
     def __init__(self, parent):
         super().__init__(parent)
-        self.db = AnimalDatabase()
+        self.db = get_database()
+        self.runner = parent.runner
 
         self.title("Create User")
         self.geometry("360x220")
@@ -44,8 +45,8 @@ class CreateUserWindow(tk.Toplevel):
         self.role_combobox.grid(row=2, column=1, padx=5, pady=5)
 
         # Submit
-        submit_btn = ttk.Button(self, text="Create User", command=self._create_user)
-        submit_btn.pack(pady=10)
+        self.submit_btn = ttk.Button(self, text="Create User", command=self._create_user)
+        self.submit_btn.pack(pady=10)
 
     def _create_user(self):
         username = self.username_entry.get().strip()
@@ -56,9 +57,19 @@ class CreateUserWindow(tk.Toplevel):
             messagebox.showerror("Input Error", "Username is required.", parent=self)
             return
 
-        try:
-            self.db.create_user(username, password or secrets.token_urlsafe(12), role)
+        self.submit_btn.state(["disabled"])
+        self.runner.submit(
+            self.db.create_user, username, password or secrets.token_urlsafe(12), role,
+            on_success=lambda _result: self._on_created(username),
+            on_error=self._on_error,
+        )
+
+    def _on_created(self, username):
+        if self.winfo_exists():
             messagebox.showinfo("Success", f"User '{username}' created successfully.", parent=self)
             self.destroy()
-        except ValueError as err:
+
+    def _on_error(self, err):
+        if self.winfo_exists():
+            self.submit_btn.state(["!disabled"])
             messagebox.showerror("Error", str(err), parent=self)
@@ -0,0 +1,270 @@
+"""
+gui.virtual_table
+Treeview wrapper that only materializes the rows currently in view
+"""
+
+import sys
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from tkinter import ttk
+
+Row = Tuple[str, Tuple]
+
+
+class VirtualTable(ttk.Frame):  # pylint: disable=too-many-ancestors
+    """
+    Keeps the full result set in plain Python lists and creates Treeview items
+    only for the visible rows plus a small buffer on either side. When the view
+    approaches the end of the loaded rows, ``fetch_more`` is asked for the next page;
+    it may answer later (from a background task) by calling ``append``.
+    """
+
+    def __init__(self, parent, columns: Sequence[str], column_widths: Dict[str, int],
+                 height: int = 10, buffer: int = 10,
+                 on_sort: Optional[Callable[[str], None]] = None):
+        super().__init__(parent)
+        self.columns = list(columns)
+        self.height = height
+        self.buffer = buffer
+
+        self._ids: List[str] = []
+        self._rows: List[Tuple] = []
+        self._positions: Dict[str, int] = {}
+        self._selected: set = set()
+        self._fetch_more: Optional[Callable[[], None]] = None
+        self._fetching = False
+        self._window = (0, 0)
+        self._offset = 0
+        self._rendering = False
+
+        self.tree = ttk.Treeview(self, columns=self.columns, show="headings", height=height,
+                                 yscrollcommand=self._on_tree_yview)
+        for col in self.columns:
+            if on_sort is not None:
+                self.tree.heading(col, text=col, command=lambda col=col: on_sort(col))
+            else:
+                self.tree.heading(col, text=col)
+            self.tree.column(col, width=column_widths.get(col, 100), anchor="center", stretch=False)
+        self.tree.grid(column=0, row=0, sticky="nsew")
+
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.grid(column=1, row=0, sticky="ns")
+
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", self._on_mousewheel)
+        self.tree.bind("<Button-5>", self._on_mousewheel)
+
+    # ----- data -----
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def load(self, rows: Iterable[Row], fetch_more: Optional[Callable[[], None]] = None) -> None:
+        self._ids, self._rows, self._positions = [], [], {}
+        self._selected.clear()
+        self._fetch_more = fetch_more
+        self._fetching = False
+        self._offset = 0
+        self._append(rows)
+        self._render()
+        self._maybe_fetch(0)
+
+    def append(self, rows: Iterable[Row], more: bool = False) -> None:
+        self._fetching = False
+        if not more:
+            self._fetch_more = None
+        self._append(rows)
+        if self._window[1] < min(self._offset + self.height + self.buffer, len(self._ids)):
+            self._render()
+        else:
+            self._update_scrollbar()
+        self._maybe_fetch(self._offset)
+
+    def _append(self, rows: Iterable[Row]) -> None:
+        for iid, values in rows:
+            pos = self._positions.get(iid)
+            if pos is not None:
+                # Already present (e.g. delivered by a live update before its page loaded)
+                self._rows[pos] = tuple(values)
+                continue
+            self._positions[iid] = len(self._ids)
+            self._ids.append(iid)
+            self._rows.append(tuple(values))
+
+    def upsert(self, rows: Iterable[Row]) -> None:
+        """
+        Replaces the values of rows already in the table and appends new ones,
+        refreshing only the Treeview items that are currently rendered.
+        """
+        for iid, values in rows:
+            self._append([(iid, values)])
+            if self.tree.exists(iid):
+                self.tree.item(iid, values=self._rows[self._positions[iid]])
+        if self._window[1] < min(self._offset + self.height + self.buffer, len(self._ids)):
+            self._render()
+        else:
+            self._update_scrollbar()
+
+    def clear(self) -> None:
+        self.load([])
+
+    def get_values(self, iid: str) -> Tuple:
+        return self._rows[self._positions[iid]]
+
+    def set_value(self, iid: str, column: str, value) -> None:
+        pos = self._positions.get(iid)
+        if pos is None:
+            return
+        row = list(self._rows[pos])
+        row[self.columns.index(column)] = value
+        self._rows[pos] = tuple(row)
+        if self.tree.exists(iid):
+            self.tree.set(iid, column, value)
+
+    def delete_rows(self, iids: Iterable[str]) -> None:
+        doomed = {iid for iid in iids if iid in self._positions}
+        if not doomed:
+            return
+        kept = [pos for pos, iid in enumerate(self._ids) if iid not in doomed]
+        self._ids = [self._ids[pos] for pos in kept]
+        self._rows = [self._rows[pos] for pos in kept]
+        self._positions = {iid: pos for pos, iid in enumerate(self._ids)}
+        self._selected -= doomed
+        self._offset = min(self._offset, max(len(self._ids) - self.height, 0))
+        self._render()
+
+    def sort(self, column: str, reverse: bool = False) -> None:
+        """
+        Reorders the loaded rows by ``column``. Rendered items that stay in view
+        are moved rather than recreated. Numbers sort before text and empty
+        values sort last.
+        """
+        col = self.columns.index(column)
+
+        def key(pos):
+            value = self._rows[pos][col]
+            if value in ("", None):
+                return (2, "") if not reverse else (-1, "")
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                return (0, value)
+            return (1, str(value).lower())
+
+        order = sorted(range(len(self._ids)), key=key, reverse=reverse)
+        self._ids = [self._ids[pos] for pos in order]
+        self._rows = [self._rows[pos] for pos in order]
+        self._positions = {iid: pos for pos, iid in enumerate(self._ids)}
+        self._render(reuse=True)
+
+    def show_sort(self, column: Optional[str], reverse: bool = False) -> None:
+        for col in self.columns:
+            arrow = (" \u25bc" if reverse else " \u25b2") if col == column else ""
+            self.tree.heading(col, text=col + arrow)
+
+    def selection(self) -> Tuple[str, ...]:
+        return tuple(iid for iid in self._ids if iid in self._selected) if self._selected else ()
+
+    # ----- viewport -----
+
+    def _render(self, reuse: bool = False) -> None:
+        start = max(self._offset - self.buffer, 0)
+        end = min(self._offset + self.height + self.buffer, len(self._ids))
+        self._rendering = True
+        try:
+            if reuse:
+                # Values are unchanged (e.g. a re-sort): keep existing items and
+                # only move them, creating items just for rows new to the window
+                wanted = set(self._ids[start:end])
+                stale = [iid for iid in self.tree.get_children() if iid not in wanted]
+                if stale:
+                    self.tree.delete(*stale)
+                for index, pos in enumerate(range(start, end)):
+                    iid = self._ids[pos]
+                    if self.tree.exists(iid):
+                        self.tree.move(iid, "", index)
+                    else:
+                        self.tree.insert("", index, iid=iid, values=self._rows[pos])
+            else:
+                self.tree.delete(*self.tree.get_children())
+                for pos in range(start, end):
+                    iid = self._ids[pos]
+                    self.tree.insert("", "end", iid=iid, values=self._rows[pos])
+            visible = [iid for iid in self._ids[start:end] if iid in self._selected]
+            if visible:
+                self.tree.selection_set(visible)
+            self._window = (start, end)
+            if end > start:
+                self.tree.yview_moveto((self._offset - start) / (end - start))
+        finally:
+            self._rendering = False
+        self._update_scrollbar()
+
+    def _scroll_to(self, offset: int) -> None:
+        self._maybe_fetch(offset)
+        offset = max(0, min(offset, max(len(self._ids) - self.height, 0)))
+        if offset == self._offset:
+            return
+        self._offset = offset
+        start, end = self._window
+        total = len(self._ids)
+        if (start == 0 or offset > start) and (end == total or offset + self.height < end):
+            # Still inside the materialized window: let the Treeview scroll itself
+            self._rendering = True
+            try:
+                self.tree.yview_moveto((offset - start) / (end - start))
+            finally:
+                self._rendering = False
+            self._update_scrollbar()
+        else:
+            self._render()
+
+    def _scroll_rows(self, delta: int) -> None:
+        self._scroll_to(self._offset + delta)
+
+    def _maybe_fetch(self, offset: int) -> None:
+        if self._fetch_more is None or self._fetching:
+            return
+        if offset + self.height + self.buffer >= len(self._ids):
+            self._fetching = True
+            self._fetch_more()
+
+    def _update_scrollbar(self) -> None:
+        total = len(self._ids)
+        if not total:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        self.scrollbar.set(self._offset / total, min((self._offset + self.height) / total, 1.0))
+
+    # ----- event handlers -----
+
+    def _on_tree_yview(self, first, _last) -> None:
+        # Keyboard navigation scrolls the Treeview directly; keep our offset in step
+        if self._rendering:
+            return
+        start, end = self._window
+        offset = start + round(float(first) * (end - start))
+        if offset != self._offset:
+            self._scroll_to(offset)
+
+    def _on_scrollbar(self, action, *args) -> None:
+        if action == "moveto":
+            self._scroll_to(int(float(args[0]) * len(self._ids)))
+        elif action == "scroll":
+            step = self.height if args[1] == "pages" else 1
+            self._scroll_rows(int(args[0]) * step)
+
+    def _on_mousewheel(self, event) -> str:
+        if event.num in (4, 5):
+            delta = -3 if event.num == 4 else 3
+        elif sys.platform == "darwin":
+            delta = -event.delta
+        else:
+            delta = -event.delta // 120 * 3
+        self._scroll_rows(delta)
+        return "break"
+
+    def _on_select(self, _event) -> None:
+        if self._rendering:
+            return
+        start, end = self._window
+        rendered = set(self._ids[start:end])
+        self._selected = (self._selected - rendered) | set(self.tree.selection())
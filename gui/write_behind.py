@@ -0,0 +1,187 @@
+"""
+gui.write_behind
+Queues animal writes made optimistically in the table and flushes them
+to the database in coalesced batches, reporting failures for rollback
+"""
+
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bson.objectid import ObjectId
+from pymongo import errors
+
+# (animal id, state before the first queued write, error message)
+Failure = Tuple[str, Any, str]
+
+# What the server reported for the writes that went through
+COUNT_KEYS = ("inserted", "matched", "modified", "deleted")
+
+
+class WriteBehindQueue:
+    """
+    Collects creates, updates and deletes per animal and writes them
+    ``delay_ms`` after the first one arrives, on the TaskRunner.
+
+    Writes to the same animal are coalesced while queued: updates merge into
+    each other (or into a pending create), and deleting an animal that was
+    never written cancels its create. Each flush sends at most one
+    insert_animals, one update per distinct change (set_reserved_many for a
+    reserve toggle, update_animals otherwise), and one delete_animals. Only one
+    batch is in flight at a time, so writes reach the server in the order they
+    were made.
+
+    Every queued write carries the caller's ``original`` (whatever is needed
+    to undo it; ``None`` for a create). When a write fails, ``on_failed``
+    receives ``(animal_id, original, message)`` tuples on the Tk thread. Once
+    the queue drains, ``on_idle`` receives the server's counts (COUNT_KEYS)
+    summed over the batches written since it was last idle.
+    """
+
+    def __init__(self, db, runner, widget, delay_ms: int = 300,
+                 on_failed: Optional[Callable[[List[Failure]], None]] = None,
+                 on_idle: Optional[Callable[[Dict[str, int]], None]] = None) -> None:
+        self.db = db
+        self.runner = runner
+        self.widget = widget
+        self.delay_ms = delay_ms
+        self.on_failed = on_failed
+        self.on_idle = on_idle
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._in_flight = False
+        self._scheduled = False
+        self._counts = dict.fromkeys(COUNT_KEYS, 0)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    @property
+    def idle(self) -> bool:
+        return not self._pending and not self._in_flight
+
+    def create(self, doc: Dict[str, Any]) -> str:
+        """
+        Queues an insert and returns the new animal's id, assigned client-side
+        so the row can be shown (and edited or deleted) before the insert lands.
+        """
+        doc = dict(doc)
+        doc.setdefault("_id", ObjectId())
+        animal_id = str(doc["_id"])
+        self._pending[animal_id] = {"op": "create", "data": doc, "original": None}
+        self._schedule()
+        return animal_id
+
+    def update(self, animal_id: str, fields: Dict[str, Any], original: Any) -> None:
+        entry = self._pending.get(animal_id)
+        if entry is None:
+            self._pending[animal_id] = {"op": "update", "data": dict(fields), "original": original}
+        elif entry["op"] != "delete":
+            entry["data"].update(fields)
+        self._schedule()
+
+    def delete(self, animal_id: str, original: Any) -> None:
+        entry = self._pending.get(animal_id)
+        if entry is None:
+            self._pending[animal_id] = {"op": "delete", "data": None, "original": original}
+        elif entry["op"] == "create":
+            del self._pending[animal_id]
+        else:
+            entry["op"], entry["data"] = "delete", None
+        self._schedule()
+
+    def flush(self) -> None:
+        """
+        Sends everything queued now instead of waiting for the delay.
+        """
+        self._scheduled = False
+        if self._in_flight or not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        self._in_flight = True
+        self.runner.submit(self._write, batch, quiet=True,
+                           on_success=lambda result: self._on_written(batch, *result),
+                           on_error=lambda exc: self._on_written(
+                               batch, {animal_id: str(exc) for animal_id in batch}, {}))
+
+    def close(self) -> List[Failure]:
+        """
+        Writes whatever is still queued on the calling thread, for shutdown
+        when the TaskRunner is about to stop. Returns the failures.
+        """
+        self._scheduled = False
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return []
+        failed, _ = self._write(batch)
+        return [(animal_id, batch[animal_id]["original"], message) for animal_id, message in failed.items()]
+
+    def _schedule(self) -> None:
+        if not self._scheduled and not self._in_flight:
+            self._scheduled = True
+            self.widget.after(self.delay_ms, self.flush)
+
+    # Runs on a worker thread; returns {animal_id: message} for the writes that
+    # failed and the server's counts for the ones that did not
+    def _write(self, batch: Dict[str, Dict[str, Any]]) -> Tuple[Dict[str, str], Dict[str, int]]:
+        failed: Dict[str, str] = {}
+        counts = dict.fromkeys(COUNT_KEYS, 0)
+
+        creates = [(animal_id, entry["data"]) for animal_id, entry in batch.items()
+                   if entry["op"] == "create"]
+        if creates:
+            counts["inserted"], rejected = self.db.insert_animals([doc for _, doc in creates])
+            for index, message in rejected:
+                failed[creates[index][0]] = message
+
+        # Identical changes (e.g. reserving a whole selection) share one update_many
+        updates: Dict[Any, List[str]] = {}
+        changes: Dict[Any, Dict[str, Any]] = {}
+        for animal_id, entry in batch.items():
+            if entry["op"] == "update":
+                key = tuple(sorted(entry["data"].items()))
+                updates.setdefault(key, []).append(animal_id)
+                changes[key] = entry["data"]
+        for key, ids in updates.items():
+            # Rows another client already deleted match nothing, which is not a
+            # failure (the change feed removes them); only a data-layer error is
+            try:
+                if set(changes[key]) == {"reserved"}:
+                    matched, modified = self.db.set_reserved_many(
+                        ids, changes[key]["reserved"], raise_errors=True)
+                else:
+                    matched, modified = self.db.update_animals(ids, changes[key], raise_errors=True)
+            except errors.PyMongoError as exc:
+                failed.update({animal_id: str(exc) for animal_id in ids})
+            else:
+                counts["matched"] += matched
+                counts["modified"] += modified
+
+        deletes = [animal_id for animal_id, entry in batch.items() if entry["op"] == "delete"]
+        if deletes:
+            try:
+                counts["deleted"] = self.db.delete_animals(deletes, raise_errors=True)
+            except errors.PyMongoError as exc:
+                failed.update({animal_id: str(exc) for animal_id in deletes})
+        return failed, counts
+
+    def _on_written(self, batch: Dict[str, Dict[str, Any]], failed: Dict[str, str],
+                    counts: Dict[str, int]) -> None:
+        self._in_flight = False
+        for key, count in counts.items():
+            self._counts[key] += count
+        failures = []
+        for animal_id, message in failed.items():
+            entry = batch[animal_id]
+            logging.warning("Write-behind %s of %s failed: %s", entry["op"], animal_id, message)
+            # The caller rolls back to the state before this batch, so later
+            # writes queued on top of it are dropped too
+            self._pending.pop(animal_id, None)
+            failures.append((animal_id, entry["original"], message))
+        if failures and self.on_failed is not None:
+            self.on_failed(failures)
+
+        if self._pending:
+            self._schedule()
+            return
+        totals, self._counts = self._counts, dict.fromkeys(COUNT_KEYS, 0)
+        if self.on_idle is not None:
+            self.on_idle(totals)
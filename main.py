@@ -4,11 +4,19 @@ Starting point of application
 """
 
 from __future__ import annotations
+# Imported first so start-up phases are timed from here
+# pylint: disable=wrong-import-order,ungrouped-imports
+from gui.startup import STARTUP
+import json
 import logging
+import os
 import sys
-from tkinter import Tk, messagebox
+from tkinter import messagebox
+from data.metrics import serve_metrics, start_json_dump
 from gui.app import AnimalApp
 
+STARTUP.mark("imports")
+
 # Configuring logger to display
 logging.basicConfig(
     level=logging.INFO,
@@ -17,21 +25,43 @@ logging.basicConfig(
 )
 logging.info("Starting")
 
+
+def on_ready(app: AnimalApp, error: Exception | None) -> None:
+    """
+    Called once, when the first background connection attempt succeeds or fails.
+    Logs the start-up timings; ANIMAL_STARTUP_REPORT also writes them as JSON
+    to that path, and ANIMAL_STARTUP_EXIT closes the app straight away
+    (used by ``python -m gui.startup --run``).
+    """
+    logging.info("%s", STARTUP.report())
+    report_path = os.getenv("ANIMAL_STARTUP_REPORT")
+    if report_path:
+        with open(report_path, "w", encoding="utf-8") as handle:
+            json.dump(STARTUP.to_dict(), handle, indent=2)
+    if os.getenv("ANIMAL_STARTUP_EXIT"):
+        app.after_idle(app.destroy)
+    elif error is not None and app.snapshot is None:
+        # With a snapshot the app stays usable read-only and says so in its status bar
+        messagebox.showerror("Database error", str(error), parent=app)
+
+
 def main() -> None:
     """
     Main function to start the application.
-    Includes logging for errors
+    The window appears first and connects to the database in the background
     :return:
     """
-    try:
-        app = AnimalApp()
-        app.mainloop()
-    except RuntimeError as err:
-        logging.error("Application failed to start: %s", err, exc_info=True)
-        root = Tk()
-        root.withdraw()
-        messagebox.showerror("Database error", str(err))
-        root.destroy()
+    # Optional metrics export: ANIMAL_METRICS_PORT serves /metrics locally,
+    # ANIMAL_METRICS_FILE gets a JSON snapshot every ANIMAL_METRICS_INTERVAL seconds
+    if os.getenv("ANIMAL_METRICS_PORT"):
+        serve_metrics(port=int(os.environ["ANIMAL_METRICS_PORT"]))
+    if os.getenv("ANIMAL_METRICS_FILE"):
+        start_json_dump(os.environ["ANIMAL_METRICS_FILE"],
+                        float(os.getenv("ANIMAL_METRICS_INTERVAL", "60")))
+
+    app = AnimalApp(on_ready=on_ready)
+    STARTUP.mark("window_created")
+    app.mainloop()
 
 if __name__ == '__main__':
     main()
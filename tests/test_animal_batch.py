@@ -0,0 +1,51 @@
+"""
+test.test_animal_batch
+Testing the columnar AnimalBatch container
+"""
+import pytest
+
+from animals.animal_batch import AnimalBatch
+from animals.dog import Dog
+from animals.monkey import Monkey
+
+
+def _dog(name="Rex", reserved=False):
+    return Dog(name=name, breed="Labrador", gender="Male", age=3, weight=30.5,
+               acquisition_country="USA", training_status="In Training",
+               reserved=reserved, in_service_country="USA")
+
+
+def _monkey(name="Zuri", reserved=True):
+    return Monkey(name=name, species="Capuchin", gender="Female", age=4, weight=8.2,
+                  acquisition_country="Brazil", training_status="Not Trained",
+                  reserved=reserved, in_service_country="Canada")
+
+
+def test_dog_and_monkey_have_no_instance_dict():
+    for animal in (_dog(), _monkey()):
+        assert not hasattr(animal, "__dict__")
+        with pytest.raises(AttributeError):
+            animal.nickname = "Buddy"
+
+
+def test_batch_round_trips_animals_and_documents():
+    animals = [_dog(), _monkey(), _dog("Max", reserved=True)]
+    batch = AnimalBatch(animals)
+    assert len(batch) == 3
+    assert list(batch) == [a.to_dict() for a in animals]
+    assert [a.to_dict() for a in batch.to_animals()] == [a.to_dict() for a in animals]
+    assert "species" not in batch[0] and batch[-1]["reserved"] is True
+
+    docs = AnimalBatch.from_documents([{"_id": 7, "name": "Ace", "animal_type": "Dog", "reserved": False}])
+    assert docs[0] == {"_id": 7, "name": "Ace", "animal_type": "Dog", "reserved": False}
+
+
+def test_batch_filter_uses_encoded_columns():
+    batch = AnimalBatch([_dog(), _monkey(), _dog("Max", reserved=True), _monkey("Koko", reserved=False)])
+    assert batch.filter(animal_type="Dog").column("name") == ["Rex", "Max"]
+    assert batch.filter(reserved=False).column("name") == ["Rex", "Koko"]
+    assert batch.filter(animal_type="Cat").column("name") == []
+    assert batch.filter(lambda row: row["age"] > 3).column("species") == ["Capuchin", "Capuchin"]
+    assert batch.column("weight") == [30.5, 8.2, 30.5, 8.2]
+    with pytest.raises(IndexError):
+        batch.to_dict(4)
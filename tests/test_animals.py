@@ -54,3 +54,59 @@ def test_negative_age_raises_value_error():
             reserved=False,
             in_service_country="USA",
         )
+
+def test_from_dict_round_trip_keeps_subclass_fields():
+    m = Monkey(
+        name="Zuri",
+        species="Capuchin",
+        gender="Female",
+        age=4,
+        weight=8.2,
+        acquisition_country="Brazil",
+        training_status="Not Trained",
+        reserved=True,
+        in_service_country="Canada",
+    )
+    data = m.to_dict()
+    data["acquisition_date"] = "2024-01-02"
+    restored = Monkey.from_dict(data)
+    assert restored.to_dict() == data
+
+def _dog_record(**overrides):
+    record = {
+        "name": "rex", "breed": " labrador ", "gender": "male", "age": 3, "weight": 30.5,
+        "acquisition_country": "usa", "training_status": "in training", "reserved": False,
+        "in_service_country": "usa",
+    }
+    record.update(overrides)
+    return record
+
+
+def test_from_records_matches_scalar_from_dict():
+    records = [
+        _dog_record(),
+        _dog_record(age=-1),
+        _dog_record(name="  ", weight="heavy"),
+        _dog_record(acquisition_date="2024-05-01"),
+        {k: v for k, v in _dog_record().items() if k != "breed"},
+        _dog_record(age="4", reserved=1),
+    ]
+    animals, errors = Dog.from_records(records)
+
+    scalar_ok, scalar_errors = [], []
+    for i, record in enumerate(records):
+        try:
+            scalar_ok.append(Dog.from_dict(record).to_dict())
+        except (KeyError, ValueError):
+            scalar_errors.append(i)
+
+    assert [i for i, _ in errors] == scalar_errors == [1, 2, 4]
+    assert [a.to_dict() for a in animals] == scalar_ok
+    assert animals[1].acquisition_date == "2024-05-01"
+
+
+def test_validate_many_reports_first_error_per_row():
+    values, errors = Dog.validate_many([_dog_record(), _dog_record(gender="", age=-1)])
+    assert values[0]["breed"] == "Labrador"
+    assert values[1] is None
+    assert errors == [(1, "gender must be a non-empty string")]
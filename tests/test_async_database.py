@@ -0,0 +1,92 @@
+"""
+test.test_async_database
+Testing the asyncio data layer against mongomock through ThreadedAsyncClient
+"""
+import asyncio
+
+import pytest
+from pymongo import errors
+
+from data import async_database
+from data.async_database import AsyncAnimalDatabase, ThreadedAsyncClient
+from data.database_manager import APP_QUERIES
+
+
+def _animal(name, animal_type="Dog", reserved=False):
+    return {"name": name, "animal_type": animal_type, "gender": "male", "age": 3, "weight": 20.0,
+            "acquisition_date": "2024-01-01", "acquisition_country": "USA",
+            "training_status": "Fully Trained", "reserved": reserved, "in_service_country": "USA"}
+
+
+@pytest.fixture()
+def adb(db):
+    """
+    An AsyncAnimalDatabase over the same in-memory collections as ``db``.
+    """
+    return AsyncAnimalDatabase(client=ThreadedAsyncClient(db.client), cache=db.cache,
+                               bcrypt_rounds=4)
+
+
+def test_async_crud_and_paging(adb):
+    async def scenario():
+        await adb.connect()
+        assert await adb.create_animal(_animal("Rex")) is True
+        inserted, failures = await adb.insert_animals([_animal(f"Dog{i}") for i in range(4)])
+        assert (inserted, failures) == (4, [])
+
+        first, after = await adb.find_animals_page(limit=3)
+        rest, end = await adb.find_animals_page(after=after, limit=3)
+        assert len(first) == 3 and len(rest) == 2 and end is None
+        assert len(await adb.read_all_animals()) == 5
+
+        rex = (await adb.read_all_animals({"name": "Rex"}))[0]
+        assert await adb.update_animal(rex["_id"], {"reserved": True}) is True
+        assert await adb.set_reserved_many([doc["_id"] for doc in first], False) == (3, 1)
+        assert await adb.delete_animal(rex["_id"]) is True
+        assert await adb.count_animals() == 4
+        await adb.close()
+
+    asyncio.run(scenario())
+
+
+def test_count_animals_many_matches_blocking_database(db, adb):
+    for animal in (_animal("Rex"), _animal("Fido", reserved=True), _animal("Momo", "Monkey")):
+        db.create_animal(animal)
+    queries = {label: APP_QUERIES[label] for label in ("dogs", "monkeys", "available")}
+
+    counts = asyncio.run(adb.count_animals_many(queries))
+    assert counts == db.count_animals_many(queries)
+    assert counts == {"dogs": 2, "monkeys": 1, "available": 2}
+    assert asyncio.run(adb.animal_stats()) == db.animal_stats(use_cache=False)
+
+
+def test_async_iteration_raises_on_a_failed_page(db, adb):
+    for i in range(5):
+        db.create_animal(_animal(f"Dog{i}"))
+
+    async def scenario():
+        streamed = []
+        with pytest.raises(errors.PyMongoError):
+            async for animal in adb.iter_animals(batch_size=2, use_cache=False):
+                streamed.append(animal)
+                adb.collection.find = failing_find
+        return streamed
+
+    def failing_find(*args, **kwargs):
+        raise errors.OperationFailure("cursor killed", code=237)
+
+    assert len(asyncio.run(scenario())) == 2
+    assert asyncio.run(adb.read_all_animals()) == []
+
+
+def test_async_login_and_password_change(adb):
+    async def scenario():
+        await adb.create_user("jane", "pwd123", first_login=True)
+        user, first_login, token = await adb.login("jane", "pwd123")
+        assert user["username"] == "jane" and first_login is True
+        token = await adb.set_password(user, "new-pass")
+        assert adb.session_user(token)["username"] == "jane"
+        assert (await adb.authenticate_user("jane", "pwd123"))[0] is None
+        assert await adb.reauthenticate(token, "jane", "new-pass") is not None
+
+    asyncio.run(scenario())
@@ -0,0 +1,84 @@
+"""
+test.test_auth
+Testing bcrypt cost calibration, rehash on login and session reuse
+"""
+import bcrypt
+from pymongo import errors
+
+from data import auth
+
+
+def test_hash_rounds_and_calibration_bounds():
+    assert auth.hash_rounds(auth.hash_password("pw", 5)) == 5
+    assert auth.calibrate_rounds(target_seconds=1e-9, probe_rounds=4) == auth.MIN_ROUNDS
+    assert auth.calibrate_rounds(target_seconds=1e6, probe_rounds=4) == auth.MAX_ROUNDS
+
+
+def test_configured_rounds_never_drop_below_the_old_fixed_cost(monkeypatch):
+    assert auth.MIN_ROUNDS >= 12
+    monkeypatch.setenv("BCRYPT_ROUNDS", "4")
+    assert auth.configured_rounds() == auth.MIN_ROUNDS
+    monkeypatch.setenv("BCRYPT_ROUNDS", "14")
+    assert auth.configured_rounds() == 14
+
+
+def test_login_rehashes_to_configured_cost(db):
+    db.users.insert_one({"username": "old", "password": auth.hash_password("pw123", 4),
+                         "role": "user", "is_first_login": False})
+    db._bcrypt_rounds = 5
+    user, _, token = db.login("old", "pw123")
+    assert user is not None and token
+    assert auth.hash_rounds(db.users.find_one({"username": "old"})["password"]) == 5
+    assert db.login("old", "wrong") == (None, False, None)
+
+    # A stronger stored hash is never downgraded
+    db._bcrypt_rounds = 4
+    db.login("old", "pw123")
+    assert auth.hash_rounds(db.users.find_one({"username": "old"})["password"]) == 5
+
+
+def test_failed_rehash_does_not_fail_login(db):
+    db.users.insert_one({"username": "old", "password": auth.hash_password("pw123", 4),
+                         "role": "user", "is_first_login": False})
+    db._bcrypt_rounds = 5
+
+    def failing_update(*args, **kwargs):
+        raise errors.OperationFailure("not authorized", code=13)
+
+    db.users.update_one = failing_update
+    user, _, token = db.login("old", "pw123")
+    assert user["username"] == "old" and token
+
+
+def test_reauthenticate_within_session_skips_bcrypt(db, monkeypatch):
+    db._bcrypt_rounds = 4
+    db.create_user("boss", "secret1", role="admin", first_login=False)
+    _, _, token = db.login("boss", "secret1")
+    assert "password" not in db.session_user(token)
+
+    def no_bcrypt(*_args):
+        raise AssertionError("bcrypt should not run inside a session")
+    monkeypatch.setattr(bcrypt, "checkpw", no_bcrypt)
+    assert db.reauthenticate(token, "boss", "secret1")["role"] == "admin"
+    monkeypatch.undo()
+
+    assert db.reauthenticate(token, "boss", "nope") is None
+    assert db.reauthenticate(None, "boss", "secret1")["username"] == "boss"
+
+    new_token = db.set_password(db.users.find_one({"username": "boss"}), "secret2")
+    assert db.session_user(token) is None
+    assert db.session_user(new_token)["username"] == "boss"
+    db.logout(new_token)
+    assert db.session_user(new_token) is None
+
+
+def test_sessions_expire_after_idle_ttl():
+    now = [0.0]
+    store = auth.SessionStore(ttl=10, clock=lambda: now[0])
+    token = store.open({"username": "u", "password": b"x"}, "pw")
+    now[0] = 9
+    assert store.user(token)["username"] == "u"
+    now[0] = 18
+    assert store.verify(token, "pw") is not None
+    now[0] = 40
+    assert store.user(token) is None
@@ -0,0 +1,26 @@
+"""
+test.test_benchmarks
+Smoke-testing the benchmark suite at a tiny size so it keeps working
+"""
+from benchmarks.datasets import generate_animals
+from benchmarks.run import CASES, compare, run_suite
+
+
+def test_generator_is_deterministic():
+    assert list(generate_animals(20, seed=1)) == list(generate_animals(20, seed=1))
+
+
+def test_suite_runs_model_and_db_cases():
+    cases = [name for name in CASES if name.startswith(("model.", "db."))]
+    results = run_suite([50], cases, repeat=1)
+    by_name = {r["name"]: r for r in results}
+    assert by_name["model.construct"]["ops"] == 50
+    assert by_name["db.query.all"]["ops"] == 50
+    assert all(r["ops_per_sec"] > 0 for r in results)
+
+
+def test_compare_flags_regressions():
+    baseline = [{"name": "db.page_scan", "size": 1000, "ops_per_sec": 100.0}]
+    current = [{"name": "db.page_scan", "size": 1000, "ops_per_sec": 80.0}]
+    assert compare(current, baseline, threshold=0.1)[0]["change"] < -0.1
+    assert compare(current, baseline, threshold=0.3) == []
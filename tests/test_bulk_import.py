@@ -0,0 +1,50 @@
+"""
+test.test_bulk_import
+Testing the CSV / JSON Lines bulk importer
+"""
+import json
+
+import pytest
+
+from data.bulk_import import build_animal, import_file
+
+CSV_HEADER = ("animal_type,name,breed,species,gender,age,weight,acquisition_country,"
+              "training_status,reserved,in_service_country\n")
+
+
+def test_csv_import_reports_bad_rows_without_aborting(db, tmp_path):
+    path = tmp_path / "animals.csv"
+    path.write_text(
+        CSV_HEADER
+        + "Dog,rex,labrador,,Male,3,30.5,usa,In Training,yes,usa\n"
+        + "Dog,Bad,Lab,,Male,-1,10,USA,In Training,no,USA\n"
+        + "Monkey,Zuri,,capuchin,Female,4,8.2,Brazil,Not Trained,no,Canada\n"
+        + "Cat,Tom,,,Male,1,4,USA,Not Trained,no,USA\n",
+        encoding="utf-8",
+    )
+    stats = import_file(db, str(path), batch_size=1)
+    assert stats.read == 4
+    assert stats.inserted == 2
+    assert [row for row, _ in stats.errors] == [3, 5]
+    rex = db.read_all_animals({"name": "Rex"})[0]
+    assert rex["breed"] == "Labrador"
+    assert rex["reserved"] is True
+
+
+def test_jsonl_import_handles_malformed_lines(db, tmp_path):
+    good = {"animal_type": "Monkey", "name": "Kiki", "species": "Tamarin", "gender": "Female",
+            "age": 2, "weight": 1.5, "acquisition_country": "Peru",
+            "training_status": "Fully Trained", "reserved": False,
+            "in_service_country": "Peru", "acquisition_date": "2024-01-02"}
+    path = tmp_path / "animals.jsonl"
+    path.write_text(json.dumps(good) + "\n{not json\n\n" + json.dumps(good) + "\n",
+                    encoding="utf-8")
+    stats = import_file(db, str(path))
+    assert stats.inserted == 2
+    assert [row for row, _ in stats.errors] == [2]
+    assert db.read_all_animals({"name": "Kiki"})[0]["acquisition_date"] == "2024-01-02"
+
+
+def test_build_animal_rejects_missing_fields():
+    with pytest.raises(ValueError, match="missing field"):
+        build_animal({"animal_type": "Dog", "name": "Rex"})
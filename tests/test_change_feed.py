@@ -0,0 +1,72 @@
+"""
+test.test_change_feed
+Testing incremental refresh via updated_at polling against mongomock
+"""
+from datetime import date
+
+import pytest
+
+from data.change_feed import ChangeFeed, StreamsUnsupported
+
+
+def _dog(name, reserved=False):
+    return {"name": name, "animal_type": "Dog", "breed": "Labrador", "gender": "Male",
+            "age": 2, "weight": 25.0, "acquisition_country": "USA",
+            "training_status": "Not Trained", "reserved": reserved,
+            "in_service_country": "USA", "acquisition_date": date.today().isoformat()}
+
+
+def test_poll_reports_inserts_updates_and_deletes(db):
+    feed = ChangeFeed(db, {"reserved": False}, mode="poll")
+    assert feed.poll() == ([], [])
+
+    db.create_animal(_dog("Rex"))
+    db.create_animal(_dog("Max", reserved=True))
+    upserts, removed = feed.poll()
+    assert [doc["name"] for doc in upserts] == ["Rex"]
+    rex_id = upserts[0]["_id"]
+    assert len(removed) == 1                # Max changed but is outside the query
+
+    assert feed.poll() == ([], [])          # nothing new since the last poll
+
+    db.update_animal(rex_id, {"reserved": True})
+    upserts, removed = feed.poll()
+    assert upserts == [] and removed == [rex_id]
+
+    db.delete_animal(rex_id)
+    assert feed.poll() == ([], [rex_id])
+
+
+def test_writes_stamp_updated_at(db):
+    db.create_animal(_dog("Rex"))
+    created = db.read_all_animals({"name": "Rex"})[0]
+    db.update_animal(created["_id"], {"age": 3})
+    updated = db.read_all_animals({"name": "Rex"})[0]
+    assert updated["updated_at"] >= created["updated_at"]
+
+
+def test_poll_pages_through_a_batch_sharing_one_stamp(db):
+    feed = ChangeFeed(db, mode="poll")
+    feed.MAX_EVENTS = 10
+    db.insert_animals([_dog(f"Dog{i}") for i in range(25)])
+    assert len({doc["updated_at"] for doc in db.collection.find()}) == 1
+
+    assert [len(feed.poll()[0]) for _ in range(4)] == [10, 10, 5, 0]
+    db.create_animal(_dog("Rex"))
+    assert [doc["name"] for doc in feed.poll()[0]] == ["Rex"]
+
+
+def test_auto_mode_falls_back_to_polling_without_change_streams(db):
+    feed = ChangeFeed(db, mode="auto")
+    assert feed.poll() == ([], [])
+    assert feed.mode == "poll"
+
+    db.create_animal(_dog("Rex"))
+    upserts, removed = feed.poll()
+    assert [doc["name"] for doc in upserts] == ["Rex"] and removed == []
+
+
+def test_stream_mode_reports_missing_change_streams(db):
+    feed = ChangeFeed(db, mode="stream")
+    with pytest.raises(StreamsUnsupported):
+        feed.poll()
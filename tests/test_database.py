@@ -1,7 +1,13 @@
 import bcrypt
+import mongomock
 import pytest
 from bson.objectid import ObjectId
 from datetime import date
+from pymongo import errors
+
+from data import database_manager
+from data.metrics import MetricsRegistry
+from data.query_cache import QueryCache, freeze
 
 def _sample_dog_dict(**overrides):
     base = {
@@ -65,3 +71,174 @@ def test_delete_animal_entry(db):
     animal_id = created["_id"]
     assert db.delete_animal(animal_id) is True
     assert db.read_all_animals({"_id": animal_id}) == []
+
+def test_find_animals_page_keyset_pagination(db):
+    for i in range(5):
+        db.create_animal(_sample_dog_dict(name=f"Dog{i}"))
+    first, cursor = db.find_animals_page(limit=2)
+    assert len(first) == 2
+    assert cursor is not None
+    second, cursor = db.find_animals_page(after=cursor, limit=2)
+    third, cursor = db.find_animals_page(after=cursor, limit=2)
+    names = [a["name"] for a in first + second + third]
+    assert names == [f"Dog{i}" for i in range(5)]
+    assert cursor is None
+
+def test_find_animals_page_sorted_with_projection(db):
+    for name, age in [("Ace", 5), ("Bo", 1), ("Cy", 3), ("Di", 3)]:
+        db.create_animal(_sample_dog_dict(name=name, age=age))
+    page, cursor = db.find_animals_page(
+        sort=[("age", -1)], limit=3, projection={"name": 1}
+    )
+    assert [a["name"] for a in page] == ["Ace", "Cy", "Di"]
+    assert "breed" not in page[0]
+    rest, _ = db.find_animals_page(sort=[("age", -1)], after=cursor, limit=3)
+    assert [a["name"] for a in rest] == ["Bo"]
+
+def test_iter_animals_streams_all_matches(db):
+    for i in range(7):
+        db.create_animal(_sample_dog_dict(name=f"Dog{i}", reserved=i % 2 == 0))
+    streamed = list(db.iter_animals({"reserved": True}, batch_size=2))
+    assert len(streamed) == 4
+    assert len(db.read_all_animals()) == 7
+
+
+class _FailingFind:
+    """Wraps a collection; ``find`` raises once it has been called ``after`` times."""
+
+    def __init__(self, inner, after):
+        self.inner = inner
+        self.after = after
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+    def find(self, *args, **kwargs):
+        if self.after == 0:
+            raise errors.OperationFailure("cursor killed", code=237)
+        self.after -= 1
+        return self.inner.find(*args, **kwargs)
+
+
+def test_failed_page_is_not_mistaken_for_the_end(db):
+    for i in range(5):
+        db.create_animal(_sample_dog_dict(name=f"Dog{i}"))
+    db.collection = _FailingFind(db.collection, after=1)
+    streamed = []
+    with pytest.raises(errors.PyMongoError):
+        for animal in db.iter_animals(batch_size=2):
+            streamed.append(animal)
+    assert len(streamed) == 2
+
+    db.collection.after = 0
+    db.metrics = MetricsRegistry()
+    assert db.read_all_animals() == []
+    assert db.metrics.snapshot()["operations"]["read_all_animals"]["errors"] == 1
+
+def test_get_database_returns_shared_instance(monkeypatch):
+    monkeypatch.setattr("data.database_manager.MongoClient", mongomock.MongoClient)
+    monkeypatch.setattr(database_manager, "_shared_db", None)
+    first = database_manager.get_database(mongo_uri="mongodb://dummy", max_pool_size=5)
+    second = database_manager.get_database()
+    assert first is second
+    assert first.users.count_documents({"username": "admin"}) == 1
+    database_manager.close_shared_database()
+    assert database_manager._shared_db is None
+
+def test_declared_indexes_created_at_startup(db):
+    report = db.verify_indexes()
+    assert report == {"missing": [], "unexpected": []}
+    db.collection.drop_index("animal_type_id")
+    db.collection.create_index("name")
+    report = db.verify_indexes()
+    assert report["missing"] == ["animal_type_id"]
+    assert report["unexpected"] == ["name_1"]
+
+def test_collscan_detected_in_nested_plan():
+    ixscan = {"stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}}
+    collscan = {"stage": "SORT", "inputStages": [{"stage": "COLLSCAN"}]}
+    assert database_manager.AnimalDatabase._uses_collscan(ixscan) is False
+    assert database_manager.AnimalDatabase._uses_collscan(collscan) is True
+
+def test_read_cache_hits_and_write_invalidation(db):
+    db.create_animal(_sample_dog_dict())
+    db.read_all_animals({"animal_type": "Dog"})
+    misses = db.cache.misses
+    first = db.read_all_animals({"animal_type": "Dog"})
+    assert db.cache.misses == misses
+    assert db.cache.hits >= 1
+    first[0]["name"] = "Mutated"            # callers get copies
+    assert db.read_all_animals({"animal_type": "Dog"})[0]["name"] == "Buddy"
+
+    db.update_animal(first[0]["_id"], {"name": "Max"})
+    assert db.read_all_animals({"animal_type": "Dog"})[0]["name"] == "Max"
+    assert db.cache.stats()["invalidations"] >= 2
+
+def test_query_cache_ttl_and_lru():
+    now = [0.0]
+    cache = QueryCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.put(freeze({"a": 1, "b": 2}), "ab")
+    assert cache.get(freeze({"b": 2, "a": 1})) == "ab"
+    assert len({freeze({"reserved": True}), freeze({"reserved": 1}), freeze({"reserved": 1.0})}) == 3
+    cache.put("x", 1)
+    cache.put("y", 2)                       # evicts the least recently used entry
+    assert cache.get(freeze({"a": 1, "b": 2})) is None
+    now[0] = 11
+    assert cache.get("y") is None
+    assert cache.stats()["evictions"] == 2
+
+def test_bulk_reserve_and_delete(db):
+    for i in range(4):
+        db.create_animal(_sample_dog_dict(name=f"Dog{i}", reserved=i == 0))
+    before = db.read_all_animals()
+    ids = [a["_id"] for a in before]
+    assert db.set_reserved_many([str(i) for i in ids] + [str(ObjectId())], True) == (4, 3)
+    after = db.read_all_animals()
+    assert all(a["reserved"] for a in after)
+    # Only the animals whose flag changed get a new updated_at
+    assert [a["updated_at"] == b["updated_at"] for a, b in zip(before, after)] == [True, False, False, False]
+    assert db.delete_animals(ids[:3]) == 3
+    assert [a["_id"] for a in db.read_all_animals()] == ids[3:]
+    assert db.tombstones.count_documents({}) == 3
+    assert db.delete_animals([]) == 0
+
+def test_animal_stats_aggregates_on_server(db):
+    db.create_animal(_sample_dog_dict(name="A", training_status="Fully Trained", in_service_country="Peru"))
+    db.create_animal(_sample_dog_dict(name="B", training_status="Fully Trained", in_service_country="Peru", age=12))
+    db.create_animal(_sample_dog_dict(name="C", training_status="Fully Trained", reserved=True))
+    db.create_animal(_sample_dog_dict(name="D", animal_type="Monkey", weight=4.0))
+
+    stats = db.animal_stats({"animal_type": "Dog", "training_status": "Fully Trained", "reserved": False})
+    assert stats["total"] == 2
+    assert stats["counts"]["in_service_country"] == {"Peru": 2}
+    assert stats["breakdown"] == [{"animal_type": "Dog", "training_status": "Fully Trained",
+                                   "reserved": False, "in_service_country": "Peru", "count": 2}]
+    assert stats["age"]["max"] == 12
+    assert [(b["lower"], b["count"]) for b in stats["age"]["buckets"]] == [(1, 1), (10, 1)]
+
+    everything = db.animal_stats()
+    assert everything["counts"]["animal_type"] == {"Dog": 3, "Monkey": 1}
+    assert everything["weight"]["min"] == 4.0
+    db.delete_animals([a["_id"] for a in db.read_all_animals({"name": "D"})])
+    assert db.animal_stats()["total"] == 3
+
+def test_descending_sort_pages_through_ties(db):
+    for i, age in enumerate([3, 1, 3, 2, 3]):
+        db.create_animal(_sample_dog_dict(name=f"Dog{i}", age=age))
+    sort = [("age", -1), ("_id", -1)]
+    streamed = list(db.iter_animals(sort=sort, batch_size=2))
+    assert [a["name"] for a in streamed] == ["Dog4", "Dog2", "Dog0", "Dog3", "Dog1"]
+    assert "name_id" in db.collection.index_information()
+
+
+def test_keyset_pages_through_null_sort_values(db):
+    for i, age in enumerate([2, None, 1, None, None, 3]):
+        dog = _sample_dog_dict(name=f"Dog{i}", age=age)
+        if age is None and i == 4:
+            del dog["age"]  # missing sorts with null
+        db.create_animal(dog)
+    for direction in (1, -1):
+        sort = [("age", direction), ("_id", direction)]
+        expected = [a["name"] for a in db.collection.find().sort(sort)]
+        streamed = [a["name"] for a in db.iter_animals(sort=sort, batch_size=2, use_cache=False)]
+        assert streamed == expected and len(streamed) == 6
@@ -0,0 +1,77 @@
+"""
+test.test_export
+Testing the streaming exporters
+"""
+import csv
+import gzip
+import json
+from datetime import date
+
+import pytest
+from pymongo import errors
+
+from data.export import detect_format, export_animals
+
+
+def _dog(name, reserved=False):
+    return {"name": name, "animal_type": "Dog", "breed": "Labrador", "gender": "Male",
+            "age": 2, "weight": 25.0, "acquisition_country": "USA",
+            "training_status": "Not Trained", "reserved": reserved,
+            "in_service_country": "USA", "acquisition_date": date.today().isoformat(),
+            "notes": "not exported"}
+
+
+def test_csv_export_streams_matching_rows(db, tmp_path):
+    for i in range(5):
+        db.create_animal(_dog(f"Dog{i}", reserved=i < 2))
+    path = tmp_path / "available.csv"
+    assert export_animals(db, str(path), {"reserved": False}, batch_size=2) == 3
+    with open(path, newline="", encoding="utf-8") as handle:
+        rows = list(csv.DictReader(handle))
+    assert [row["name"] for row in rows] == ["Dog2", "Dog3", "Dog4"]
+    assert "notes" not in rows[0]
+
+
+def test_failed_export_leaves_no_partial_file(db, tmp_path):
+    for i in range(5):
+        db.create_animal(_dog(f"Dog{i}"))
+    find = db.collection.find
+    calls = []
+
+    def failing_find(*args, **kwargs):
+        calls.append(args)
+        if len(calls) > 1:
+            raise errors.OperationFailure("cursor killed", code=237)
+        return find(*args, **kwargs)
+
+    db.collection.find = failing_find
+    path = tmp_path / "dogs.csv"
+    with pytest.raises(errors.PyMongoError):
+        export_animals(db, str(path), batch_size=2)
+    assert not path.exists()
+
+
+def test_gzip_jsonl_export(db, tmp_path):
+    db.create_animal(_dog("Rex"))
+    path = tmp_path / "animals.jsonl.gz"
+    assert export_animals(db, str(path)) == 1
+    with gzip.open(path, "rt", encoding="utf-8") as handle:
+        record = json.loads(handle.readline())
+    assert record["name"] == "Rex"
+    assert isinstance(record["_id"], str)
+
+
+def test_parquet_export(db, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    for i in range(3):
+        db.create_animal(_dog(f"Dog{i}"))
+    path = tmp_path / "animals.parquet"
+    assert export_animals(db, str(path), batch_size=2) == 3
+    table = pq.read_table(path)
+    assert table.column("name").to_pylist() == ["Dog0", "Dog1", "Dog2"]
+
+
+def test_detect_format_rejects_unknown_extension():
+    assert detect_format("out.csv.gz") == "csv"
+    with pytest.raises(ValueError):
+        detect_format("out.xlsx")
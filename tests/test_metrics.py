@@ -0,0 +1,64 @@
+"""
+test.test_metrics
+Testing the AnimalDatabase instrumentation
+"""
+import json
+import urllib.request
+from datetime import date
+
+from pymongo import errors
+
+from data.metrics import MetricsRegistry, serve_metrics
+
+
+def test_database_calls_are_counted(db):
+    db.metrics = MetricsRegistry()
+    db.create_animal({"name": "Rex", "animal_type": "Dog", "reserved": False,
+                      "acquisition_date": date.today().isoformat()})
+    db.read_all_animals()
+    db.update_animal("0" * 24, {"reserved": True})
+    snap = db.metrics.snapshot()["operations"]
+    assert snap["create_animal"]["calls"] == 1
+    assert snap["read_all_animals"]["documents"] == 1
+    assert snap["update_animal"]["errors"] == 0
+    assert snap["read_all_animals"]["p99"] >= snap["read_all_animals"]["p50"] > 0
+
+
+def test_timer_records_failures_and_percentiles():
+    registry = MetricsRegistry()
+    for ms in range(1, 101):
+        registry.observe("op", ms / 1000)
+    with registry.timer("op"):
+        registry.mark_failed()
+    stats = registry.snapshot()["operations"]["op"]
+    assert stats["calls"] == 101
+    assert stats["errors"] == 1
+    assert stats["p95"] == 0.095
+
+
+def test_handled_failures_mark_enclosing_operations(db):
+    db.metrics = MetricsRegistry()
+
+    def failing_find(*args, **kwargs):
+        raise errors.OperationFailure("bad query", code=2)
+
+    db.collection.find = failing_find
+    with db.metrics.timer("outer"):
+        assert db.find_animals_page() == ([], None)
+    snap = db.metrics.snapshot()["operations"]
+    assert snap["find_animals_page"]["errors"] == 1
+    assert snap["outer"]["errors"] == 1
+
+
+def test_metrics_endpoint_serves_text_and_json():
+    registry = MetricsRegistry()
+    registry.observe("read_all_animals", 0.01, documents=3)
+    server = serve_metrics(registry, port=0)
+    try:
+        base = f"http://127.0.0.1:{server.server_port}"
+        with urllib.request.urlopen(f"{base}/metrics") as resp:
+            assert 'animal_db_calls_total{op="read_all_animals"} 1' in resp.read().decode()
+        with urllib.request.urlopen(f"{base}/metrics.json") as resp:
+            assert json.load(resp)["operations"]["read_all_animals"]["documents"] == 3
+    finally:
+        server.shutdown()
@@ -0,0 +1,186 @@
+"""
+test.test_resilience
+Testing retry classification, backoff, the circuit breaker, idempotent inserts
+and serving cached reads while the database is unreachable
+"""
+import pytest
+from bson.objectid import ObjectId
+from pymongo import errors
+
+from data.metrics import MetricsRegistry
+from data.query_cache import QueryCache
+from data.resilience import (
+    CircuitBreaker, CircuitOpenError, Resilience, RetryPolicy, is_retryable
+)
+
+
+class FlakyCollection:
+    """Wraps a collection; the listed methods fail with AutoReconnect while ``down`` is set."""
+
+    def __init__(self, inner, methods):
+        self.inner = inner
+        self.methods = set(methods)
+        self.down = True
+        self.calls = 0
+
+    def __getattr__(self, name):
+        method = getattr(self.inner, name)
+        if name not in self.methods:
+            return method
+
+        def call(*args, **kwargs):
+            self.calls += 1
+            if self.down:
+                raise errors.AutoReconnect("primary stepped down")
+            return method(*args, **kwargs)
+        return call
+
+
+def _resilience(attempts=3, failures=2, clock=None, sleeps=None):
+    breaker = CircuitBreaker(failure_threshold=failures, reset_timeout=30,
+                             **({"clock": clock} if clock else {}))
+    return Resilience(RetryPolicy(attempts=attempts, base_delay=0.1, max_delay=1.0, rng=lambda: 1.0),
+                      breaker, sleep=(sleeps.append if sleeps is not None else lambda _: None))
+
+
+def test_retryable_errors_are_classified():
+    assert is_retryable(errors.AutoReconnect("lost"))
+    assert is_retryable(errors.ServerSelectionTimeoutError("no primary"))
+    assert is_retryable(errors.OperationFailure("stepped down", code=189))
+    assert not is_retryable(errors.DuplicateKeyError("dup", code=11000))
+    assert not is_retryable(errors.OperationFailure("bad query", code=2))
+    assert not is_retryable(CircuitOpenError(5))
+
+
+def test_transient_failures_are_retried_with_backoff():
+    sleeps = []
+    resilience = _resilience(attempts=4, sleeps=sleeps)
+    outcomes = [errors.AutoReconnect("a"), errors.AutoReconnect("b"), "ok"]
+
+    def flaky():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert resilience.call(flaky) == "ok"
+    assert sleeps == [0.1, 0.2] and resilience.retries == 2
+
+    def duplicate():
+        raise errors.DuplicateKeyError("dup", code=11000)
+    with pytest.raises(errors.DuplicateKeyError):
+        resilience.call(duplicate)
+    assert resilience.retries == 2  # final errors are not retried
+
+
+def test_breaker_opens_fails_fast_and_probes_after_timeout():
+    now = [0.0]
+    resilience = _resilience(attempts=1, failures=2, clock=lambda: now[0])
+    registry = MetricsRegistry()
+    resilience.register_metrics(registry)
+    calls = []
+
+    def down():
+        calls.append(1)
+        raise errors.AutoReconnect("down")
+
+    for _ in range(2):
+        with pytest.raises(errors.AutoReconnect):
+            resilience.call(down)
+    with pytest.raises(CircuitOpenError):
+        resilience.call(down)
+    assert len(calls) == 2
+    assert registry.snapshot()["gauges"]["breaker_state"] == 2
+    assert registry.snapshot()["gauges"]["breaker_rejected_total"] == 1
+
+    now[0] = 31
+    assert resilience.call(lambda: "back") == "back"  # the half-open probe
+    assert resilience.breaker.state == "closed" and resilience.breaker.opened == 1
+
+
+def test_probe_that_raises_a_non_driver_error_frees_the_probe():
+    now = [0.0]
+    resilience = _resilience(attempts=1, failures=1, clock=lambda: now[0])
+
+    def down():
+        raise errors.AutoReconnect("down")
+
+    def disk_full():
+        raise OSError("no space left on device")
+
+    with pytest.raises(errors.AutoReconnect):
+        resilience.call(down)
+    now[0] = 31
+    with pytest.raises(OSError):
+        resilience.call(disk_full)  # takes the half-open probe slot
+    now[0] = 95
+    assert resilience.call(lambda: "back") == "back"
+    assert resilience.breaker.state == "closed"
+
+
+def test_retried_insert_is_not_duplicated():
+    stored = {}
+
+    class LostReply:
+        # Stores the document, then loses the reply the first time
+        def __init__(self):
+            self.attempts = 0
+
+        def insert_one(self, doc):
+            self.attempts += 1
+            if doc["_id"] in stored:
+                raise errors.DuplicateKeyError("E11000", code=11000,
+                                               details={"keyPattern": {"_id": 1}})
+            stored[doc["_id"]] = doc
+            if self.attempts == 1:
+                raise errors.AutoReconnect("connection reset")
+
+    collection = LostReply()
+    doc = {"name": "Rex"}
+    _resilience().insert_one(collection, doc)
+    assert isinstance(doc["_id"], ObjectId)
+    assert collection.attempts == 2 and list(stored) == [doc["_id"]]
+
+
+def test_outage_serves_cached_reads_and_fails_writes_fast(db):
+    db.resilience = _resilience(attempts=2, failures=2)
+    db.create_animal({"name": "Rex", "animal_type": "Dog", "reserved": False})
+    db.create_animal({"name": "Momo", "animal_type": "Monkey", "reserved": False})
+    page, _ = db.find_animals_page({"animal_type": "Dog"})
+    assert db.count_animals() == 2
+    db.update_animal(page[0]["_id"], {"age": 4})  # invalidates, but stale copies are kept
+
+    flaky = FlakyCollection(db.collection, {"find", "count_documents", "update_one", "aggregate"})
+    db.collection = flaky
+    stale, _ = db.find_animals_page({"animal_type": "Dog"})
+    assert [doc["name"] for doc in stale] == ["Rex"]
+    assert db.count_animals() == 2
+    assert not db.available
+    assert db.find_animals_page({"animal_type": "Monkey"}) == ([], None)  # never cached
+
+    calls = flaky.calls
+    assert db.update_animal(page[0]["_id"], {"age": 5}) is False
+    assert flaky.calls == calls  # rejected by the open breaker without a round trip
+
+    flaky.down = False
+    db.resilience.breaker.reset_timeout = 0
+    assert db.update_animal(page[0]["_id"], {"age": 5}) is True
+    assert db.available
+
+
+def test_gui_counts_fall_back_to_cached_counts_and_never_read_as_zero(db):
+    from gui import app
+    db.resilience = _resilience(attempts=1, failures=5)
+    for name, animal_type, reserved in (("Rex", "Dog", False), ("Fido", "Dog", True), ("Momo", "Monkey", False)):
+        db.create_animal({"name": name, "animal_type": animal_type, "reserved": reserved})
+    counts = app._fetch_counts(db)
+    assert counts == {"dogs": 2, "monkeys": 1, "available": 2}
+    assert list(counts) == list(app.COUNT_LABELS)
+
+    db.cache.invalidate()  # stale copies are kept for an outage
+    db.collection = FlakyCollection(db.collection, {"count_documents"})
+    assert app._fetch_counts(db) == counts
+
+    db.cache = QueryCache()  # nothing seen before the outage
+    with pytest.raises(errors.AutoReconnect):
+        app._fetch_counts(db)
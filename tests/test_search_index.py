@@ -0,0 +1,57 @@
+"""
+test.test_search_index
+Testing type-ahead search, in memory and through the search_keys index
+"""
+from data.search_index import SearchIndex, search_filter, search_tokens
+
+ANIMALS = [
+    {"name": "Buddy", "breed": "German Shepherd", "acquisition_country": "Usa", "in_service_country": "Peru"},
+    {"name": "Bella", "species": "Capuchin", "acquisition_country": "Brazil", "in_service_country": "Usa"},
+    {"name": "Max", "breed": "Beagle", "acquisition_country": "Germany", "in_service_country": "Canada"},
+]
+
+
+def test_search_tokens_are_lowercase_words():
+    assert search_tokens("  German-Shepherd, PERU ") == ["german", "shepherd", "peru"]
+
+
+def test_in_memory_search_matches_word_prefixes():
+    index = SearchIndex()
+    for i, animal in enumerate(ANIMALS):
+        index.add(str(i), animal)
+
+    assert index.search("") is None
+    assert index.search("b") == {"0", "1", "2"}
+    assert index.search("shep") == {"0"}
+    assert index.search("ger") == {"0", "2"}
+    assert index.search("ger can") == {"2"}
+    assert index.search("erman") == set()
+    assert index.matches("1", "usa bel") and not index.matches("1", "max")
+
+    index.add("2", {"name": "Rocky", "breed": "Boxer"})
+    assert index.search("ger") == {"0"}
+    index.remove("0")
+    assert index.search("shepherd") == set()
+
+
+def test_server_search_agrees_with_local_index(db):
+    for animal in ANIMALS:
+        db.create_animal(dict(animal, animal_type="Dog"))
+    index = SearchIndex()
+    for doc in db.read_all_animals():
+        index.add(doc["name"], doc)
+
+    for text in ("b", "ger", "ger can", "usa", "cap", "zzz"):
+        names = {doc["name"] for doc in db.read_all_animals(search_filter(text))}
+        assert names == index.search(text)
+
+
+def test_search_keys_backfilled_and_kept_current(db):
+    db.collection.insert_one({"name": "Legacy", "breed": "Poodle"})
+    assert db.backfill_search_keys() == 1
+    assert db.collection.find_one({"name": "Legacy"})["search_keys"] == ["legacy", "poodle"]
+
+    db.create_animal({"name": "Rex", "breed": "Lab"})
+    rex = db.collection.find_one({"name": "Rex"})
+    db.update_animal(rex["_id"], {"breed": "Golden Retriever"})
+    assert db.collection.find_one({"name": "Rex"})["search_keys"] == ["golden", "retriever", "rex"]
@@ -0,0 +1,158 @@
+"""
+test.test_service
+Testing the HTTP/JSON service: sessions, paging, conditional GETs and bulk writes
+"""
+import http.client
+import json
+import threading
+from datetime import date
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from bson.objectid import ObjectId
+from pymongo import errors
+
+from benchmarks.load_test import run_load
+from data.service import AnimalService, make_server
+
+
+def _dog(name, reserved=False):
+    return {"name": name, "animal_type": "Dog", "breed": "Labrador", "gender": "male", "age": 2,
+            "weight": 25.0, "acquisition_country": "USA", "training_status": "Not Trained",
+            "reserved": reserved, "in_service_country": "USA",
+            "acquisition_date": date.today().isoformat()}
+
+
+@pytest.fixture()
+def service(db):
+    db.create_user("jane", "pwd123", role="user", first_login=False)
+    return AnimalService(db)
+
+
+def _call(service, method, url, token=None, payload=None, **headers):
+    parts = urlsplit(url)
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    body = json.dumps(payload).encode() if payload is not None else b""
+    status, response_headers, data = service.handle(method, parts.path, parse_qs(parts.query), headers, body)
+    return status, response_headers, json.loads(data) if data else None
+
+
+def _login(service, username="jane", password="pwd123"):
+    status, _, body = _call(service, "POST", "/login", payload={"username": username, "password": password})
+    assert status == 200
+    return body["token"]
+
+
+def test_requests_need_a_session(service):
+    assert _call(service, "GET", "/animals")[0] == 401
+    assert _call(service, "POST", "/login", payload={"username": "jane", "password": "nope"})[0] == 401
+    token = _login(service)
+    assert _call(service, "GET", "/animals", token)[0] == 200
+    assert _call(service, "POST", "/users", token, {"username": "bob", "password": "x"})[0] == 403
+    assert _call(service, "GET", "/nowhere", token)[0] == 404
+    assert _call(service, "PUT", "/animals", token)[0] == 405
+    _call(service, "POST", "/logout", token)
+    assert _call(service, "GET", "/animals", token)[0] == 401
+
+
+def test_first_login_session_must_change_password(service):
+    service.db.create_user("newbie", "temp123")
+    status, _, body = _call(service, "POST", "/login", payload={"username": "newbie", "password": "temp123"})
+    assert status == 200 and body["first_login"] is True
+    token = body["token"]
+    status, _, body = _call(service, "GET", "/animals", token)
+    assert status == 403 and body["error"] == "password change required"
+    assert _call(service, "POST", "/password", token,
+                 {"password": "wrong", "new_password": "better456"})[0] == 403
+    assert _call(service, "POST", "/password", token,
+                 {"password": "temp123", "new_password": "short"})[0] == 400
+
+    status, _, body = _call(service, "POST", "/password", token,
+                            {"password": "temp123", "new_password": "better456"})
+    assert status == 200
+    assert _call(service, "GET", "/animals", token)[0] == 401  # the old session is closed
+    assert _call(service, "GET", "/animals", body["token"])[0] == 200
+    status, _, body = _call(service, "POST", "/login", payload={"username": "newbie", "password": "better456"})
+    assert status == 200 and body["first_login"] is False
+
+
+def test_pages_follow_cursor_and_answer_conditional_gets(service):
+    token = _login(service)
+    status, _, body = _call(service, "POST", "/animals", token, [_dog(f"Dog{i}") for i in range(5)])
+    assert status == 201 and body["inserted"] == 5
+
+    names, url = [], "/animals?view=dogs&limit=2&sort=-name"
+    while url:
+        status, headers, body = _call(service, "GET", url, token)
+        names += [animal["name"] for animal in body["animals"]]
+        url = f"/animals?view=dogs&limit=2&sort=-name&after={body['next']}" if body["next"] else None
+    assert names == ["Dog4", "Dog3", "Dog2", "Dog1", "Dog0"]
+
+    status, headers, _ = _call(service, "GET", "/counts", token)
+    tag = headers["ETag"]
+    assert _call(service, "GET", "/counts", token, **{"If-None-Match": tag})[0] == 304
+    # A write through the service drops the cached body, so the tag changes
+    _call(service, "POST", "/animals", token, _dog("Rex"))
+    status, headers, body = _call(service, "GET", "/counts", token, **{"If-None-Match": tag})
+    assert status == 200 and headers["ETag"] != tag and body["dogs"] == 6
+
+
+def test_bulk_writes_report_per_item_failures(service):
+    token = _login(service)
+    status, _, body = _call(service, "POST", "/animals", token,
+                            [_dog("Rex"), {"animal_type": "Cat", "name": "Tom"}, _dog("Fido")])
+    assert status == 201 and body["inserted"] == 2 and [f["index"] for f in body["failures"]] == [1]
+    ids = body["ids"]
+
+    assert _call(service, "POST", "/animals/reserve", token, {"ids": ids, "reserved": True})[2] == {
+        "matched": 2, "modified": 2}
+    assert _call(service, "PATCH", "/animals", token, {"ids": ids, "set": {"age": 5}})[2]["modified"] == 2
+    assert _call(service, "PATCH", "/animals", token, {"ids": ids, "set": {"_id": 1}})[0] == 400
+    assert _call(service, "GET", f"/animals/{ids[0]}", token)[2]["age"] == 5
+    assert _call(service, "POST", "/animals/delete", token, {"ids": ids})[2] == {"deleted": 2}
+    assert _call(service, "DELETE", f"/animals/{ids[0]}", token)[0] == 404
+    assert _call(service, "POST", "/animals/delete", token, {"ids": ["not-an-id"]})[0] == 400
+
+
+def test_http_server_under_concurrent_load(service):
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=10)
+        conn.request("POST", "/login", body=json.dumps({"username": "jane", "password": "pwd123"}))
+        token = json.loads(conn.getresponse().read())["token"]
+        conn.close()
+        result = run_load(f"http://127.0.0.1:{server.server_port}", token, clients=4,
+                          duration=None, requests=40)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert result["requests"] == 40 and result["errors"] == 0
+    assert result["statuses"].get("304", 0) > 0
+
+
+def test_writes_get_503_while_the_breaker_is_open(service):
+    token = _login(service)
+    breaker = service.db.resilience.breaker
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    status, headers, _ = _call(service, "POST", "/animals/reserve", token,
+                               {"ids": [str(ObjectId())], "reserved": True})
+    assert status == 503 and int(headers["Retry-After"]) >= 1
+    assert _call(service, "GET", "/health")[2]["breaker"] == "open"
+
+
+def test_failed_reads_get_503_and_are_not_cached(service):
+    token = _login(service)
+    _call(service, "POST", "/animals", token, _dog("Rex"))
+    find = service.db.collection.find
+
+    def failing_find(*args, **kwargs):
+        raise errors.OperationFailure("not authorized", code=13)
+
+    service.db.collection.find = failing_find
+    assert _call(service, "GET", "/animals", token)[0] == 503
+    service.db.collection.find = find
+    status, _, body = _call(service, "GET", "/animals", token)
+    assert status == 200 and [animal["name"] for animal in body["animals"]] == ["Rex"]
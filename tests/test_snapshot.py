@@ -0,0 +1,77 @@
+"""
+test.test_snapshot
+Testing the memory-mapped local snapshot and its sync with the server
+"""
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+
+from data.snapshot import Snapshot, open_snapshot, write_snapshot
+
+
+def _doc(name, animal_type="Dog", reserved=False, **extra):
+    doc = {"_id": ObjectId(), "name": name, "animal_type": animal_type, "gender": "male",
+           "age": 3, "weight": 20.5, "acquisition_date": "2024-01-01",
+           "acquisition_country": "USA", "training_status": "Fully Trained",
+           "reserved": reserved, "in_service_country": "USA", **extra}
+    doc["breed" if animal_type == "Dog" else "species"] = "Beagle" if animal_type == "Dog" else "Capuchin"
+    return doc
+
+
+def test_snapshot_round_trip_and_find(tmp_path):
+    path = str(tmp_path / "animals.snapshot")
+    docs = [_doc("Rex"), _doc("Momo", "Monkey", reserved=True), _doc("Fido", weight=None)]
+    docs[2].pop("weight")
+    synced_at = datetime(2025, 1, 2, 3, 4, 5)
+    assert write_snapshot(path, docs, synced_at) == 3
+
+    with Snapshot(path) as snapshot:
+        assert len(snapshot) == 3 and snapshot.synced_at == synced_at
+        rows = list(snapshot.batch)
+        assert rows[0] == {**docs[0], "_id": str(docs[0]["_id"])}
+        assert "weight" not in rows[2] and rows[1]["species"] == "Capuchin"
+        available = snapshot.find({"animal_type": {"$in": ["Dog", "Monkey"]}, "reserved": False})
+    # find() copies out of the map, so the result survives close()
+    assert [row["name"] for row in available] == ["Rex", "Fido"]
+
+
+def test_unreadable_snapshot_is_ignored(tmp_path):
+    path = tmp_path / "animals.snapshot"
+    assert open_snapshot(str(path)) is None
+    path.write_bytes(b"not a snapshot at all")
+    assert open_snapshot(str(path)) is None
+
+
+def test_sync_snapshot_fetches_only_changes(db, tmp_path, monkeypatch):
+    # No clock-skew overlap, so exactly the animals changed after the first sync come back
+    monkeypatch.setattr("data.database_manager.SNAPSHOT_OVERLAP", timedelta(0))
+    path = str(tmp_path / "animals.snapshot")
+    for doc in (_doc("Rex"), _doc("Fido"), _doc("Momo", "Monkey")):
+        db.create_animal(doc)
+    assert db.sync_snapshot(path) is None  # no snapshot yet: written in full
+
+    rex = db.collection.find_one({"name": "Rex"})
+    fido = db.collection.find_one({"name": "Fido"})
+    db.update_animal(rex["_id"], {"reserved": True})
+    db.delete_animal(fido["_id"])
+    db.create_animal(_doc("Bella"))
+
+    upserts, removed = db.sync_snapshot(path)
+    assert {doc["name"] for doc in upserts} == {"Rex", "Bella"}
+    assert removed == [fido["_id"]]
+    with open_snapshot(path) as snapshot:
+        rows = {row["name"]: row for row in snapshot.batch}
+    assert set(rows) == {"Rex", "Momo", "Bella"} and rows["Rex"]["reserved"] is True
+
+
+def test_float_ages_are_stored_and_bad_ones_skip_the_snapshot(db, tmp_path):
+    path = str(tmp_path / "animals.snapshot")
+    db.collection.insert_many([_doc("Rex", age=3.0), _doc("Fido", age="4")])
+    assert db.save_snapshot(path) == 2
+    with open_snapshot(path) as snapshot:
+        assert sorted(snapshot.batch.column("age")) == [3, 4]
+
+    db.collection.insert_one(_doc("Odd", age="unknown"))
+    assert db.save_snapshot(path) == 0
+    with open_snapshot(path) as snapshot:
+        assert len(snapshot) == 2  # the previous file is left as it was
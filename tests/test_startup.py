@@ -0,0 +1,43 @@
+"""
+test.test_startup
+Testing start-up phase timing, the import-time parser and deferred imports
+"""
+import subprocess
+import sys
+
+import pytest
+
+from data.metrics import MetricsRegistry
+from gui.startup import ROOT, StartupTimer, parse_importtime
+
+
+def test_startup_timer_keeps_first_time_per_phase():
+    now = [10.0]
+    registry = MetricsRegistry()
+    timer = StartupTimer(registry=registry, clock=lambda: now[0])
+    now[0] = 10.2
+    timer.mark("imports")
+    now[0] = 10.5
+    timer.mark("db_failed")
+    now[0] = 11.0
+    timer.mark("db_failed")
+
+    assert timer.to_dict() == pytest.approx({"imports": 0.2, "db_failed": 0.5})
+    assert registry.snapshot()["operations"]["startup.db_failed"]["calls"] == 1
+    assert "db_failed" in timer.report()
+
+
+def test_parse_importtime():
+    text = ("import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   bson.codec_options\n"
+            "import time:       300 |        420 | bson\n")
+    entries = parse_importtime(text)
+    assert [(e["module"], e["self_us"], e["cumulative_us"], e["depth"]) for e in entries] == [
+        ("bson.codec_options", 120, 120, 1), ("bson", 300, 420, 0)]
+
+
+def test_gui_app_defers_pymongo_and_bcrypt():
+    code = "import sys, gui.app; print(sorted({'pymongo', 'bcrypt', 'gui.login_form'} & set(sys.modules)))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True,
+                         text=True, check=True).stdout
+    assert out.strip() == "[]"
@@ -0,0 +1,84 @@
+"""
+test.test_task_runner
+Testing the background task bridge without a Tk display
+"""
+import threading
+
+from gui.task_runner import TaskRunner
+
+
+class FakeWidget:
+    """Collects after() callbacks so the test can drive the poll loop."""
+
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, _ms, callback):
+        self.scheduled.append(callback)
+
+    def drain(self):
+        while self.scheduled:
+            self.scheduled.pop(0)()
+
+
+def test_results_are_delivered_on_poll():
+    widget = FakeWidget()
+    runner = TaskRunner(widget)
+    results = []
+    future = runner.submit(lambda a, b: a + b, 2, 3, on_success=results.append)
+    future.result(timeout=5)
+    assert results == []            # nothing runs until the Tk side polls
+    widget.drain()
+    assert results == [5]
+    runner.shutdown()
+
+
+def test_newer_task_with_same_key_supersedes_older():
+    widget = FakeWidget()
+    runner = TaskRunner(widget, max_workers=2)
+    release = threading.Event()
+    results = []
+    slow = runner.submit(lambda: release.wait(5) and "dogs", on_success=results.append, key="load")
+    fast = runner.submit(lambda: "all", on_success=results.append, key="load")
+    fast.result(timeout=5)
+    release.set()
+    if not slow.cancelled():
+        slow.result(timeout=5)
+    widget.drain()
+    assert results == ["all"]
+    runner.shutdown()
+
+
+def test_errors_route_to_handler_and_busy_state_resets():
+    widget = FakeWidget()
+    busy_changes = []
+    errors = []
+    runner = TaskRunner(widget, on_busy=busy_changes.append, on_error=errors.append)
+
+    def fail():
+        raise ValueError("boom")
+
+    runner.submit(fail).exception(timeout=5)
+    assert runner.busy
+    widget.drain()
+    assert isinstance(errors[0], ValueError)
+    assert busy_changes == [True, False]
+    assert not runner.busy
+    runner.shutdown()
+
+
+def test_coroutines_run_on_the_event_loop_and_deliver_on_poll():
+    import asyncio
+
+    async def double(value):
+        await asyncio.sleep(0)
+        return value * 2
+
+    widget = FakeWidget()
+    runner = TaskRunner(widget)
+    results = []
+    runner.submit_async(double(21), on_success=results.append, key="counts").result(timeout=5)
+    assert results == []
+    widget.drain()
+    assert results == [42]
+    runner.shutdown()
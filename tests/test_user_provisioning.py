@@ -0,0 +1,56 @@
+"""
+test.test_user_provisioning
+Testing bulk user creation
+"""
+import os
+import stat
+
+import bcrypt
+
+from data import user_provisioning
+
+
+def test_provision_users_reports_each_row(db):
+    db._bcrypt_rounds = 4
+    db.create_user("taken", "pw1234", first_login=False)
+    records = [
+        (2, {"username": "amy", "password": "amy-pass", "role": "admin"}),
+        (3, {"username": "bob"}),
+        (4, {"username": "taken", "password": "x"}),
+        (5, {"username": "", "password": "x"}),
+        (6, {"username": "amy"}),
+        (7, {"username": "cat", "role": "owner"}),
+        (8, '{"username": "dan", "password": "dan-pass"}'),
+        (9, "{not json"),
+        (10, '["eve", "pw"]'),
+        (11, "42"),
+    ]
+    results = user_provisioning.provision_users(db, records, workers=2, batch_size=2)
+
+    assert [(r.row, r.status) for r in results] == [
+        (2, "created"), (3, "created"), (4, "exists"), (5, "invalid"),
+        (6, "invalid"), (7, "invalid"), (8, "created"), (9, "invalid"),
+        (10, "invalid"), (11, "invalid"),
+    ]
+    amy = db.users.find_one({"username": "amy"})
+    assert amy["role"] == "admin" and bcrypt.checkpw(b"amy-pass", amy["password"])
+    assert results[0].password == ""
+    bob = db.users.find_one({"username": "bob"})
+    assert bcrypt.checkpw(results[1].password.encode(), bob["password"])
+    assert db.authenticate_user("dan", "dan-pass")[0] is not None
+
+
+def test_hash_passwords_keeps_order_across_processes():
+    hashes = user_provisioning.hash_passwords(["a", "b", "c"], rounds=4, workers=2)
+    assert [bcrypt.checkpw(p, h) for p, h in zip([b"a", b"b", b"c"], hashes)] == [True] * 3
+
+
+def test_results_file_is_private_even_if_it_existed(tmp_path):
+    path = tmp_path / "users.csv.results.csv"
+    path.write_text("old")
+    os.chmod(path, 0o644)
+    result = user_provisioning.ProvisionResult(2, "bob", "user", "created", password="s3cret")
+    user_provisioning.write_results(str(path), [result])
+    if os.name == "posix":
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert path.read_text().splitlines()[1] == "2,bob,user,created,,s3cret"
@@ -0,0 +1,101 @@
+"""
+test.test_virtual_table
+Testing the virtual-scrolling table: windowed rendering, edits, selection
+and deletes of rows outside the rendered window
+"""
+import tkinter as tk
+
+import pytest
+
+from gui.virtual_table import VirtualTable
+
+
+@pytest.fixture()
+def root():
+    try:
+        window = tk.Tk()
+    except tk.TclError:
+        pytest.skip("no display available for Tk")
+    window.withdraw()
+    yield window
+    window.destroy()
+
+
+def _table(root, count=100, fetch_more=None):
+    table = VirtualTable(root, ["Name", "Age"], {"Name": 100}, height=5, buffer=2)
+    table.load(((f"r{i}", (f"Dog{i}", i)) for i in range(count)), fetch_more)
+    return table
+
+
+def _rendered(table):
+    return list(table.tree.get_children())
+
+
+def test_only_the_window_around_the_view_is_rendered(root):
+    table = _table(root)
+    assert len(table) == 100
+    assert _rendered(table) == [f"r{i}" for i in range(7)]
+
+    table._scroll_to(50)
+    assert _rendered(table) == [f"r{i}" for i in range(48, 57)]
+    assert table.scrollbar.get() == pytest.approx((0.5, 0.55))
+
+    table._scroll_to(1000)  # clamped to the last full view
+    assert _rendered(table) == [f"r{i}" for i in range(93, 100)]
+
+
+def test_next_page_is_requested_near_the_end(root):
+    requests = []
+    table = _table(root, count=20, fetch_more=lambda: requests.append(len(table)))
+    assert requests == []
+    table._scroll_to(13)
+    assert requests == [20]
+    table.append([(f"r{i}", (f"Dog{i}", i)) for i in range(20, 30)], more=False)
+    assert len(table) == 30
+    table._scroll_to(25)
+    assert requests == [20]  # no more pages
+
+
+def test_set_value_updates_rendered_and_scrolled_out_rows(root):
+    table = _table(root)
+    table.set_value("r1", "Age", 42)
+    assert table.get_values("r1") == ("Dog1", 42)
+    assert table.tree.set("r1", "Age") == "42"
+
+    table.set_value("r80", "Name", "Rex")
+    assert table.get_values("r80") == ("Rex", 80)
+    table._scroll_to(78)
+    assert table.tree.set("r80", "Name") == "Rex"
+    table.set_value("missing", "Name", "x")  # ignored
+
+
+def test_selection_survives_scrolling_rows_out_of_view(root):
+    table = _table(root)
+    table.tree.selection_set("r1")
+    table._on_select(None)
+    table._scroll_to(50)
+    assert not table.tree.exists("r1")
+    table.tree.selection_set("r50")
+    table._on_select(None)
+    assert table.selection() == ("r1", "r50")
+
+    table._scroll_to(0)
+    assert table.tree.selection() == ("r1",)
+    assert table.selection() == ("r1", "r50")
+
+
+def test_delete_rows_drops_rendered_and_scrolled_out_rows(root):
+    table = _table(root)
+    table.tree.selection_set("r2")
+    table._on_select(None)
+    table.delete_rows(["r2", "r60", "unknown"])
+    assert len(table) == 98
+    assert "r2" not in _rendered(table) and table.selection() == ()
+    with pytest.raises(KeyError):
+        table.get_values("r60")
+    assert table.get_values("r61") == ("Dog61", 61)
+
+    table._scroll_to(90)
+    table.delete_rows([f"r{i}" for i in range(3, 100)])
+    assert _rendered(table) == ["r0", "r1"]
+    assert table.scrollbar.get() == pytest.approx((0.0, 1.0))
@@ -0,0 +1,131 @@
+"""
+test.test_write_behind
+Testing write coalescing, batching and rollback reporting
+"""
+from bson.objectid import ObjectId
+from pymongo import errors
+
+from gui.write_behind import WriteBehindQueue
+
+
+class FakeWidget:
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, _ms, callback):
+        self.scheduled.append(callback)
+
+
+class InlineRunner:
+    """Runs tasks synchronously so flushes complete inside the test."""
+
+    def submit(self, fn, *args, on_success=None, on_error=None, **_kwargs):
+        try:
+            result = fn(*args)
+        except Exception as exc:  # pylint: disable=broad-except
+            on_error(exc)
+        else:
+            on_success(result)
+
+
+def _dog(name, **overrides):
+    return {"name": name, "animal_type": "Dog", "breed": "Lab", "reserved": False, **overrides}
+
+
+def _queue(db, failures, saved=None):
+    widget = FakeWidget()
+    queue = WriteBehindQueue(db, InlineRunner(), widget, on_failed=failures.extend,
+                             on_idle=None if saved is None else saved.append)
+    return queue, widget
+
+
+def test_writes_are_coalesced_and_batched(db):
+    existing = [db.collection.insert_one(_dog(f"Old{i}")).inserted_id for i in range(3)]
+    calls = []
+    for name in ("insert_animals", "update_animals", "set_reserved_many", "delete_animals"):
+        original = getattr(db, name)
+        setattr(db, name, lambda *a, _f=original, _n=name, **k: calls.append(_n) or _f(*a, **k))
+
+    failures, saved = [], []
+    queue, widget = _queue(db, failures, saved)
+    rex = queue.create(_dog("Rex"))
+    ghost = queue.create(_dog("Ghost"))
+    queue.update(rex, {"reserved": True}, None)
+    queue.delete(ghost, None)
+    for animal_id in existing[:2]:
+        queue.update(str(animal_id), {"reserved": True}, "before")
+    queue.update(str(existing[1]), {"breed": "Collie"}, "before")
+    queue.delete(str(existing[2]), "before")
+
+    assert len(widget.scheduled) == 1 and len(queue) == 4
+    widget.scheduled.pop()()
+
+    assert calls == ["insert_animals", "set_reserved_many", "update_animals", "delete_animals"]
+    assert failures == [] and queue.idle
+    assert saved == [{"inserted": 1, "matched": 2, "modified": 2, "deleted": 1}]
+    assert db.collection.find_one({"_id": ObjectId(rex)})["reserved"] is True
+    assert db.collection.count_documents({"name": "Ghost"}) == 0
+    assert db.collection.count_documents({"reserved": True}) == 3
+    assert db.collection.count_documents({}) == 3
+
+
+def test_failed_writes_are_reported_with_originals(db):
+    failures = []
+    queue, widget = _queue(db, failures)
+    kept = db.collection.insert_one(_dog("Kept")).inserted_id
+    queue.update(str(kept), {"reserved": True}, ("row", "values"))
+    taken = db.collection.insert_one(_dog("Taken")).inserted_id
+    duplicate = queue.create(_dog("Dup", _id=taken))
+
+    def failing_update(*args, **kwargs):
+        raise errors.OperationFailure("not authorized", code=13)
+
+    db.collection.update_many = failing_update
+    widget.scheduled.pop()()
+
+    reported = {animal_id: (original, message) for animal_id, original, message in failures}
+    assert reported[str(kept)] == (("row", "values"), "not authorized")
+    assert reported[duplicate][0] is None and "duplicate" in reported[duplicate][1].lower()
+    assert queue.idle
+
+
+def test_writes_to_already_deleted_animals_are_not_failures(db):
+    failures = []
+    queue, widget = _queue(db, failures)
+    gone = db.collection.insert_one(_dog("Gone")).inserted_id
+    moved = db.collection.insert_one(_dog("Moved")).inserted_id
+    queue.delete(str(gone), "before")
+    queue.update(str(moved), {"reserved": True}, "before")
+    db.delete_animals([gone, moved])
+    widget.scheduled.pop()()
+    assert failures == []
+
+    kept = db.collection.insert_one(_dog("Kept")).inserted_id
+    queue.delete(str(kept), "before")
+
+    def failing_delete(*args, **kwargs):
+        raise errors.OperationFailure("not authorized", code=13)
+
+    db.collection.delete_many = failing_delete
+    widget.scheduled.pop()()
+    assert failures == [(str(kept), "before", "not authorized")]
+
+
+def test_close_writes_pending_changes_synchronously(db):
+    queue, widget = _queue(db, [])
+    queue.create(_dog("Late"))
+    assert queue.close() == []
+    assert db.collection.count_documents({"name": "Late"}) == 1
+    assert queue.idle
+
+
+def test_saved_counts_come_from_the_server(db):
+    saved = []
+    queue, widget = _queue(db, [], saved)
+    ids = [db.collection.insert_one(_dog(f"Dog{i}", reserved=i == 0)).inserted_id for i in range(3)]
+    gone = ids.pop()
+    db.delete_animals([gone])
+    for animal_id in ids + [gone]:
+        queue.update(str(animal_id), {"reserved": True}, "before")
+    widget.scheduled.pop()()
+    assert saved == [{"inserted": 0, "matched": 2, "modified": 1, "deleted": 0}]